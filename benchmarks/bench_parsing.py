@@ -0,0 +1,143 @@
+"""
+Parser and record-building benchmark.
+
+Generates synthetic statements at several sizes and measures throughput and
+peak traced memory of parse_multi_section_csv, parse_trades_df (with a null
+Supabase sink), the record builders and the Sheets row formatting.
+
+Usage:
+    python benchmarks/bench_parsing.py --sizes 1000,10000,100000,1000000
+    python benchmarks/bench_parsing.py --sizes 1000,10000 --json bench.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cloud_function"))
+
+from statement_generator import generate_statement  # noqa: E402
+from parsers.multi_section_parser import parse_multi_section_csv  # noqa: E402
+from parsers import trade_parser  # noqa: E402
+from parsers.trade_parser import parse_trades_df, detect_trade_type  # noqa: E402
+from builders.asset_builder import build_asset_record  # noqa: E402
+from builders.option_builder import build_option_record  # noqa: E402
+from builders.bond_builder import build_bond_record  # noqa: E402
+from services.sheets_service import _prepare_new_transaction_records, _get_transaction_columns  # noqa: E402
+
+
+def measure(fn, trace_memory=True):
+    """Run fn once and return (result, seconds, peak traced bytes)."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def split_sizes(total_rows):
+    """Split a total trade row count into stocks/options/bonds like a typical account."""
+    bonds = max(1, total_rows // 100)
+    options = int(total_rows * 0.39)
+    return total_rows - options - bonds, options, bonds
+
+
+def builder_params(count):
+    for i in range(count):
+        yield {
+            "tx_id": f"{i:032x}",
+            "executed_at": "2025-04-01 09:30:00",
+            "asset_category": "Options",
+            "symbol": "ANET 21FEB25 107 P",
+            "quantity": -1.0,
+            "trade_price": 2.5,
+            "fees": -1.05,
+            "code_str": "O",
+            "tx_type": "open",
+            "side": "sell",
+            "value": 250.0,
+            "currency": "USD",
+            "raw_data": {},
+        }
+
+
+def run_size(total_rows, work_dir, trace_memory=True):
+    stocks, options, bonds = split_sizes(total_rows)
+    path = os.path.join(work_dir, f"U0000000_{total_rows}_20250423.csv")
+    generate_statement(path, stocks=stocks, options=options, bonds=bonds, seed=total_rows)
+    file_bytes = os.path.getsize(path)
+    results = []
+
+    sections, elapsed, peak = measure(lambda: parse_multi_section_csv(path), trace_memory)
+    results.append(("parse_multi_section_csv", total_rows, elapsed, peak, file_bytes))
+
+    all_records = []
+    for section_name, df_sec in sections.items():
+        trade_type = detect_trade_type(section_name) if section_name.startswith("Trades") else None
+        if not trade_type:
+            continue
+        counters = {f"{trade_type}_processed": 0, f"{trade_type}_inserted": 0}
+        records, elapsed, peak = measure(lambda: parse_trades_df(df_sec, trade_type, counters), trace_memory)
+        results.append((f"parse_trades_df[{trade_type}]", len(df_sec), elapsed, peak, None))
+        all_records.extend(records)
+
+    for name, builder in (
+        ("build_asset_record", build_asset_record),
+        ("build_option_record", build_option_record),
+        ("build_bond_record", build_bond_record),
+    ):
+        params = list(builder_params(total_rows))
+        _, elapsed, peak = measure(lambda: [builder(**p) for p in params], trace_memory)
+        results.append((name, total_rows, elapsed, peak, None))
+
+    columns = _get_transaction_columns()
+    _, elapsed, peak = measure(lambda: _prepare_new_transaction_records(all_records, set(), columns), trace_memory)
+    results.append(("sheets_row_formatting", len(all_records), elapsed, peak, None))
+
+    os.remove(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark statement parsing and record building.")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Comma-separated total trade row counts")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no peak memory column)")
+    parser.add_argument("--json", help="Also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline INFO logging enabled")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger("investflow").setLevel(logging.WARNING)
+    # Null Supabase sink: measure parsing/building only
+    trade_parser.insert_batch_to_supabase = lambda table, data_list, transaction_ids, **kwargs: 0
+
+    rows_out = []
+    print(f"{'stage':<32}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak MiB':>10}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in (int(s) for s in args.sizes.split(",")):
+            for stage, rows, elapsed, peak, file_bytes in run_size(size, work_dir, not args.no_memory):
+                throughput = rows / elapsed if elapsed else float("inf")
+                peak_mib = peak / 1024 / 1024
+                print(f"{stage:<32}{rows:>10}{elapsed:>10.3f}{throughput:>12.0f}{peak_mib:>10.1f}")
+                rows_out.append({
+                    "size": size, "stage": stage, "rows": rows, "seconds": elapsed,
+                    "rows_per_second": throughput, "peak_bytes": peak, "file_bytes": file_bytes,
+                })
+            print()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows_out, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Supabase insert-strategy benchmark against the local fake PostgREST.
+
+For every latency and chunk size it uploads the same synthetic records with
+each strategy into a table where a fraction of rows already exists, and
+reports wall time, request counts and records/s.
+
+Usage:
+    python benchmarks/bench_supabase_insert.py --records 2000 --latencies 0,20,50 --chunk-sizes 20,100,500
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cloud_function"))
+
+from fake_postgrest import FakePostgrest  # noqa: E402
+from services import supabase_service  # noqa: E402
+
+TABLE = "asset_transactions"
+
+
+def make_records(count):
+    return [
+        {
+            "transaction_id": f"{i:032x}",
+            "executed_at": f"2025-04-{1 + i % 28:02d} 09:30:00",
+            "asset_category": "Stocks",
+            "ticker": "AAPL",
+            "quantity": 10.0,
+            "price": 100.0,
+            "fees": -1.0,
+            "currency": "USD",
+            "code": "O",
+            "type": "open",
+            "side": "buy",
+            "value": -1000.0,
+            "full_value": -1001.0,
+            "raw_data": {"Symbol": "AAPL", "Quantity": "10"},
+        }
+        for i in range(count)
+    ]
+
+
+def strategy_get_then_post(records, chunk_size):
+    ids = [r["transaction_id"] for r in records]
+    return supabase_service.insert_batch_to_supabase(TABLE, records, ids, chunk_size=chunk_size)
+
+
+def strategy_range_then_post(records, chunk_size):
+    ids = [r["transaction_id"] for r in records]
+    known_ids = supabase_service.fetch_existing_transaction_ids(TABLE, records)
+    return supabase_service.insert_batch_to_supabase(TABLE, records, ids, chunk_size=chunk_size, known_ids=known_ids)
+
+
+def strategy_upsert_ignore_duplicates(records, chunk_size):
+    return supabase_service.upsert_batch_to_supabase(TABLE, records, chunk_size=chunk_size)
+
+
+STRATEGIES = {
+    "get_then_post": strategy_get_then_post,
+    "range_then_post": strategy_range_then_post,
+    "upsert_ignore_duplicates": strategy_upsert_ignore_duplicates,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Supabase insert strategies offline.")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--existing-fraction", type=float, default=0.5, help="Fraction of records already stored")
+    parser.add_argument("--latencies", default="0,20,50", help="Injected per-request latency in ms")
+    parser.add_argument("--chunk-sizes", default="20,100,500")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    logging.getLogger("investflow").setLevel(logging.WARNING)
+    records = make_records(args.records)
+    existing = records[: int(len(records) * args.existing_fraction)]
+    expected_new = len(records) - len(existing)
+
+    print(f"{'strategy':<28}{'latency':>8}{'chunk':>7}{'seconds':>10}{'GET':>6}{'POST':>6}{'rec/s':>10}{'inserted':>10}")
+    for latency in (float(x) for x in args.latencies.split(",")):
+        server = FakePostgrest(latency_ms=latency, error_rate=args.error_rate).start()
+        supabase_service.SUPABASE_URL = server.url
+        try:
+            for chunk_size in (int(x) for x in args.chunk_sizes.split(",")):
+                for name in args.strategies.split(","):
+                    server.reset()
+                    server.seed_rows(TABLE, existing)
+                    start = time.perf_counter()
+                    inserted = STRATEGIES[name](records, chunk_size)
+                    elapsed = time.perf_counter() - start
+                    flag = "" if inserted == expected_new or args.error_rate else " !"
+                    print(f"{name:<28}{latency:>8.0f}{chunk_size:>7}{elapsed:>10.3f}"
+                          f"{server.stats['GET']:>6}{server.stats['POST']:>6}"
+                          f"{len(records) / elapsed:>10.0f}{inserted:>10}{flag}")
+        finally:
+            server.stop()
+        print()
+
+
+if __name__ == "__main__":
+    main()
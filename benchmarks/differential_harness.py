@@ -0,0 +1,258 @@
+"""
+Golden-output differential harness between main_old.py and main.py.
+
+Runs both pipelines over a corpus of statements with every sink captured in
+memory, then diffs the emitted Supabase trade records per table by
+transaction_id and field by field. Outputs only main.py has (cash, cash
+flows and events, Sheets, Parquet, SQLite) are checked against each other:
+every sink of one kind must receive the same keys. Timing of each pipeline
+is reported per file. The exit code is 1 when unexpected differences are
+found, so it can guard any change to parsing or record building.
+
+Usage:
+    python benchmarks/differential_harness.py statements/ --ignore-fields asset_category,currency
+    python benchmarks/differential_harness.py --generate 5 --trades-per-file 2000
+    python benchmarks/differential_harness.py --generate 2 --timestamp-format "%m/%d/%Y %H:%M"
+"""
+import os
+import sys
+import glob
+import math
+import time
+import logging
+import argparse
+import tempfile
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cloud_function"))
+# Nothing may persist between runs or outside the harness: no checkpoints, snapshots, spool or markers
+for backend in ("CHECKPOINT_BACKEND", "POSITIONS_BACKEND", "SPOOL_BACKEND", "IDEMPOTENCY_BACKEND"):
+    os.environ[backend] = "none"
+
+from statement_generator import generate_statement, TIMESTAMP_FORMAT  # noqa: E402
+import main_old  # noqa: E402
+import main as main_new  # noqa: E402
+from parsers import trade_parser  # noqa: E402
+from parsers.cash_parser import CASH_FLOWS_TABLE  # noqa: E402
+
+# Fields only the refactored pipeline emits; reported separately, not as mismatches
+NEW_ONLY_FIELDS = {"asset_category", "currency", "option_strategy", "base_value", "base_full_value"}
+# Fields main.py emits in a normalized form; both sides are mapped to a comparable value first
+FIELD_NORMALIZERS = {
+    # "2025-04-01 09:30:00" (main_old) vs "2025-04-01T09:30:00-04:00" (main)
+    "executed_at": lambda value: str(value or "")[:19].replace(" ", "T"),
+}
+# Sinks of main.py that must receive the same keys, per kind of output
+NEW_OUTPUT_GROUPS = {
+    "transactions": ["supabase:trades", "sheets:Transactions", "parquet:transactions", "sqlite:transactions"],
+    "cash": ["sheets:Cash", "parquet:cash", "sqlite:cash"],
+    "cash_flows": ["supabase:cash_flows", "sheets:Cash Flows", "parquet:cash_flows"],
+    "cash_events": ["supabase:cash_events", "sheets:Cash Events", "parquet:cash_events"],
+}
+
+
+class OldPipeline:
+    """main_old.process_csv with insert_to_supabase/Slack captured."""
+
+    def __init__(self):
+        self.records = defaultdict(dict)
+        main_old.insert_to_supabase = self._capture
+        main_old.send_slack_message = lambda message: None
+
+    def _capture(self, table, data, transaction_id):
+        self.records[table].setdefault(transaction_id, data)
+
+    def run(self, path):
+        self.records = defaultdict(dict)
+        main_old.process_csv(path)
+        return self.records
+
+
+def _output_key(record):
+    # Cash rows have no transaction_id; one row per date and currency
+    return record.get("transaction_id") or f"{record.get('date')}:{record.get('currency')}"
+
+
+class NewPipeline:
+    """
+    main.process_csv_file with every sink captured.
+
+    Trade records go to `records` (diffed against main_old); everything else
+    main.py writes is collected per sink in `outputs` as sets of keys.
+    """
+
+    def __init__(self):
+        self.records = defaultdict(dict)
+        self.outputs = defaultdict(set)
+        trade_parser.insert_batch_to_supabase = self._capture_batch
+        trade_parser.prefetch_existing_ids = lambda table, data_list: None
+        main_new.upsert_batch_to_supabase = self._capture_upsert
+        main_new.write_to_google_sheets = self._sheet_capture("Transactions")
+        main_new.write_cash_reports = self._sheet_capture("Cash")
+        main_new.write_cash_flows = self._sheet_capture("Cash Flows")
+        main_new.write_cash_events = self._sheet_capture("Cash Events")
+        main_new.write_positions = self._sheet_capture("Positions")
+        main_new.write_realized_pnl = self._sheet_capture("Realized P&L")
+        main_new.export_to_parquet = lambda dataset, records, **kwargs: self._capture(f"parquet:{dataset}", records)
+        main_new.save_to_sqlite = lambda kind, records, **kwargs: self._capture(f"sqlite:{kind}", records)
+        main_new.send_slack_message = lambda message: None
+
+    def _capture(self, sink, records):
+        self.outputs[sink].update(_output_key(record) for record in records)
+
+    def _sheet_capture(self, default_sheet):
+        def write(data, sheet_name=default_sheet, **kwargs):
+            self._capture(f"sheets:{sheet_name}", data)
+        return write
+
+    def _capture_batch(self, table, data_list, transaction_ids, **kwargs):
+        for record, transaction_id in zip(data_list, transaction_ids):
+            self.records[table].setdefault(transaction_id, record)
+        self.outputs["supabase:trades"].update(transaction_ids)
+        return len(data_list)
+
+    def _capture_upsert(self, table, data_list, **kwargs):
+        sink = "supabase:cash_flows" if table == CASH_FLOWS_TABLE else "supabase:cash_events"
+        self._capture(sink, data_list)
+        return len(data_list)
+
+    def run(self, path):
+        self.records = defaultdict(dict)
+        self.outputs = defaultdict(set)
+        main_new.process_csv_file(path)
+        return self.records, self.outputs
+
+
+def values_equal(old_value, new_value, tolerance):
+    if isinstance(old_value, (int, float)) and isinstance(new_value, (int, float)):
+        return math.isclose(old_value, new_value, rel_tol=tolerance, abs_tol=tolerance)
+    return old_value == new_value
+
+
+def diff_records(old_records, new_records, ignore_fields, tolerance, report, examples):
+    for table in sorted(set(old_records) | set(new_records)):
+        old_table = old_records.get(table, {})
+        new_table = new_records.get(table, {})
+        only_old = old_table.keys() - new_table.keys()
+        only_new = new_table.keys() - old_table.keys()
+        report[f"{table}: only in main_old"] += len(only_old)
+        report[f"{table}: only in main"] += len(only_new)
+        for transaction_id in sorted(only_old)[:examples]:
+            report.setdefault("_examples", []).append(("only_old", table, transaction_id, old_table[transaction_id].get("ticker")))
+        for transaction_id in sorted(only_new)[:examples]:
+            report.setdefault("_examples", []).append(("only_new", table, transaction_id, new_table[transaction_id].get("ticker")))
+
+        for transaction_id in old_table.keys() & new_table.keys():
+            old_record, new_record = old_table[transaction_id], new_table[transaction_id]
+            report[f"{table}: matched"] += 1
+            for field in (old_record.keys() | new_record.keys()) - ignore_fields:
+                if field not in old_record:
+                    if field not in NEW_ONLY_FIELDS:
+                        report[f"{table}.{field}: missing in main_old"] += 1
+                    continue
+                if field not in new_record:
+                    report[f"{table}.{field}: missing in main"] += 1
+                    continue
+                normalize = FIELD_NORMALIZERS.get(field, lambda value: value)
+                if not values_equal(normalize(old_record[field]), normalize(new_record[field]), tolerance):
+                    report[f"{table}.{field}: value differs"] += 1
+                    if sum(1 for e in report.get("_examples", []) if e[0] == field) < examples:
+                        report.setdefault("_examples", []).append(
+                            (field, table, transaction_id, f"{old_record[field]!r} != {new_record[field]!r}")
+                        )
+
+
+def check_new_outputs(outputs, report, examples):
+    """Every sink of one output kind must have received the same keys."""
+    for kind, sinks in NEW_OUTPUT_GROUPS.items():
+        reference = outputs.get(sinks[0], set())
+        report[f"{kind}: {sinks[0]} rows"] += len(reference)
+        for sink in sinks[1:]:
+            missing = reference - outputs.get(sink, set())
+            extra = outputs.get(sink, set()) - reference
+            report[f"{kind}: missing in {sink}"] += len(missing)
+            report[f"{kind}: only in {sink}"] += len(extra)
+            for key in sorted(missing | extra)[:examples]:
+                report.setdefault("_examples", []).append((kind, sink, key, "missing" if key in missing else "extra"))
+
+
+def collect_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, "**", "*.csv"), recursive=True))
+        else:
+            files.extend(glob.glob(item, recursive=True))
+    return sorted(set(files))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff main_old and main pipeline outputs.")
+    parser.add_argument("inputs", nargs="*", help="Statement files, directories or glob patterns")
+    parser.add_argument("--generate", type=int, default=0, help="Add N synthetic statements to the corpus")
+    parser.add_argument("--trades-per-file", type=int, default=500)
+    parser.add_argument("--timestamp-format", default=TIMESTAMP_FORMAT,
+                        help="Trades Date/Time format of the synthetic corpus; one normalize_timestamps does not "
+                             "recognize checks that raw executed_at values pass through enrichment and every sink")
+    parser.add_argument("--ignore-fields", default="", help="Comma-separated fields to skip when diffing")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Relative/absolute float tolerance")
+    parser.add_argument("--examples", type=int, default=3, help="Examples to print per difference kind")
+    args = parser.parse_args(argv)
+
+    # main_old warns per unparsable row on the root logger; the diff reports those rows anyway
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger("investflow").setLevel(logging.WARNING)
+
+    files = collect_files(args.inputs)
+    work_dir = None
+    if args.generate:
+        work_dir = tempfile.mkdtemp(prefix="investflow-diff-")
+        for index in range(args.generate):
+            path = os.path.join(work_dir, f"U0000000_202501{index + 1:02d}.csv")
+            # Synthetic corpus without T-bills: main_old only knows stocks and options
+            generate_statement(path, stocks=int(args.trades_per_file * 0.6), options=int(args.trades_per_file * 0.4),
+                               bonds=0, seed=index, timestamp_format=args.timestamp_format)
+            files.append(path)
+    if not files:
+        parser.error("no statements given (pass paths or --generate N)")
+
+    old_pipeline, new_pipeline = OldPipeline(), NewPipeline()
+    ignore_fields = {field for field in args.ignore_fields.split(",") if field}
+    report = Counter()
+    timings = []
+
+    for path in files:
+        start = time.perf_counter()
+        old_records = old_pipeline.run(path)
+        old_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        new_records, new_outputs = new_pipeline.run(path)
+        new_seconds = time.perf_counter() - start
+        timings.append((os.path.basename(path), old_seconds, new_seconds))
+        diff_records(old_records, new_records, ignore_fields, args.tolerance, report, args.examples)
+        check_new_outputs(new_outputs, report, args.examples)
+
+    print(f"{'file':<40}{'main_old s':>12}{'main s':>10}")
+    for name, old_seconds, new_seconds in timings:
+        print(f"{name:<40}{old_seconds:>12.3f}{new_seconds:>10.3f}")
+    print(f"{'total':<40}{sum(t[1] for t in timings):>12.3f}{sum(t[2] for t in timings):>10.3f}")
+    print()
+
+    examples = report.pop("_examples", [])
+    differences = 0
+    for key, count in sorted(report.items()):
+        if not count:
+            continue
+        print(f"{key:<60}{count:>8}")
+        if not key.endswith(("matched", "rows")):
+            differences += count
+    for kind, table, transaction_id, detail in examples:
+        print(f"  e.g. [{kind}] {table} {transaction_id}: {detail}")
+
+    print()
+    print("✅ No differences" if not differences else f"❌ {differences} difference(s)")
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()
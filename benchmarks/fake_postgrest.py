@@ -0,0 +1,240 @@
+"""
+Local stand-in for the Supabase PostgREST endpoint.
+
+In-memory tables with a unique transaction_id, the filter operators the
+pipeline uses (in., eq., gt., gte., lt., lte.), select/limit/offset, and
+the Prefer resolution=ignore-duplicates / merge-duplicates and
+return=representation headers. Latency and HTTP 500 errors can be
+injected per request. POSTs to /webhook/... are accepted as a fake Slack
+incoming webhook and kept in `webhook_messages`.
+
+Usage:
+    server = FakePostgrest(latency_ms=20).start()
+    supabase_service.SUPABASE_URL = server.url
+    ...
+    server.stop()
+
+Or standalone:
+    python benchmarks/fake_postgrest.py --port 54321 --latency-ms 20
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+UNIQUE_KEY = "transaction_id"
+
+
+class FakePostgrest:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.tables = defaultdict(dict)  # table -> {transaction_id: row}
+        self.stats = Counter()
+        self.webhook_messages = []
+        self.lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def seed_rows(self, table, rows):
+        with self.lock:
+            for row in rows:
+                self.tables[table][row[UNIQUE_KEY]] = row
+
+    def reset(self):
+        with self.lock:
+            self.tables.clear()
+            self.stats.clear()
+            self.webhook_messages.clear()
+
+    # --- request handling ---
+
+    def _delay_and_maybe_fail(self):
+        with self.lock:
+            delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+            fail = self.error_rate and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+        return fail
+
+    def handle_get(self, table, params):
+        select = None
+        limit = offset = None
+        filters = []
+        for key, value in params:
+            if key == "select":
+                select = [col.strip() for col in value.split(",")] if value != "*" else None
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key == "order":
+                continue
+            else:
+                filters.append((key, value))
+
+        with self.lock:
+            rows = [row for row in self.tables[table].values() if all(_matches(row, key, value) for key, value in filters)]
+        rows.sort(key=lambda row: str(row.get(UNIQUE_KEY)))
+        if offset:
+            rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        if select:
+            rows = [{col: row.get(col) for col in select} for row in rows]
+        return 200, rows
+
+    def handle_post(self, table, body, prefer):
+        rows = body if isinstance(body, list) else [body]
+        ignore_duplicates = "resolution=ignore-duplicates" in prefer
+        merge_duplicates = "resolution=merge-duplicates" in prefer
+        with self.lock:
+            existing = self.tables[table]
+            if not (ignore_duplicates or merge_duplicates):
+                seen = set()
+                for row in rows:
+                    key = row.get(UNIQUE_KEY)
+                    if key in existing or key in seen:
+                        return 409, {
+                            "code": "23505",
+                            "message": f'duplicate key value violates unique constraint "{table}_{UNIQUE_KEY}_key"',
+                        }
+                    seen.add(key)
+            written = []
+            for row in rows:
+                key = row.get(UNIQUE_KEY)
+                if key in existing and ignore_duplicates:
+                    continue
+                existing[key] = row
+                written.append(row)
+        if "return=representation" in prefer:
+            return 201, written
+        return 201, None
+
+
+def _matches(row, column, expression):
+    operator, _, operand = expression.partition(".")
+    value = row.get(column)
+    if operator == "in":
+        return str(value) in set(operand.strip("()").split(","))
+    if operator == "eq":
+        return str(value) == operand
+    if value is None:
+        return False
+    if operator == "gte":
+        return str(value) >= operand
+    if operator == "gt":
+        return str(value) > operand
+    if operator == "lte":
+        return str(value) <= operand
+    if operator == "lt":
+        return str(value) < operand
+    return True
+
+
+def _make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _table(self):
+            parts = urlsplit(self.path)
+            prefix = "/rest/v1/"
+            if not parts.path.startswith(prefix):
+                return None, []
+            return parts.path[len(prefix):], parse_qsl(parts.query, keep_blank_values=True)
+
+        def do_GET(self):
+            table, params = self._table()
+            with fake.lock:
+                fake.stats["GET"] += 1
+            if table is None:
+                return self._send(404, {"message": "not found"})
+            if fake._delay_and_maybe_fail():
+                return self._send(500, {"message": "injected error"})
+            self._send(*fake.handle_get(table, params))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if self.path.startswith("/webhook"):
+                return self._webhook(raw)
+            table, _ = self._table()
+            with fake.lock:
+                fake.stats["POST"] += 1
+            if table is None:
+                return self._send(404, {"message": "not found"})
+            if fake._delay_and_maybe_fail():
+                return self._send(500, {"message": "injected error"})
+            try:
+                body = json.loads(raw or b"[]")
+            except ValueError:
+                return self._send(400, {"message": "invalid JSON"})
+            self._send(*fake.handle_post(table, body, self.headers.get("Prefer", "")))
+
+        def _webhook(self, raw):
+            with fake.lock:
+                fake.stats["WEBHOOK"] += 1
+            fake._delay_and_maybe_fail()
+            with fake.lock:
+                fake.webhook_messages.append(raw.decode("utf-8", "replace"))
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fake PostgREST endpoint.")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server = FakePostgrest(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           error_rate=args.error_rate)
+    print(f"Fake PostgREST listening on {server.url} (set SUPABASE_URL to this)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+In-process fakes for Google Cloud Storage and gspread worksheets.
+
+Used by the load and differential harnesses together with fake_postgrest
+(Supabase and the Slack webhook). Every fake call can sleep for a
+configurable latency to approximate the real API round trip.
+"""
+import sys
+import time
+import types
+import base64
+import shutil
+import hashlib
+import threading
+
+
+def _sleep_ms(latency_ms):
+    if latency_ms:
+        time.sleep(latency_ms / 1000)
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = None
+
+    @property
+    def _source(self):
+        return self.bucket.objects.get(self.name)
+
+    @property
+    def generation(self):
+        return self.bucket.generations.get(self.name)
+
+    @property
+    def md5_hash(self):
+        data = self._read()
+        return base64.b64encode(hashlib.md5(data).digest()).decode() if data is not None else None
+
+    crc32c = None
+
+    def _read(self):
+        source = self._source
+        if source is None:
+            return None
+        if isinstance(source, bytes):
+            return source
+        with open(source, "rb") as f:
+            return f.read()
+
+    def exists(self):
+        _sleep_ms(self.bucket.client.latency_ms)
+        return self.name in self.bucket.objects
+
+    def download_to_filename(self, filename):
+        _sleep_ms(self.bucket.client.latency_ms)
+        source = self._source
+        if source is None:
+            raise FileNotFoundError(self.name)
+        if isinstance(source, bytes):
+            with open(filename, "wb") as f:
+                f.write(source)
+        else:
+            shutil.copyfile(source, filename)
+
+    def download_as_bytes(self):
+        _sleep_ms(self.bucket.client.latency_ms)
+        data = self._read()
+        if data is None:
+            raise FileNotFoundError(self.name)
+        return data
+
+    def open(self, mode="r", **kwargs):
+        _sleep_ms(self.bucket.client.latency_ms)
+        source = self._source
+        if isinstance(source, bytes):
+            import io
+            return io.StringIO(source.decode("utf-8-sig")) if "b" not in mode else io.BytesIO(source)
+        return open(source, mode, encoding=None if "b" in mode else "utf-8-sig")
+
+    def upload_from_string(self, data, **kwargs):
+        _sleep_ms(self.bucket.client.latency_ms)
+        self.bucket.put(self.name, data.encode("utf-8") if isinstance(data, str) else data)
+
+    def upload_from_filename(self, filename, **kwargs):
+        with open(filename, "rb") as f:
+            self.upload_from_string(f.read())
+
+    def delete(self):
+        _sleep_ms(self.bucket.client.latency_ms)
+        self.bucket.objects.pop(self.name, None)
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.objects = {}       # name -> local path or bytes
+        self.generations = {}
+        self._lock = threading.Lock()
+
+    def add_file(self, name, path):
+        self.put(name, path)
+
+    def put(self, name, source):
+        with self._lock:
+            self.objects[name] = source
+            self.generations[name] = self.generations.get(name, 0) + 1
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        _sleep_ms(self.client.latency_ms)
+        return FakeBlob(self, name) if name in self.objects else None
+
+    def list_blobs(self, prefix=""):
+        return [FakeBlob(self, name) for name in sorted(self.objects) if name.startswith(prefix)]
+
+
+class FakeStorageClient:
+    """Stands in for google.cloud.storage.Client; buckets are shared by all instances."""
+    buckets = {}
+    latency_ms = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def bucket(self, name):
+        if name not in FakeStorageClient.buckets:
+            FakeStorageClient.buckets[name] = FakeBucket(self, name)
+        return FakeStorageClient.buckets[name]
+
+
+def install_fake_storage(latency_ms=0.0):
+    """Make `from google.cloud import storage` resolve to the fake client."""
+    FakeStorageClient.latency_ms = latency_ms
+    fake_module = types.ModuleType("google.cloud.storage")
+    fake_module.Client = FakeStorageClient
+    try:
+        import google.cloud as google_cloud
+    except ImportError:
+        google = sys.modules.setdefault("google", types.ModuleType("google"))
+        google_cloud = types.ModuleType("google.cloud")
+        google.cloud = google_cloud
+        sys.modules["google.cloud"] = google_cloud
+    google_cloud.storage = fake_module
+    sys.modules["google.cloud.storage"] = fake_module
+    return FakeStorageClient()
+
+
+class FakeWorksheet:
+    """Minimal gspread.Worksheet covering the calls made by sheets_service."""
+
+    def __init__(self, title, latency_ms=0.0, rows=2000):
+        self.title = title
+        self.latency_ms = latency_ms
+        self.row_count = rows
+        self.values = []
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.requests += 1
+        _sleep_ms(self.latency_ms)
+
+    def col_values(self, col):
+        self._call()
+        return [row[col - 1] if len(row) >= col else "" for row in self.values]
+
+    def row_values(self, row):
+        self._call()
+        return self.values[row - 1] if len(self.values) >= row else []
+
+    def get_all_values(self):
+        self._call()
+        return [list(row) for row in self.values]
+
+    def append_row(self, row):
+        self._call()
+        with self._lock:
+            self.values.append(list(row))
+
+    def append_rows(self, rows):
+        self._call()
+        with self._lock:
+            self.values.extend(list(row) for row in rows)
+
+    def resize(self, rows=None, cols=None):
+        self._call()
+        if rows:
+            self.row_count = rows
+
+    def clear(self):
+        self._call()
+        with self._lock:
+            self.values = []
+
+    def update(self, *args, **kwargs):
+        self._call()
+        values = kwargs.get("values")
+        if values is None:
+            values = next((arg for arg in args if isinstance(arg, list)), [])
+        with self._lock:
+            self.values = [list(row) for row in values]
+
+
+class FakeSpreadsheet:
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.worksheets = {}
+
+    def worksheet(self, name):
+        if name not in self.worksheets:
+            self.worksheets[name] = FakeWorksheet(name, self.latency_ms)
+        return self.worksheets[name]
+
+
+def install_fake_sheets(sheets_service, latency_ms=0.0, skip_throttle=False):
+    """
+    Route sheets_service to an in-memory spreadsheet.
+
+    Args:
+        sheets_service: The imported services.sheets_service module
+        latency_ms: Latency added to every worksheet API call
+        skip_throttle: Also disable the 1 s rate-limit sleeps in sheets_service
+    """
+    spreadsheet = FakeSpreadsheet(latency_ms)
+    sheets_service.GOOGLE_SHEETS_CREDENTIALS_FILE = sheets_service.GOOGLE_SHEETS_CREDENTIALS_FILE or "fake.json"
+    sheets_service.GOOGLE_SHEET_ID = sheets_service.GOOGLE_SHEET_ID or "fake-sheet"
+
+    def _get_worksheet(sheet_name):
+        _sleep_ms(latency_ms)  # auth + open_by_key round trip
+        return spreadsheet.worksheet(sheet_name)
+
+    sheets_service._get_worksheet = _get_worksheet
+    if skip_throttle:
+        sheets_service.time = types.SimpleNamespace(sleep=lambda seconds: None, perf_counter=time.perf_counter)
+    return spreadsheet
@@ -0,0 +1,218 @@
+"""
+End-to-end load harness for main_cloud_function.
+
+Generates N synthetic statements, uploads them to a fake GCS bucket and
+replays one finalize event per statement through main_cloud_function.
+Storage, Supabase (fake PostgREST), gspread and the Slack webhook are all
+in-process fakes with configurable latency. Reports p50/p95/p99 latency,
+cold vs warm invocations, throughput and, per invocation, the peak RSS
+sampled while it ran and its growth over the RSS it started with.
+
+Usage:
+    python benchmarks/load_harness.py --events 20 --trades-per-file 2000 --supabase-latency-ms 30
+"""
+import os
+import sys
+import time
+import base64
+import hashlib
+import logging
+import threading
+import argparse
+import resource
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cloud_function"))
+
+from statement_generator import generate_statement  # noqa: E402
+from fake_postgrest import FakePostgrest  # noqa: E402
+from fakes import install_fake_storage, install_fake_sheets  # noqa: E402
+
+BUCKET = "load-harness-bucket"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def current_rss_mib():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return 0.0
+
+
+def max_rss_mib():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+class RssSampler:
+    """
+    Samples the process RSS in a background thread and tracks the peak seen
+    while each invocation runs.
+
+    ru_maxrss is the high-water mark of the whole process, so after the
+    first invocation it only repeats the running maximum. With concurrent
+    invocations the samples still cover the whole process, so overlapping
+    runs share their peaks.
+    """
+
+    def __init__(self, interval_seconds=0.01):
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()
+        self.active = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def begin(self, key):
+        rss = current_rss_mib()
+        with self.lock:
+            self.active[key] = [rss, rss]
+
+    def end(self, key):
+        """(RSS at start, peak RSS) of the invocation, in MiB."""
+        rss = current_rss_mib()
+        with self.lock:
+            start, peak = self.active.pop(key)
+        return start, max(peak, rss)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval_seconds):
+            rss = current_rss_mib()
+            with self.lock:
+                for window in self.active.values():
+                    window[1] = max(window[1], rss)
+
+
+def build_events(bucket, work_dir, count, trades_per_file, overlap):
+    events = []
+    first_day = date(2025, 1, 2)
+    for index in range(count):
+        name = f"U0000000_{(first_day + timedelta(days=index)).strftime('%Y%m%d')}.csv"
+        path = os.path.join(work_dir, name)
+        # overlap > 0 reuses seeds so consecutive statements repeat transactions
+        seed = index if not overlap else index // max(1, int(1 / overlap))
+        generate_statement(path, stocks=int(trades_per_file * 0.6), options=int(trades_per_file * 0.39),
+                           bonds=max(1, trades_per_file // 100), seed=seed)
+        bucket.add_file(name, path)
+        with open(path, "rb") as f:
+            md5_hash = base64.b64encode(hashlib.md5(f.read()).digest()).decode()
+        events.append({"bucket": BUCKET, "name": name, "generation": str(index + 1), "md5Hash": md5_hash})
+    return events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay synthetic GCS events through main_cloud_function.")
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--trades-per-file", type=int, default=1000)
+    parser.add_argument("--overlap", type=float, default=0.0, help="Fraction of statements repeating an earlier one")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent invocations (instances)")
+    parser.add_argument("--storage-latency-ms", type=float, default=20.0)
+    parser.add_argument("--supabase-latency-ms", type=float, default=30.0)
+    parser.add_argument("--sheets-latency-ms", type=float, default=150.0)
+    parser.add_argument("--slack-latency-ms", type=float, default=100.0)
+    parser.add_argument("--keep-sheets-throttle", action="store_true", help="Keep the 1 s sleeps between Sheets batches")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="investflow-load-")
+    supabase = FakePostgrest(latency_ms=args.supabase_latency_ms).start()
+    slack = FakePostgrest(latency_ms=args.slack_latency_ms).start()
+
+    # Environment must be set before the pipeline modules read it at import time
+    os.environ.update({
+        "BUCKET_NAME": BUCKET,
+        "STATE_BUCKET_NAME": f"{BUCKET}-state",
+        "SUPABASE_URL": supabase.url,
+        "SUPABASE_API_KEY": "fake-key",
+        "SLACK_WEBHOOK_URL": f"{slack.url}/webhook/slack",
+        "IDEMPOTENCY_BACKEND": "sqlite",
+        "IDEMPOTENCY_DB_PATH": os.path.join(work_dir, "idempotency.db"),
+        "CHECKPOINT_BACKEND": "local",
+        "CHECKPOINT_DIR": os.path.join(work_dir, "checkpoints"),
+        "POSITIONS_BACKEND": "local",
+        "POSITIONS_DIR": os.path.join(work_dir, "positions"),
+        "SPOOL_BACKEND": "local",
+        "SPOOL_DIR": os.path.join(work_dir, "spool"),
+    })
+    storage_client = install_fake_storage(args.storage_latency_ms)
+
+    import main as pipeline  # noqa: E402
+    from services import sheets_service  # noqa: E402
+    spreadsheet = install_fake_sheets(sheets_service, args.sheets_latency_ms, skip_throttle=not args.keep_sheets_throttle)
+    if not args.verbose:
+        logging.getLogger("investflow").setLevel(logging.WARNING)
+
+    bucket = storage_client.bucket(BUCKET)
+    print(f"Generating {args.events} statement(s) with ~{args.trades_per_file} trades each...")
+    events = build_events(bucket, work_dir, args.events, args.trades_per_file, args.overlap)
+
+    latencies = []
+    rss_peaks = []
+    rss_growth = []
+    sampler = RssSampler().start()
+
+    def invoke(event):
+        sampler.begin(event["name"])
+        start = time.perf_counter()
+        pipeline.main_cloud_function(event, None)
+        elapsed = time.perf_counter() - start
+        rss_start, rss_peak = sampler.end(event["name"])
+        latencies.append(elapsed)
+        rss_peaks.append(rss_peak)
+        rss_growth.append(rss_peak - rss_start)
+        return elapsed
+
+    wall_start = time.perf_counter()
+    if args.concurrency > 1:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(invoke, events))
+    else:
+        for event in events:
+            invoke(event)
+    wall = time.perf_counter() - wall_start
+    sampler.stop()
+
+    supabase.stop()
+    slack.stop()
+
+    cold, warm = latencies[0], latencies[1:]
+    print()
+    print(f"Invocations:      {len(latencies)} ({args.concurrency} concurrent)")
+    print(f"Throughput:       {len(latencies) / wall:.2f} files/s, "
+          f"{sum(len(t) for t in supabase.tables.values()) / wall:.0f} stored rows/s")
+    print(f"Latency p50/p95/p99: {percentile(latencies, 50):.3f} / {percentile(latencies, 95):.3f} / "
+          f"{percentile(latencies, 99):.3f} s")
+    print(f"Cold (first):     {cold:.3f} s")
+    if warm:
+        print(f"Warm mean:        {sum(warm) / len(warm):.3f} s")
+    print(f"Peak RSS per invocation p50/max: {percentile(rss_peaks, 50):.1f} / {max(rss_peaks):.1f} MiB, "
+          f"growth during it p50/max: {percentile(rss_growth, 50):.1f} / {max(rss_growth):.1f} MiB")
+    print(f"Process RSS:      high-water {max_rss_mib():.1f} MiB, current {current_rss_mib():.1f} MiB")
+    print(f"Supabase requests: GET {supabase.stats['GET']}, POST {supabase.stats['POST']}; "
+          f"rows stored {sum(len(t) for t in supabase.tables.values())}")
+    print(f"Sheets requests:  {sum(ws.requests for ws in spreadsheet.worksheets.values())}; "
+          f"Slack messages: {len(slack.webhook_messages)}")
+
+
+if __name__ == "__main__":
+    main()
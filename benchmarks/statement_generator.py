@@ -0,0 +1,236 @@
+"""
+Synthetic IBKR activity statement generator.
+
+Writes multi-section CSV statements shaped like real IBKR exports: Trades
+blocks per asset category (stocks, equity and index options, treasury
+bills), a multi-currency Cash Report, dividends, withholding tax, interest,
+fees, base currency exchange rates and noise sections the pipeline is
+expected to ignore.
+
+Usage:
+    python benchmarks/statement_generator.py out.csv --stocks 1000 --options 500 --bonds 10
+"""
+import os
+import csv
+import random
+import argparse
+from datetime import datetime, timedelta
+
+TRADES_HEADER = [
+    "DataDiscriminator", "Asset Category", "Currency", "Symbol", "Date/Time", "Quantity",
+    "T. Price", "C. Price", "Proceeds", "Comm/Fee", "Basis", "Realized P/L", "MTM P/L", "Code",
+]
+STOCK_TICKERS = ["AAPL", "MSFT", "ANET", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "AMD", "JPM", "KO", "PEP"]
+EUR_TICKERS = ["ASML", "SAP", "SIE", "ALV"]
+CASH_LINES = [
+    "Starting Cash", "Commissions", "Deposits", "Withdrawals", "Dividends", "Withholding Tax",
+    "Broker Interest Received", "Other Fees", "Net Trades (Sales)", "Net Trades (Purchase)",
+]
+NOISE_SECTIONS = {
+    "Net Asset Value": ["Asset Class", "Prior Total", "Current Long", "Current Short", "Current Total", "Change"],
+    "Mark-to-Market Performance Summary": ["Asset Category", "Symbol", "Prior Quantity", "Current Quantity", "Mark-to-Market P/L Total"],
+    "Open Positions": ["DataDiscriminator", "Asset Category", "Currency", "Symbol", "Quantity", "Mult", "Cost Price", "Close Price", "Value"],
+    "Financial Instrument Information": ["Asset Category", "Symbol", "Description", "Conid", "Security ID", "Listing Exch", "Multiplier", "Type"],
+}
+FX_RATES = {"USD": 3.75, "EUR": 4.28, "PLN": 1.0}
+# Trades Date/Time as IBKR activity statements write it (after the comma is stripped: "%Y-%m-%d %H:%M:%S")
+TIMESTAMP_FORMAT = "%Y-%m-%d, %H:%M:%S"
+
+
+def generate_statement(
+    path,
+    stocks=1000,
+    options=500,
+    bonds=10,
+    currencies=("USD", "PLN", "EUR"),
+    noise_rows=50,
+    start=datetime(2024, 1, 2, 9, 30),
+    seed=0,
+    timestamp_format=TIMESTAMP_FORMAT,
+):
+    """
+    Write a synthetic statement and return the number of trade rows written.
+
+    Args:
+        path: Output CSV path (use a `_YYYYMMDD.csv` suffix so the statement date can be parsed)
+        stocks, options, bonds: Number of trade rows per asset category
+        currencies: Cash Report currencies (the first one is used for options and bonds)
+        noise_rows: Rows per noise section
+        start: Timestamp of the first trade
+        seed: Random seed, the same seed always produces the same file
+        timestamp_format: strftime format of the Trades Date/Time column
+    """
+    rng = random.Random(seed)
+    trade_currency = currencies[0]
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Statement", "Header", "Field Name", "Field Value"])
+        writer.writerow(["Statement", "Data", "Title", "Activity Statement"])
+        writer.writerow(["Account Information", "Header", "Field Name", "Field Value"])
+        writer.writerow(["Account Information", "Data", "Base Currency", "PLN"])
+
+        _write_noise(writer, "Net Asset Value", noise_rows, rng)
+
+        if stocks:
+            writer.writerow(["Trades", "Header"] + TRADES_HEADER)
+            for row in _stock_rows(stocks, start, currencies, rng, timestamp_format):
+                writer.writerow(["Trades", "Data"] + row)
+            writer.writerow(["Trades", "Total", "", "Stocks", trade_currency] + [""] * 11)
+        if options:
+            writer.writerow(["Trades", "Header"] + TRADES_HEADER)
+            for row in _option_rows(options, start, trade_currency, rng, timestamp_format):
+                writer.writerow(["Trades", "Data"] + row)
+            writer.writerow(["Trades", "Total", "", "Equity and Index Options", trade_currency] + [""] * 11)
+        if bonds:
+            writer.writerow(["Trades", "Header"] + TRADES_HEADER)
+            for row in _bond_rows(bonds, start, trade_currency, rng, timestamp_format):
+                writer.writerow(["Trades", "Data"] + row)
+
+        _write_cash_report(writer, currencies, rng)
+        _write_cash_events(writer, trade_currency, start, rng)
+
+        writer.writerow(["Base Currency Exchange Rate", "Header", "Currency", "Rate"])
+        for currency in currencies:
+            if currency != "PLN":
+                writer.writerow(["Base Currency Exchange Rate", "Data", currency, FX_RATES.get(currency, 1.0)])
+
+        for section in ("Mark-to-Market Performance Summary", "Open Positions", "Financial Instrument Information"):
+            _write_noise(writer, section, noise_rows, rng)
+
+    return stocks + options + bonds
+
+
+def _timestamps(count, start, rng):
+    current = start
+    for _ in range(count):
+        current += timedelta(seconds=rng.randint(1, 3600))
+        yield current
+
+
+def _format_quantity(quantity):
+    # IBKR uses thousands separators for large quantities
+    return f"{quantity:,}" if abs(quantity) >= 1000 else str(quantity)
+
+
+def _stock_rows(count, start, currencies, rng, timestamp_format=TIMESTAMP_FORMAT):
+    eur_enabled = "EUR" in currencies
+    for executed_at in _timestamps(count, start, rng):
+        if eur_enabled and rng.random() < 0.15:
+            currency, symbol = "EUR", rng.choice(EUR_TICKERS)
+        else:
+            currency, symbol = currencies[0], rng.choice(STOCK_TICKERS)
+        quantity = rng.choice([1, 5, 10, 25, 50, 100, 200, 1500]) * rng.choice([1, -1])
+        price = round(rng.uniform(10, 900), 4)
+        proceeds = round(-quantity * price, 2)
+        fee = round(-max(1.0, abs(quantity) * 0.005), 2)
+        code = "O" if quantity > 0 else rng.choice(["C", "C;P", "O"])
+        yield [
+            "Order", "Stocks", currency, symbol, executed_at.strftime(timestamp_format),
+            _format_quantity(quantity), price, round(price * rng.uniform(0.98, 1.02), 2), proceeds, fee,
+            round(-proceeds - fee, 2), 0, round(rng.uniform(-50, 50), 2), code,
+        ]
+
+
+def _option_rows(count, start, currency, rng, timestamp_format=TIMESTAMP_FORMAT):
+    for executed_at in _timestamps(count, start, rng):
+        underlying = rng.choice(STOCK_TICKERS)
+        expiry = executed_at + timedelta(days=rng.choice([3, 7, 14, 30, 45]))
+        strike = rng.choice([50, 95, 100, 107, 110, 150, 200, 250.5])
+        right = rng.choice(["P", "C"])
+        symbol = f"{underlying} {expiry.strftime('%d%b%y').upper()} {strike:g} {right}"
+        roll = rng.random()
+        if roll < 0.6:
+            quantity, code = -rng.randint(1, 10), "O"
+        elif roll < 0.85:
+            quantity, code = rng.randint(1, 10), "C"
+        elif roll < 0.95:
+            quantity, code = rng.randint(1, 10), "C;Ep"
+        else:
+            quantity, code = rng.randint(1, 3), "A;C"
+        price = 0.0 if "Ep" in code or "A" in code else round(rng.uniform(0.05, 12), 2)
+        proceeds = round(-quantity * price * 100, 2)
+        fee = 0.0 if price == 0 else round(-1.05 * abs(quantity), 2)
+        yield [
+            "Order", "Equity and Index Options", currency, symbol, executed_at.strftime(timestamp_format),
+            quantity, price, price, proceeds, fee, round(-proceeds - fee, 2), 0, 0, code,
+        ]
+
+
+def _bond_rows(count, start, currency, rng, timestamp_format=TIMESTAMP_FORMAT):
+    for index, executed_at in enumerate(_timestamps(count, start, rng)):
+        quantity = rng.choice([1000, 5000, 10000, 25000])
+        price = round(rng.uniform(97, 99.9), 4)
+        proceeds = round(-quantity * price / 100, 2)
+        yield [
+            "Order", "Treasury Bills", currency, f"912797K{index % 10}{rng.randint(0, 9)}",
+            executed_at.strftime(timestamp_format), _format_quantity(quantity), price, price,
+            proceeds, -5, round(-proceeds + 5, 2), 0, 0, "O",
+        ]
+
+
+def _write_cash_report(writer, currencies, rng):
+    header = ["Currency Summary", "Currency", "Total", "Securities", "Futures", "Month to Date", "Year to Date", ""]
+    writer.writerow(["Cash Report", "Header"] + header)
+    for currency in ("Base Currency Summary",) + tuple(currencies):
+        total = 0.0
+        for line in CASH_LINES:
+            value = round(rng.uniform(-5000, 20000) if line == "Starting Cash" else rng.uniform(-2000, 2000), 2)
+            total += value
+            writer.writerow(["Cash Report", "Data", line, currency, value, value, 0, value, value, ""])
+        total = round(total, 2)
+        writer.writerow(["Cash Report", "Data", "Ending Cash", currency, total, total, 0, "", "", ""])
+
+
+def _write_cash_events(writer, currency, start, rng, count=12):
+    """Dividends, Withholding Tax, Interest and Fees, each with a trailing Total row."""
+    layouts = {
+        "Dividends": (["Currency", "Date", "Description", "Amount"], "Cash Dividend USD 0.25 per Share (Ordinary Dividend)", (1, 300)),
+        "Withholding Tax": (["Currency", "Date", "Description", "Amount", "Code"], "Cash Dividend - US Tax", (-45, -0.1)),
+        "Interest": (["Currency", "Date", "Description", "Amount"], "Credit Interest for Mar-2025", (0.1, 80)),
+        "Fees": (["Subtitle", "Currency", "Date", "Description", "Amount"], "Market data subscription", (-15, -1)),
+    }
+    for section, (header, description, (low, high)) in layouts.items():
+        writer.writerow([section, "Header"] + header)
+        total = 0.0
+        for i in range(count):
+            amount = round(rng.uniform(low, high), 2)
+            total += amount
+            day = (start + timedelta(days=7 * i)).strftime("%Y-%m-%d")
+            values = {"Currency": currency, "Date": day, "Description": f"{rng.choice(STOCK_TICKERS)} {description}",
+                      "Amount": amount, "Code": "", "Subtitle": "Other Fees"}
+            writer.writerow([section, "Data"] + [values[column] for column in header])
+        totals = {"Currency": "Total", "Amount": round(total, 2)}
+        writer.writerow([section, "Data"] + [totals.get(column, "") for column in header])
+
+
+def _write_noise(writer, section, rows, rng):
+    header = NOISE_SECTIONS[section]
+    writer.writerow([section, "Header"] + header)
+    for _ in range(rows):
+        writer.writerow([section, "Data"] + [rng.choice(STOCK_TICKERS) if i % 2 else round(rng.uniform(0, 1000), 2) for i in range(len(header))])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic IBKR activity statement.")
+    parser.add_argument("path", help="Output CSV path, e.g. statements/U0000000_20250423.csv")
+    parser.add_argument("--stocks", type=int, default=1000)
+    parser.add_argument("--options", type=int, default=500)
+    parser.add_argument("--bonds", type=int, default=10)
+    parser.add_argument("--currencies", default="USD,PLN,EUR", help="Comma-separated Cash Report currencies")
+    parser.add_argument("--noise-rows", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timestamp-format", default=TIMESTAMP_FORMAT, help="strftime format of Trades Date/Time")
+    args = parser.parse_args(argv)
+
+    rows = generate_statement(
+        args.path, stocks=args.stocks, options=args.options, bonds=args.bonds,
+        currencies=tuple(args.currencies.split(",")), noise_rows=args.noise_rows, seed=args.seed,
+        timestamp_format=args.timestamp_format,
+    )
+    print(f"Wrote {rows} trade rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import re
+import json
+from typing import Any, Dict, Iterable, List, Set
+from utils.logger import logger
+
+APPLIED_PREFIX = "applied/"
+LEDGER_VERSION = 1
+
+_MONTH = re.compile(r"\d{4}-\d{2}$")
+
+
+def applied_month(record: Dict[str, Any]) -> str:
+    """Ledger shard of a record: the YYYY-MM of its executed_at, or "undated" for raw timestamps."""
+    month = str(record.get("executed_at") or "")[:7]
+    return month if _MONTH.match(month) else "undated"
+
+
+class AppliedLedger:
+    """
+    Transaction IDs the positions and P&L snapshots have already absorbed.
+
+    IDs are kept next to the snapshots in one blob per trade month
+    ("applied/2025-04.json"), so a statement reads and rewrites only the
+    months its trades fall in, not the whole history, and the snapshots
+    themselves stay proportional to the open positions. A record is skipped
+    only if its own transaction_id was applied before, so statements can
+    arrive in any order (late uploads, a second account, backfills after
+    daily runs) while re-applying a statement is still a no-op.
+
+    Args:
+        store: Blob store holding the snapshots
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.shards: Dict[str, Set[str]] = {}
+        self.dirty: Set[str] = set()
+        self.skipped = 0
+
+    def _shard(self, month: str) -> Set[str]:
+        ids = self.shards.get(month)
+        if ids is None:
+            raw = self.store.get(f"{APPLIED_PREFIX}{month}.json")
+            ids = set()
+            if raw:
+                try:
+                    state = json.loads(raw)
+                    if state.get("version") != LEDGER_VERSION:
+                        raise ValueError(f"unsupported version {state.get('version')}")
+                except ValueError as e:
+                    logger.error(f"❌ Unreadable applied-ID ledger {APPLIED_PREFIX}{month}.json, rebuild it with the backfill: {e}")
+                    raise
+                ids = set(state.get("ids", []))
+            self.shards[month] = ids
+        return ids
+
+    def claim(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Records not applied before, marked as applied (persisted by save()).
+
+        Repeats within `records` are claimed once.
+
+        Raises:
+            ValueError: if a ledger shard is unreadable
+        """
+        fresh = []
+        for record in records:
+            month = applied_month(record)
+            ids = self._shard(month)
+            if record["transaction_id"] in ids:
+                self.skipped += 1
+                continue
+            ids.add(record["transaction_id"])
+            self.dirty.add(month)
+            fresh.append(record)
+        return fresh
+
+    def is_applied(self, record: Dict[str, Any]) -> bool:
+        return record["transaction_id"] in self._shard(applied_month(record))
+
+    def save(self) -> None:
+        """Write the months that gained IDs; call it after the snapshots these IDs were applied to are saved."""
+        for month in sorted(self.dirty):
+            state = {"version": LEDGER_VERSION, "ids": sorted(self.shards[month])}
+            try:
+                self.store.put(f"{APPLIED_PREFIX}{month}.json", json.dumps(state, separators=(",", ":")).encode("utf-8"))
+            except Exception as e:
+                logger.error(f"❌ Error saving applied-ID ledger {APPLIED_PREFIX}{month}.json: {e}")
+        self.dirty.clear()
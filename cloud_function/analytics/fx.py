@@ -0,0 +1,181 @@
+import os
+import json
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.logger import logger
+
+# Environment variables
+BASE_CURRENCY = os.getenv("BASE_CURRENCY", "")  # used when statements don't list their base currency
+FX_SNAPSHOT = "fx_rates.json"
+
+SNAPSHOT_VERSION = 1
+
+
+class FxRateTable:
+    """
+    Date-indexed base-currency rates collected from the statements themselves.
+
+    Every statement contributes the rates of its "Base Currency Exchange
+    Rate" section under its statement date. Lookups are as-of: the latest
+    rate on or before the date, or the earliest known rate when the date
+    predates all of them. The base currency always converts at 1.
+
+    The per-currency (dates, rates) arrays are built once and memoized until
+    new rates are added, so converting a batch is one searchsorted per
+    currency instead of a lookup per row.
+
+    Args:
+        base_currency: Currency the rates convert into
+    """
+
+    def __init__(self, base_currency: str = BASE_CURRENCY):
+        self.base_currency = base_currency
+        self.rates: Dict[str, Dict[str, float]] = {}  # currency -> {date: rate}
+        self._arrays: Dict[str, tuple] = {}
+
+    def add_rates(self, date: str, rates: Dict[str, float]) -> None:
+        for currency, rate in rates.items():
+            self.rates.setdefault(currency, {})[date] = float(rate)
+            self._arrays.pop(currency, None)
+
+    def rebase(self, base_currency: str) -> None:
+        """Switch to another base currency; rates into the old one no longer apply."""
+        self.base_currency = base_currency
+        self.rates = {}
+        self._arrays = {}
+
+    def _currency_arrays(self, currency: str):
+        arrays = self._arrays.get(currency)
+        if arrays is None:
+            by_date = self.rates.get(currency, {})
+            dates = np.array(sorted(by_date), dtype="datetime64[D]")
+            arrays = (dates, np.array([by_date[str(d)] for d in dates], dtype=float))
+            self._arrays[currency] = arrays
+        return arrays
+
+    def lookup(self, currencies, dates) -> np.ndarray:
+        """
+        Rates for parallel arrays of currencies and dates (YYYY-MM-DD or longer timestamps).
+
+        Returns:
+            float array, NaN where the currency has no known rate or the date is not ISO
+        """
+        currencies = np.asarray(currencies, dtype=object)
+        # Timestamps normalize_timestamps did not recognize stay raw ("04/01/2025 10:00"); they get no rate
+        days = pd.to_datetime(
+            pd.Series([str(d)[:10] if d else None for d in dates], dtype=object), format="%Y-%m-%d", errors="coerce"
+        ).to_numpy(dtype="datetime64[D]")
+        undated = np.isnat(days)
+        result = np.full(len(currencies), np.nan)
+        for currency in set(currencies.tolist()):
+            mask = currencies == currency
+            if currency == self.base_currency:
+                result[mask] = 1.0
+                continue
+            known_dates, known_rates = self._currency_arrays(currency)
+            if not len(known_dates):
+                continue
+            index = np.searchsorted(known_dates, days[mask], side="right") - 1
+            result[mask] = known_rates[np.clip(index, 0, len(known_rates) - 1)]
+        # NaT sorts after every date, so searchsorted would have handed undated rows the latest rate
+        result[undated & (currencies != self.base_currency)] = np.nan
+        return result
+
+    def convert(self, amounts, currencies, dates) -> np.ndarray:
+        """Amounts in base currency (NaN where no rate is known)."""
+        return np.asarray(amounts, dtype=float) * self.lookup(currencies, dates)
+
+    # --- snapshot ---
+
+    def to_snapshot(self) -> bytes:
+        state = {"version": SNAPSHOT_VERSION, "base_currency": self.base_currency, "rates": self.rates}
+        return json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+    @classmethod
+    def from_snapshot(cls, raw: Optional[bytes]) -> "FxRateTable":
+        table = cls()
+        if not raw:
+            return table
+        state = json.loads(raw)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported FX snapshot version {state.get('version')}")
+        table.base_currency = state.get("base_currency") or BASE_CURRENCY
+        table.rates = state.get("rates", {})
+        return table
+
+
+def add_base_values(records: List[Dict[str, Any]], table: Optional[FxRateTable], date_key: str = "executed_at",
+                    fields=("value", "full_value")) -> None:
+    """
+    Add base_<field> to each record in place, converted column-wise.
+
+    Args:
+        records: Transaction or cash records with currency, a date and the amount fields
+        table: Rate table; base fields are None when it is missing or has no rate
+        date_key: Record key holding the date
+        fields: Amount fields to convert
+    """
+    if not records:
+        return
+    if table is None or not table.base_currency:
+        for record in records:
+            for field in fields:
+                record[f"base_{field}"] = None
+        return
+
+    rates = table.lookup([r.get("currency") for r in records], [r.get(date_key) for r in records])
+    for field in fields:
+        amounts = np.array([r.get(field) if r.get(field) is not None else np.nan for r in records], dtype=float)
+        converted = np.round(amounts * rates, 2)
+        for record, value in zip(records, converted.tolist()):
+            record[f"base_{field}"] = None if np.isnan(value) else value
+
+
+def base_total(amounts: Dict[str, float], table: Optional[FxRateTable], date: str) -> Optional[float]:
+    """Sum of per-currency amounts in base currency, None if any currency has no rate."""
+    amounts = {currency: value for currency, value in amounts.items() if currency != "Base Currency Summary"}
+    if table is None or not table.base_currency or not amounts:
+        return None
+    converted = table.convert(list(amounts.values()), list(amounts), [date] * len(amounts))
+    if np.isnan(converted).any():
+        return None
+    return round(float(converted.sum()), 2)
+
+
+def load_fx_rates(store) -> FxRateTable:
+    try:
+        table = FxRateTable.from_snapshot(store.get(FX_SNAPSHOT)) if store is not None else FxRateTable()
+    except ValueError as e:
+        logger.warning(f"⚠️ Ignoring FX snapshot: {e}")
+        return FxRateTable()
+    return table
+
+
+def save_fx_rates(table: FxRateTable, store) -> None:
+    if store is None:
+        return
+    try:
+        store.put(FX_SNAPSHOT, table.to_snapshot())
+    except Exception as e:
+        logger.error(f"❌ Error saving FX snapshot: {e}")
+
+
+def update_fx_rates(table: FxRateTable, date: str, rates: Dict[str, float], base_currency: Optional[str]) -> bool:
+    """
+    Merge one statement's rates into the table.
+
+    Returns:
+        True when the table changed and should be saved
+    """
+    changed = False
+    if base_currency and base_currency != table.base_currency:
+        if table.base_currency:
+            logger.warning(f"⚠️ Base currency changed from {table.base_currency} to {base_currency}; dropping cached FX rates")
+        table.rebase(base_currency)
+        changed = True
+    new_rates = {currency: rate for currency, rate in rates.items() if table.rates.get(currency, {}).get(date) != rate}
+    if new_rates:
+        table.add_rates(date, new_rates)
+        changed = True
+    return changed
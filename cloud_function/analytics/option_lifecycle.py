@@ -0,0 +1,136 @@
+from collections import deque
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.helpers import format_option_expiration
+from analytics.pnl import close_outcome
+
+ContractKey = Tuple[str, Optional[float], str, str]  # (underlying, strike, expiration, option_type)
+
+LIFECYCLE_COLUMNS = [
+    "open_transaction_id", "underlying", "strike_price", "expiration_date", "option_type", "currency",
+    "direction", "quantity", "opened_at", "closed_at", "days_held", "open_premium", "close_premium",
+    "premium_captured", "capture_pct", "outcome", "close_transaction_ids",
+]
+
+
+def contract_key(record: Dict[str, Any]) -> ContractKey:
+    return (
+        str(record.get("ticker") or ""),
+        record.get("strike_price"),
+        str(record.get("expiration_date") or ""),
+        str(record.get("option_type") or ""),
+    )
+
+
+def _cash(record: Dict[str, Any]) -> float:
+    value = record.get("full_value")
+    return float(value if value is not None else record.get("value") or 0.0)
+
+
+def _day(executed_at: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(executed_at[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+class _OpenLeg:
+    """An opening trade and what is left of it while closes are matched."""
+
+    __slots__ = ("record", "quantity", "remaining", "close_cash", "closes")
+
+    def __init__(self, record: Dict[str, Any], quantity: float):
+        self.record = record
+        self.quantity = quantity
+        self.remaining = abs(quantity)
+        self.close_cash = 0.0
+        self.closes: List[Tuple[Dict[str, Any], float]] = []
+
+
+def match_option_lifecycles(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Link every opening option leg to the closes, expiries and assignments that end it.
+
+    Legs are indexed by (underlying, strike, expiration, option_type) in a
+    dict of FIFO queues, so each trade is matched against its own contract
+    only and the whole history is linked in one pass. A close larger than
+    the oldest open leg consumes several legs; a trade that flips the
+    position closes the old side and opens the remainder.
+
+    Args:
+        records: Option transaction records (build_option_record); other records are ignored
+
+    Returns:
+        One lifecycle dict per opening leg (LIFECYCLE_COLUMNS), in opening order
+    """
+    open_legs: Dict[ContractKey, deque] = {}
+    lifecycles: List[_OpenLeg] = []
+
+    for record in sorted(records, key=lambda r: r.get("executed_at") or ""):
+        if not record.get("option_type"):
+            continue
+        quantity = float(record.get("quantity") or 0.0)
+        if not quantity:
+            continue
+
+        key = contract_key(record)
+        queue = open_legs.setdefault(key, deque())
+        cash = _cash(record)
+        remaining = abs(quantity)
+
+        # Reduce legs held on the other side, oldest first
+        while queue and remaining > 0 and (queue[0].quantity > 0) != (quantity > 0):
+            leg = queue[0]
+            matched = min(leg.remaining, remaining)
+            leg.remaining -= matched
+            leg.close_cash += cash * matched / abs(quantity)
+            leg.closes.append((record, matched))
+            remaining -= matched
+            if leg.remaining <= 1e-9:
+                queue.popleft()
+
+        if remaining > 1e-9:
+            opening = record if remaining == abs(quantity) else {**record, "full_value": cash * remaining / abs(quantity)}
+            leg = _OpenLeg(opening, remaining if quantity > 0 else -remaining)
+            queue.append(leg)
+            lifecycles.append(leg)
+
+    return [_lifecycle_row(leg) for leg in lifecycles]
+
+
+def _lifecycle_row(leg: _OpenLeg) -> Dict[str, Any]:
+    record = leg.record
+    open_premium = _cash(record)
+    is_open = leg.remaining > 1e-9
+    opened_at = record.get("executed_at") or ""
+    closed_at = "" if is_open or not leg.closes else (leg.closes[-1][0].get("executed_at") or "")
+
+    opened_day, closed_day = _day(opened_at), _day(closed_at)
+    days_held = (closed_day - opened_day).days if opened_day and closed_day else None
+
+    premium_captured = None
+    capture_pct = None
+    if not is_open:
+        premium_captured = round(open_premium + leg.close_cash, 2)
+        if open_premium:
+            capture_pct = round(premium_captured / abs(open_premium) * 100, 1)
+
+    return {
+        "open_transaction_id": record["transaction_id"],
+        "underlying": record.get("ticker"),
+        "strike_price": record.get("strike_price"),
+        "expiration_date": format_option_expiration(record.get("expiration_date") or ""),
+        "option_type": record.get("option_type"),
+        "currency": record.get("currency"),
+        "direction": "long" if leg.quantity > 0 else "short",
+        "quantity": leg.quantity,
+        "opened_at": opened_at,
+        "closed_at": closed_at,
+        "days_held": days_held,
+        "open_premium": round(open_premium, 2),
+        "close_premium": round(leg.close_cash, 2),
+        "premium_captured": premium_captured,
+        "capture_pct": capture_pct,
+        "outcome": "open" if is_open else close_outcome(leg.closes[-1][0]),
+        "close_transaction_ids": [close["transaction_id"] for close, _ in leg.closes],
+    }
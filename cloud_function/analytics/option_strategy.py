@@ -0,0 +1,213 @@
+import os
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.logger import logger
+from parsers.timestamp_parser import detect_timestamp_format
+
+# Legs of the same underlying executed within this many seconds of each other form one order
+STRATEGY_WINDOW_SECONDS = float(os.getenv("STRATEGY_WINDOW_SECONDS", "60"))
+# Shares one option contract covers
+CONTRACT_SHARES = 100
+
+VERTICAL = "Vertical"
+STRADDLE = "Straddle"
+STRANGLE = "Strangle"
+IRON_CONDOR = "Iron Condor"
+COVERED_CALL = "Covered Call"
+CASH_SECURED_PUT = "Cash-Secured Put"
+LONG_CALL = "Long Call"
+LONG_PUT = "Long Put"
+NAKED_CALL = "Naked Call"
+CUSTOM = "Custom"
+
+
+def _timestamp(executed_at: str) -> Optional[float]:
+    """
+    Seconds since the epoch, or None when executed_at is in no known format.
+
+    Raw values kept by normalize_timestamps are parsed with the format
+    detect_timestamp_format recognizes for their shape.
+    """
+    try:
+        return datetime.fromisoformat(executed_at).timestamp()
+    except (TypeError, ValueError):
+        pass
+    fmt = detect_timestamp_format(executed_at.strip()) if executed_at else None
+    if fmt is None:
+        return None
+    try:
+        return datetime.strptime(executed_at.strip(), fmt).timestamp()
+    except ValueError:
+        return None
+
+
+class StrategyClassifier:
+    """
+    Labels option legs with the multi-leg strategy they belong to.
+
+    Option legs are sorted by (underlying, executed_at) and split into
+    groups wherever the underlying changes, the gap to the previous leg
+    exceeds the window, or opening legs meet closing legs. Each group is
+    netted per contract and labelled from its shape: two legs of one type
+    and expiration with opposite signs are a vertical, a put and a call of
+    the same sign a straddle/strangle, two verticals on both sides an iron
+    condor. A lone short call is a covered call when enough shares are held
+    (stock legs up to the end of the window, plus `stock_holdings`), a lone
+    short put a cash-secured put. Closing groups are classified as the
+    position they close. Legs whose executed_at cannot be parsed are not
+    grouped: each option leg is labelled on its own, and undated stock legs
+    count as held from the start of the statement.
+
+    Stock legs are kept in a per-ticker sorted timeline, so classification
+    is O(n log n) over a statement. In streaming mode the same classifier
+    sees every batch; a group split across two batches is labelled per part.
+
+    Args:
+        stock_holdings: Shares held per ticker (e.g. from the positions snapshot)
+        window_seconds: Maximum gap between legs of one group
+        in_holdings: Tells whether a stock leg is already counted in
+            `stock_holdings` (applied to the snapshot by an earlier run of the
+            same statement); those legs are taken back out of the holdings so
+            they are not counted twice
+    """
+
+    def __init__(self, stock_holdings: Optional[Dict[str, float]] = None, window_seconds: float = STRATEGY_WINDOW_SECONDS,
+                 in_holdings: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.stock_holdings = dict(stock_holdings or {})
+        self.window_seconds = window_seconds
+        self.in_holdings = in_holdings
+        self._stock_times: Dict[str, List[float]] = defaultdict(list)
+        self._stock_quantities: Dict[str, List[float]] = defaultdict(list)
+
+    def add_stock_legs(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Record stock trades for the covered-call check."""
+        legs = defaultdict(list)
+        for record in records:
+            if record.get("asset_category") == "Stocks":
+                ticker, quantity = record.get("ticker"), float(record.get("quantity") or 0.0)
+                if self.in_holdings is not None and self.in_holdings(record):
+                    self.stock_holdings[ticker] = self.stock_holdings.get(ticker, 0.0) - quantity
+                executed_at = _timestamp(record.get("executed_at") or "")
+                legs[ticker].append((float("-inf") if executed_at is None else executed_at, quantity))
+        for ticker, ticker_legs in legs.items():
+            times = self._stock_times[ticker]
+            quantities = self._stock_quantities[ticker]
+            merged = sorted(list(zip(times, quantities)) + ticker_legs)
+            times[:] = [t for t, _ in merged]
+            quantities[:] = accumulate(q for _, q in merged)
+
+    def shares_held(self, ticker: str, until: float) -> float:
+        held = self.stock_holdings.get(ticker, 0.0)
+        index = bisect_right(self._stock_times.get(ticker, []), until)
+        if index:
+            held += self._stock_quantities[ticker][index - 1]
+        return held
+
+    def classify(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Set `option_strategy` on the option records in place.
+
+        Args:
+            records: Option transaction records (build_option_record)
+
+        Returns:
+            Number of records labelled
+        """
+        legs = sorted(
+            ((str(r.get("ticker") or ""), _timestamp(r.get("executed_at") or ""), r) for r in records if r.get("option_type")),
+            key=lambda leg: (leg[0], leg[1] is None, leg[1] or 0.0),
+        )
+        labelled = 0
+        group: List[Tuple[str, float, Dict[str, Any]]] = []
+        for leg in legs:
+            if group and not self._same_group(group[-1], leg):
+                labelled += self._label(group)
+                group = []
+            group.append(leg)
+        if group:
+            labelled += self._label(group)
+        return labelled
+
+    def _same_group(self, previous, leg) -> bool:
+        return (
+            previous[0] == leg[0]
+            and previous[1] is not None and leg[1] is not None
+            and leg[1] - previous[1] <= self.window_seconds
+            and _is_opening(previous[2]) == _is_opening(leg[2])
+        )
+
+    def _label(self, group) -> int:
+        opening = _is_opening(group[0][2])
+        # Net quantity per contract; closing groups are flipped back to the position they close
+        contracts: Dict[Tuple[str, Any, str], float] = defaultdict(float)
+        for _, _, record in group:
+            quantity = float(record.get("quantity") or 0.0)
+            contracts[(record.get("option_type"), record.get("strike_price"), record.get("expiration_date"))] += quantity if opening else -quantity
+        contracts = {contract: quantity for contract, quantity in contracts.items() if quantity}
+
+        strategy = _shape(contracts)
+        if strategy is None and len(contracts) == 1:
+            (option_type, _, _), quantity = next(iter(contracts.items()))
+            if quantity > 0:
+                strategy = LONG_CALL if option_type == "CALL" else LONG_PUT
+            elif option_type == "PUT":
+                strategy = CASH_SECURED_PUT
+            else:
+                ticker, last_time = group[0][0], group[-1][1]
+                until = float("inf") if last_time is None else last_time + self.window_seconds
+                covered = self.shares_held(ticker, until) >= abs(quantity) * CONTRACT_SHARES
+                strategy = COVERED_CALL if covered else NAKED_CALL
+        strategy = strategy or CUSTOM
+
+        for _, _, record in group:
+            record["option_strategy"] = strategy
+        return len(group)
+
+
+def _is_opening(record: Dict[str, Any]) -> bool:
+    return record.get("type") == "open"
+
+
+def _shape(contracts: Dict[Tuple[str, Any, str], float]) -> Optional[str]:
+    """Multi-leg strategy from netted contracts, None for a single leg."""
+    if len(contracts) == 2:
+        (type_a, _, expiration_a), quantity_a = list(contracts.items())[0]
+        (type_b, _, expiration_b), quantity_b = list(contracts.items())[1]
+        if type_a == type_b and expiration_a == expiration_b and (quantity_a > 0) != (quantity_b > 0):
+            return VERTICAL
+        if type_a != type_b and expiration_a == expiration_b and (quantity_a > 0) == (quantity_b > 0):
+            strikes = {strike for (_, strike, _) in contracts}
+            return STRADDLE if len(strikes) == 1 else STRANGLE
+        return CUSTOM
+    if len(contracts) == 4:
+        expirations = {expiration for (_, _, expiration) in contracts}
+        by_type = defaultdict(list)
+        for (option_type, _, _), quantity in contracts.items():
+            by_type[option_type].append(quantity)
+        if len(expirations) == 1 and all(
+            len(by_type[option_type]) == 2 and (by_type[option_type][0] > 0) != (by_type[option_type][1] > 0)
+            for option_type in ("CALL", "PUT")
+        ):
+            return IRON_CONDOR
+        return CUSTOM
+    if len(contracts) > 1:
+        return CUSTOM
+    return None
+
+
+def classify_option_strategies(option_records: List[Dict[str, Any]], stock_records: Iterable[Dict[str, Any]] = (),
+                               stock_holdings: Optional[Dict[str, float]] = None) -> int:
+    """
+    One-shot classification of a statement's option legs (see StrategyClassifier).
+
+    Returns:
+        Number of option records labelled
+    """
+    classifier = StrategyClassifier(stock_holdings)
+    classifier.add_stock_legs(stock_records)
+    labelled = classifier.classify(option_records)
+    logger.info(f"🧩 Labelled {labelled} option leg(s) with a strategy")
+    return labelled
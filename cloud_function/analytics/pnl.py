@@ -0,0 +1,303 @@
+import os
+import json
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from utils.logger import logger
+from analytics.positions import position_key, PositionKey, QUANTITY_EPSILON
+
+# Environment variables
+PNL_METHOD = os.getenv("PNL_METHOD", "fifo")  # fifo | average
+PNL_SNAPSHOT = "realized_pnl.json"
+
+SNAPSHOT_VERSION = 3
+# Contract multiplier used when a record carries no cash value (options quote per share)
+OPTION_MULTIPLIER = 100.0
+# Running quantities are rounded before sign tests so fractional shares don't leave -0.0000001 positions
+QUANTITY_DECIMALS = 9
+
+CLOSE_COLUMNS = [
+    "transaction_id", "executed_at", "ticker", "contract", "currency", "asset_category",
+    "quantity", "proceeds", "cost_basis", "realized_pnl", "outcome",
+]
+PERIOD_WIDTHS = {"day": 10, "month": 7, "year": 4}
+
+
+def _cash_flow(record: Dict[str, Any]) -> float:
+    """Signed cash of a trade, fees included (positive when cash comes in)."""
+    if record.get("full_value") is not None:
+        return float(record["full_value"])
+    multiplier = OPTION_MULTIPLIER if record.get("option_type") else 1.0
+    price = float(record.get("price") or 0.0)
+    return -float(record.get("quantity") or 0.0) * price * multiplier + float(record.get("fees") or 0.0)
+
+
+def close_outcome(record: Dict[str, Any]) -> str:
+    if record.get("type") == "expired":
+        return "expired"
+    if "A" in str(record.get("code") or "").split(";"):
+        return "assigned"
+    return "closed"
+
+
+def _split_legs(quantity: np.ndarray, cash: np.ndarray):
+    """
+    Split the trades of one instrument into opening and closing legs.
+
+    A trade that crosses zero (sell 150 while long 100) becomes a closing leg
+    for the open quantity and an opening leg for the rest, with its cash split
+    pro rata. Every leg then either opens/adds or reduces, never both.
+
+    Returns:
+        (source trade index, leg quantity, leg cash, is_close) arrays
+    """
+    position = np.round(np.cumsum(quantity), QUANTITY_DECIMALS)
+    previous = np.round(position - quantity, QUANTITY_DECIMALS)
+    crossing = (previous != 0) & (position != 0) & (np.sign(position) != np.sign(previous))
+
+    repeats = 1 + crossing
+    source = np.repeat(np.arange(len(quantity)), repeats)
+    leg_quantity = quantity[source].copy()
+    first_leg = np.cumsum(repeats) - repeats
+    leg_quantity[first_leg[crossing]] = -previous[crossing]
+    leg_quantity[first_leg[crossing] + 1] = position[crossing]
+    leg_cash = cash[source] * (leg_quantity / quantity[source])
+
+    leg_previous = np.round(np.cumsum(leg_quantity) - leg_quantity, QUANTITY_DECIMALS)
+    is_close = (leg_previous != 0) & (np.sign(leg_quantity) != np.sign(leg_previous))
+    return source, leg_quantity, leg_cash, is_close
+
+
+def _match_fifo(leg_quantity, leg_cash, is_close):
+    """
+    FIFO cost of every closing leg, without a per-lot loop.
+
+    Cumulative opened quantity against cumulative opened cost is a piecewise
+    linear curve (each lot has a constant unit cost), so the cost of the
+    units a close consumes is the curve evaluated at the cumulative closed
+    quantity after minus before the close. A position always closes fully
+    before the opposite side opens, so one curve covers long and short runs.
+
+    Returns:
+        (cost of each closing leg, remaining lots as [[signed quantity, cost], ...])
+    """
+    size = np.abs(leg_quantity)
+    opens = ~is_close & (size > 0)
+    open_size = size[opens]
+    open_cost = -leg_cash[opens]
+    opened = np.concatenate(([0.0], np.cumsum(open_size)))
+    opened_cost = np.concatenate(([0.0], np.cumsum(open_cost)))
+
+    closed_after = np.cumsum(np.where(is_close, size, 0.0))[is_close]
+    closed_before = closed_after - size[is_close]
+    cost = np.interp(closed_after, opened, opened_cost) - np.interp(closed_before, opened, opened_cost)
+
+    total_closed = closed_after[-1] if len(closed_after) else 0.0
+    remaining = np.clip(opened[1:] - total_closed, 0.0, open_size)
+    keep = remaining > QUANTITY_EPSILON
+    lots = np.column_stack((
+        np.sign(leg_quantity[opens][keep]) * remaining[keep],
+        open_cost[keep] * remaining[keep] / open_size[keep],
+    ))
+    return cost, lots.tolist()
+
+
+def _match_average(leg_quantity, leg_cash, is_close):
+    """Average-cost counterpart of _match_fifo: closes release basis at the running average."""
+    cost = np.zeros(int(is_close.sum()))
+    quantity = basis = 0.0
+    closes = 0
+    for leg_qty, cash, closing in zip(leg_quantity.tolist(), leg_cash.tolist(), is_close.tolist()):
+        if closing:
+            released = basis * abs(leg_qty) / abs(quantity)
+            cost[closes] = released
+            closes += 1
+            basis -= released
+        else:
+            basis -= cash
+        quantity = round(quantity + leg_qty, QUANTITY_DECIMALS)
+    lots = [[quantity, basis]] if abs(quantity) > QUANTITY_EPSILON else []
+    return cost, lots
+
+
+MATCHERS = {"fifo": _match_fifo, "average": _match_average}
+
+
+class RealizedPnlEngine:
+    """
+    Realized P&L per closing trade, by lot matching per (ticker, contract, currency).
+
+    Costs are signed like PositionsEngine's basis, so the same formula covers
+    long and short positions: realized P&L = proceeds - cost of the lots
+    closed. Expiries (type "expired", code EP) close at zero proceeds and
+    realize the full premium; assignments (code A) close the option the
+    same way, with the resulting stock trade matched as its own instrument.
+
+    Open lots are persisted, so each new statement only matches its own
+    trades against the lots left by earlier ones, and a statement arriving
+    late is matched instead of skipped. Which transactions are new is decided
+    by the AppliedLedger shared with the positions engine; callers pass only
+    the records it claimed.
+
+    Args:
+        method: "fifo" or "average"
+    """
+
+    def __init__(self, method: str = PNL_METHOD):
+        if method not in MATCHERS:
+            raise ValueError(f"unknown P&L method {method!r}, expected one of {sorted(MATCHERS)}")
+        self.method = method
+        self.lots: Dict[PositionKey, Dict[str, Any]] = {}
+
+    def apply(self, records: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Match transaction records against the open lots.
+
+        Args:
+            records: Transaction records not applied before (any mix of stocks, options and bonds, any order)
+
+        Returns:
+            DataFrame with one row per closing trade (CLOSE_COLUMNS)
+        """
+        fresh = [record for record in records if float(record.get("quantity") or 0.0)]
+        if not fresh:
+            return pd.DataFrame(columns=CLOSE_COLUMNS)
+
+        keys = [position_key(r) for r in fresh]
+        codes, instruments = pd.factorize(pd.Series(keys, dtype=object))
+        executed_at = np.array([r.get("executed_at") or "" for r in fresh])
+        order = np.lexsort((executed_at, codes))
+        quantity = np.array([float(r["quantity"]) for r in fresh])[order]
+        cash = np.array([_cash_flow(r) for r in fresh])[order]
+        codes = codes[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+
+        matcher = MATCHERS[self.method]
+        close_index, close_quantity, close_cash, close_cost = [], [], [], []
+        for start, stop in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(codes)]))):
+            key = instruments[codes[start]]
+            held = self.lots.get(key, {}).get("lots", [])
+            lot_quantity = np.array([lot[0] for lot in held], dtype=float)
+            lot_cash = -np.array([lot[1] for lot in held], dtype=float)
+
+            source, leg_quantity, leg_cash, is_close = _split_legs(
+                np.concatenate((lot_quantity, quantity[start:stop])),
+                np.concatenate((lot_cash, cash[start:stop])),
+            )
+            cost, lots = matcher(leg_quantity, leg_cash, is_close)
+
+            # Lots carried over are opening legs, so every close maps to a trade of this batch
+            close_index.append(order[start + source[is_close] - len(held)])
+            close_quantity.append(leg_quantity[is_close])
+            close_cash.append(leg_cash[is_close])
+            close_cost.append(cost)
+
+            if lots:
+                self.lots[key] = {"asset_category": fresh[order[start]].get("asset_category"), "lots": lots}
+            else:
+                self.lots.pop(key, None)
+
+        index = np.concatenate(close_index)
+        closing = [fresh[i] for i in index]
+        proceeds = np.concatenate(close_cash)
+        cost_basis = np.concatenate(close_cost)
+        closes = pd.DataFrame({
+            "transaction_id": [r["transaction_id"] for r in closing],
+            "executed_at": [r.get("executed_at") or "" for r in closing],
+            "ticker": [keys[i][0] for i in index],
+            "contract": [keys[i][1] for i in index],
+            "currency": [keys[i][2] for i in index],
+            "asset_category": [r.get("asset_category") for r in closing],
+            "quantity": np.concatenate(close_quantity),
+            "proceeds": proceeds,
+            "cost_basis": cost_basis,
+            "realized_pnl": proceeds - cost_basis,
+            "outcome": [close_outcome(r) for r in closing],
+        }, columns=CLOSE_COLUMNS)
+        return closes.sort_values("executed_at", kind="stable", ignore_index=True)
+
+    # --- snapshot ---
+
+    def to_snapshot(self) -> bytes:
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "method": self.method,
+            "lots": [
+                [ticker, contract, currency, held["asset_category"], held["lots"]]
+                for (ticker, contract, currency), held in sorted(self.lots.items())
+            ],
+        }
+        return json.dumps(state, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def from_snapshot(cls, raw: Optional[bytes], method: str = PNL_METHOD) -> "RealizedPnlEngine":
+        engine = cls(method)
+        if not raw:
+            return engine
+        state = json.loads(raw)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported P&L snapshot version {state.get('version')}")
+        if state.get("method") != method:
+            raise ValueError(f"snapshot was built with method {state.get('method')!r}, not {method!r}")
+        for ticker, contract, currency, asset_category, lots in state.get("lots", []):
+            engine.lots[(ticker, contract, currency)] = {"asset_category": asset_category, "lots": lots}
+        return engine
+
+
+def realized_by_period(closes: pd.DataFrame, period: str = "month") -> pd.DataFrame:
+    """
+    Sum realized P&L per period and currency.
+
+    Args:
+        closes: Output of RealizedPnlEngine.apply
+        period: "day", "month" or "year"
+
+    Returns:
+        DataFrame with period, currency, realized_pnl and closing_trades columns
+    """
+    width = PERIOD_WIDTHS[period]
+    frame = closes.assign(period=closes["executed_at"].str[:width])
+    return frame.groupby(["period", "currency"], as_index=False).agg(
+        realized_pnl=("realized_pnl", "sum"),
+        closing_trades=("transaction_id", "count"),
+    )
+
+
+def combine_closes(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate the closes of several apply() calls (e.g. streamed batches) in executed_at order."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=CLOSE_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values("executed_at", kind="stable", ignore_index=True)
+
+
+def closes_to_records(closes: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Closing-trade rows as dicts with amounts rounded to cents."""
+    rounded = closes.round({"proceeds": 2, "cost_basis": 2, "realized_pnl": 2})
+    return rounded.to_dict(orient="records")
+
+
+def load_pnl(store) -> RealizedPnlEngine:
+    """
+    Load the engine from its snapshot next to the positions snapshot, starting empty only if there is none.
+
+    Raises:
+        ValueError: if the snapshot is unreadable, has another version or was
+            built with another PNL_METHOD; saving an empty engine over it would
+            lose every open lot
+    """
+    try:
+        engine = RealizedPnlEngine.from_snapshot(store.get(PNL_SNAPSHOT))
+    except ValueError as e:
+        logger.error(f"❌ Unusable P&L snapshot {PNL_SNAPSHOT}, rebuild it with the backfill: {e}")
+        raise
+    if engine.lots:
+        logger.info(f"📂 Loaded open lots for {len(engine.lots)} instrument(s)")
+    return engine
+
+
+def save_pnl(engine: RealizedPnlEngine, store) -> None:
+    try:
+        store.put(PNL_SNAPSHOT, engine.to_snapshot())
+    except Exception as e:
+        logger.error(f"❌ Error saving P&L snapshot: {e}")
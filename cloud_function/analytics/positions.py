@@ -0,0 +1,207 @@
+import os
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.logger import logger
+from services.blob_store import get_blob_store
+
+# Environment variables
+POSITIONS_BACKEND = os.getenv("POSITIONS_BACKEND", "local")  # local | gcs | none
+POSITIONS_DIR = os.getenv("POSITIONS_DIR", "/tmp/investflow_positions")
+POSITIONS_PREFIX = os.getenv("POSITIONS_PREFIX", "_positions/")
+POSITIONS_SNAPSHOT = "positions.json"
+
+SNAPSHOT_VERSION = 3
+# Quantities below this are treated as a closed position (float noise from fractional shares)
+QUANTITY_EPSILON = 1e-9
+
+PositionKey = Tuple[str, str, str]  # (ticker, contract, currency)
+
+# Fields PositionsEngine and RealizedPnlEngine read from a transaction record
+ENGINE_FIELDS = (
+    "transaction_id", "executed_at", "ticker", "currency", "asset_category", "option_type", "strike_price",
+    "expiration_date", "quantity", "price", "fees", "value", "full_value", "type", "code",
+)
+
+
+def position_key(record: Dict[str, Any]) -> PositionKey:
+    """
+    Key a transaction record by (ticker, contract, currency).
+
+    The contract is "" for stocks and bonds and "<expiration> <strike> <CALL|PUT>"
+    for options, so every option series is its own position.
+    """
+    contract = ""
+    if record.get("option_type"):
+        strike = record.get("strike_price")
+        strike_str = f"{strike:g}" if isinstance(strike, (int, float)) else str(strike or "")
+        contract = f"{record.get('expiration_date') or ''} {strike_str} {record['option_type']}".strip()
+    return (str(record.get("ticker") or ""), contract, str(record.get("currency") or ""))
+
+
+def engine_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a transaction record the engines need, so streamed statements can keep every trade until the end."""
+    return {field: record[field] for field in ENGINE_FIELDS if record.get(field) is not None}
+
+
+class PositionsEngine:
+    """
+    Open quantity and average cost basis per (ticker, contract, currency).
+
+    Records from build_asset_record, build_option_record and build_bond_record
+    are applied incrementally. Cost basis is signed like the cash flow it
+    came from: a long position has a positive basis (cash paid, fees
+    included), a short option position a negative one (premium received).
+    Reducing a position releases basis pro rata (average cost); a trade that
+    crosses zero closes the old position and opens the remainder.
+
+    The engine applies whatever it is given; callers pass only transactions
+    the AppliedLedger has not seen, so re-applying a statement is a no-op
+    whatever order statements arrive in. A late trade is applied on arrival:
+    quantities are exact, average cost reflects the order of application.
+    """
+
+    def __init__(self):
+        self.positions: Dict[PositionKey, Dict[str, Any]] = {}
+
+    # --- applying transactions ---
+
+    def apply(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Apply transaction records in executed_at order.
+
+        Args:
+            records: Transaction records (any mix of stocks, options and bonds)
+
+        Returns:
+            Number of records applied
+        """
+        applied = 0
+        for record in sorted(records, key=lambda r: r.get("executed_at") or ""):
+            self._apply_one(record)
+            applied += 1
+        return applied
+
+    def _apply_one(self, record: Dict[str, Any]) -> None:
+        quantity = float(record.get("quantity") or 0.0)
+        if not quantity:
+            return
+        # full_value is the signed cash flow (proceeds + fees); its negation is the cost of the trade
+        trade_cost = -float(record.get("full_value") if record.get("full_value") is not None else record.get("value") or 0.0)
+
+        key = position_key(record)
+        position = self.positions.get(key)
+        if position is None:
+            position = {"asset_category": record.get("asset_category"), "quantity": 0.0, "cost_basis": 0.0, "updated_at": ""}
+            self.positions[key] = position
+
+        open_quantity = position["quantity"]
+        if open_quantity == 0 or (open_quantity > 0) == (quantity > 0):
+            # Opening or adding to the position
+            position["quantity"] = open_quantity + quantity
+            position["cost_basis"] += trade_cost
+        elif abs(quantity) <= abs(open_quantity):
+            # Reducing: release basis at average cost
+            remaining = open_quantity + quantity
+            position["cost_basis"] *= remaining / open_quantity
+            position["quantity"] = remaining
+        else:
+            # Crossing zero: the part beyond the open quantity opens a new position
+            opening_fraction = (abs(quantity) - abs(open_quantity)) / abs(quantity)
+            position["quantity"] = open_quantity + quantity
+            position["cost_basis"] = trade_cost * opening_fraction
+
+        position["updated_at"] = max(position["updated_at"], record.get("executed_at") or "")
+        if abs(position["quantity"]) < QUANTITY_EPSILON:
+            del self.positions[key]
+
+    # --- reading ---
+
+    def holdings(self) -> List[Dict[str, Any]]:
+        """Open positions sorted by ticker, with average cost per unit."""
+        rows = []
+        for (ticker, contract, currency), position in sorted(self.positions.items()):
+            quantity = position["quantity"]
+            rows.append({
+                "ticker": ticker,
+                "contract": contract,
+                "currency": currency,
+                "asset_category": position["asset_category"],
+                "quantity": round(quantity, 6),
+                "cost_basis": round(position["cost_basis"], 2),
+                "average_cost": round(position["cost_basis"] / quantity, 6),
+                "updated_at": position["updated_at"],
+            })
+        return rows
+
+    def stock_holdings(self) -> Dict[str, float]:
+        """Shares held per ticker (stock positions only)."""
+        holdings: Dict[str, float] = {}
+        for (ticker, contract, _), position in self.positions.items():
+            if not contract and position["asset_category"] == "Stocks":
+                holdings[ticker] = holdings.get(ticker, 0.0) + position["quantity"]
+        return holdings
+
+    # --- snapshot ---
+
+    def to_snapshot(self) -> bytes:
+        """Compact JSON snapshot; positions are stored as arrays, not objects."""
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "positions": [
+                [ticker, contract, currency, p["asset_category"], p["quantity"], p["cost_basis"], p["updated_at"]]
+                for (ticker, contract, currency), p in sorted(self.positions.items())
+            ],
+        }
+        return json.dumps(state, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def from_snapshot(cls, raw: Optional[bytes]) -> "PositionsEngine":
+        engine = cls()
+        if not raw:
+            return engine
+        state = json.loads(raw)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported positions snapshot version {state.get('version')}")
+        for ticker, contract, currency, asset_category, quantity, cost_basis, updated_at in state.get("positions", []):
+            engine.positions[(ticker, contract, currency)] = {
+                "asset_category": asset_category,
+                "quantity": quantity,
+                "cost_basis": cost_basis,
+                "updated_at": updated_at,
+            }
+        return engine
+
+
+def open_positions_store(bucket=None):
+    """Blob store holding the positions snapshot, or None when POSITIONS_BACKEND=none."""
+    return get_blob_store(POSITIONS_BACKEND, POSITIONS_DIR, bucket, POSITIONS_PREFIX)
+
+
+def load_positions(store) -> PositionsEngine:
+    """
+    Load the engine from the snapshot, starting empty only if there is none.
+
+    Raises:
+        ValueError: if the snapshot is unreadable or has another version; saving
+            an empty engine over it would lose every position
+    """
+    try:
+        engine = PositionsEngine.from_snapshot(store.get(POSITIONS_SNAPSHOT))
+    except ValueError as e:
+        logger.error(f"❌ Unreadable positions snapshot {POSITIONS_SNAPSHOT}, rebuild it with the backfill: {e}")
+        raise
+    if engine.positions:
+        logger.info(f"📂 Loaded {len(engine.positions)} open position(s)")
+    return engine
+
+
+def save_positions(engine: PositionsEngine, store) -> None:
+    try:
+        store.put(POSITIONS_SNAPSHOT, engine.to_snapshot())
+    except Exception as e:
+        logger.error(f"❌ Error saving positions snapshot: {e}")
+
+
+def is_positions_object(file_name: str) -> bool:
+    """Positions snapshots land in the watched bucket when STATE_BUCKET_NAME is unset; ignore their finalize events."""
+    return file_name.startswith(POSITIONS_PREFIX)
@@ -0,0 +1,299 @@
+import os
+import glob
+import json
+import argparse
+from os.path import basename
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+load_dotenv()
+from utils.logger import logger
+from utils.dedup import DedupIndex
+from parsers.multi_section_parser import parse_multi_section_csv
+from parsers.cash_parser import (
+    extract_ending_cash_data, get_csv_file_date, build_cash_records,
+    extract_cash_flows, cash_flows_to_records, CASH_FLOWS_TABLE
+)
+from parsers.trade_parser import build_trade_records, detect_trade_type, TRADE_TYPE_TABLES
+from parsers.cash_event_parser import build_cash_event_records, event_type_for_section
+from parsers.section_registry import registered_sections, sections_for
+from services.supabase_service import (
+    insert_batch_to_supabase, upsert_batch_to_supabase, prefetch_existing_ids, CHUNK_SIZE, UPSERT_CHUNK_SIZE
+)
+from services.sheets_service import write_to_google_sheets, write_cash_reports, write_cash_flows, write_cash_events, write_realized_pnl, write_option_lifecycles
+from services.slack_service import send_slack_message
+from services.parquet_service import export_to_parquet
+from services.sqlite_service import save_to_sqlite
+from analytics.positions import open_positions_store, load_positions, save_positions
+from analytics.pnl import load_pnl, save_pnl, closes_to_records
+from analytics.applied import AppliedLedger
+from analytics.option_lifecycle import match_option_lifecycles
+from analytics.option_strategy import classify_option_strategies
+from analytics.fx import load_fx_rates, save_fx_rates, update_fx_rates, add_base_values
+from parsers.fx_parser import extract_fx_rates, extract_base_currency
+
+SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
+PNL_SHEET = os.getenv("PNL_SHEET", "")
+# Sheet rewritten with one row per opening option leg (empty: don't write)
+OPTION_LIFECYCLE_SHEET = os.getenv("OPTION_LIFECYCLE_SHEET", "")
+
+
+def collect_statement_files(inputs):
+    """
+    Expand directories and glob patterns into a sorted list of CSV files.
+
+    Args:
+        inputs (list): Directories, glob patterns or file paths
+
+    Returns:
+        list: Unique file paths, ordered by statement date (then name)
+    """
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, "**", "*.csv"), recursive=True))
+        else:
+            files.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+    return sorted(files, key=_statement_sort_key)
+
+
+def _statement_sort_key(path):
+    try:
+        return (get_csv_file_date(basename(path)), basename(path))
+    except ValueError:
+        return ("", basename(path))
+
+
+def parse_statement(file_path):
+    """
+    Parse one statement into records without touching any sink.
+    Runs inside a worker process, so everything returned must be picklable.
+
+    Args:
+        file_path (str): Path to the statement CSV
+
+    Returns:
+        dict: file, trades grouped by trade type, cash records, cash-flow records,
+        cash events grouped by sink table, FX rates, counters and error
+    """
+    result = {"file": file_path, "trades": {}, "cash": [], "cash_flows": [], "cash_events": {}, "fx": None,
+              "counters": {}, "error": None}
+    try:
+        sections = parse_multi_section_csv(file_path, registered_sections())
+        counters = {f"{trade_type}_processed": 0 for trade_type in TRADE_TYPE_TABLES}
+
+        for section_name, df_sec in sections.items():
+            if not section_name.startswith("Trades"):
+                continue
+            trade_type = detect_trade_type(section_name)
+            if not trade_type:
+                logger.warning(f"⚠️  Unrecognized Trades section format: {section_name} in {basename(file_path)}. Skipping.")
+                continue
+            result["trades"].setdefault(trade_type, []).extend(build_trade_records(df_sec, trade_type, counters))
+
+        csv_date = get_csv_file_date(basename(file_path))
+        ending_cash = extract_ending_cash_data(sections)
+        if ending_cash:
+            result["cash"] = build_cash_records(ending_cash, csv_date)
+        result["cash_flows"] = cash_flows_to_records(extract_cash_flows(sections, csv_date))
+        for section_key, handler, df in sections_for(sections, "cash_event"):
+            events = build_cash_event_records(section_key, df, event_type_for_section(handler.section))
+            result["cash_events"].setdefault(handler.sink, []).extend(events)
+        result["fx"] = (csv_date, extract_fx_rates(sections), extract_base_currency(sections))
+        result["counters"] = counters
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run_backfill(files, workers=None, dry_run=False):
+    """
+    Parse statements in a process pool, dedup in memory and write once per sink.
+
+    Args:
+        files (list): Statement paths
+        workers (int, optional): Worker process count (default: CPU count)
+        dry_run (bool): Parse and dedup only, skip all sinks
+
+    Returns:
+        dict: Summary with per-table counts and the per-file error report
+    """
+    records_by_table = {table: [] for table in set(TRADE_TYPE_TABLES.values())}
+    dedup_index = DedupIndex()
+    cash_data = []
+    cash_flows = []
+    events_by_table = {}
+    event_index = DedupIndex()
+    statement_fx = []
+    errors = []
+    parsed_records = 0
+
+    logger.info(f"🚀 Backfilling {len(files)} statement(s) with {workers or os.cpu_count()} worker(s)")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(parse_statement, path): path for path in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"file": path, "error": f"{type(e).__name__}: {e}"}
+
+            if result["error"]:
+                errors.append({"file": path, "error": result["error"]})
+                logger.error(f"❌ [{done}/{len(files)}] {basename(path)}: {result['error']}")
+                continue
+
+            file_records = 0
+            for trade_type, transactions in result["trades"].items():
+                records_by_table[TRADE_TYPE_TABLES[trade_type]].extend(dedup_index.filter(transactions))
+                file_records += len(transactions)
+            parsed_records += file_records
+            cash_data.extend(result["cash"])
+            cash_flows.extend(result["cash_flows"])
+            statement_fx.append(result["fx"])
+            for table, events in result["cash_events"].items():
+                events_by_table.setdefault(table, []).extend(event_index.filter(events))
+            logger.info(f"⏳ [{done}/{len(files)}] {basename(path)}: {file_records} trade record(s)")
+
+    unique_records = len(dedup_index)
+    logger.info(f"🧮 Parsed {parsed_records} trade record(s), {unique_records} unique across statements "
+                f"({dedup_index.dropped} duplicate(s) dropped)")
+
+    # Rates of every statement first, so each record converts at the rate of its own period
+    fx_store = open_positions_store()
+    fx_rates = load_fx_rates(fx_store)
+    fx_changed = False
+    for csv_date, rates, base_currency in sorted(statement_fx, key=lambda fx: fx[0]):
+        fx_changed = update_fx_rates(fx_rates, csv_date, rates, base_currency) or fx_changed
+    for table_records in records_by_table.values():
+        add_base_values(table_records, fx_rates)
+    add_base_values(cash_data, fx_rates, date_key="date", fields=("value",))
+
+    # Classified over the whole history, so covered calls see shares bought in earlier statements
+    classify_option_strategies(records_by_table[TRADE_TYPE_TABLES["options"]], records_by_table[TRADE_TYPE_TABLES["stocks"]])
+
+    summary = {
+        "files": len(files),
+        "failed_files": len(errors),
+        "parsed_records": parsed_records,
+        "unique_records": unique_records,
+        "inserted": {},
+        "errors": errors,
+    }
+    if dry_run:
+        logger.info("🔍 Dry run, skipping sinks")
+        return summary
+    if fx_changed:
+        save_fx_rates(fx_rates, fx_store)
+
+    # --- SUPABASE ---
+    for table, table_records in records_by_table.items():
+        if not table_records:
+            continue
+        known_ids = prefetch_existing_ids(table, table_records)
+        # No checkpoint here, so the chunk size may follow the lookup outcome
+        summary["inserted"][table] = insert_batch_to_supabase(
+            table, table_records, [record["transaction_id"] for record in table_records],
+            chunk_size=UPSERT_CHUNK_SIZE if known_ids is not None else CHUNK_SIZE, known_ids=known_ids
+        )
+    if cash_flows:
+        summary["inserted"][CASH_FLOWS_TABLE] = upsert_batch_to_supabase(CASH_FLOWS_TABLE, cash_flows)
+    for table, events in events_by_table.items():
+        summary["inserted"][table] = upsert_batch_to_supabase(table, events)
+
+    # --- GOOGLE SHEET ---
+    all_tx = [record for table_records in records_by_table.values() for record in table_records]
+    all_tx.sort(key=lambda record: record.get("executed_at") or "")
+    if all_tx:
+        write_to_google_sheets(all_tx)
+    if cash_data:
+        write_cash_reports(cash_data)
+    if cash_flows:
+        write_cash_flows(cash_flows)
+    all_events = [event for events in events_by_table.values() for event in events]
+    if all_events:
+        write_cash_events(sorted(all_events, key=lambda event: event.get("date") or ""))
+
+    # --- PARQUET ---
+    export_to_parquet("transactions", all_tx)
+    export_to_parquet("cash", cash_data)
+    export_to_parquet("cash_flows", cash_flows)
+    export_to_parquet("cash_events", all_events)
+
+    # --- SQLITE ---
+    save_to_sqlite("transactions", all_tx)
+    save_to_sqlite("cash", cash_data)
+
+    # --- POSITIONS ---
+    positions_store = open_positions_store()
+    if positions_store is not None and all_tx:
+        positions = load_positions(positions_store)
+        pnl = load_pnl(positions_store)
+        ledger = AppliedLedger(positions_store)
+        fresh = ledger.claim(all_tx)
+        applied = positions.apply(fresh)
+        closes = pnl.apply(fresh)
+        if applied:
+            save_positions(positions, positions_store)
+            save_pnl(pnl, positions_store)
+            ledger.save()
+        if ledger.skipped:
+            logger.info(f"⏩ Positions: {ledger.skipped} transaction(s) were already applied")
+        logger.info(f"📦 Positions: applied {applied} transaction(s), {len(positions.positions)} open position(s)")
+        if not closes.empty:
+            logger.info(f"💵 Realized P&L: {len(closes)} closing trade(s)")
+            if PNL_SHEET:
+                write_realized_pnl(closes_to_records(closes), PNL_SHEET)
+
+    # --- OPTION LIFECYCLES ---
+    # Opens and their closes can be statements apart, so lifecycles are built from the full backfilled history
+    lifecycles = match_option_lifecycles(all_tx)
+    if lifecycles:
+        still_open = sum(1 for lifecycle in lifecycles if lifecycle["outcome"] == "open")
+        logger.info(f"🔗 Option lifecycles: {len(lifecycles)} opening leg(s), {still_open} still open")
+        if OPTION_LIFECYCLE_SHEET:
+            write_option_lifecycles(lifecycles, OPTION_LIFECYCLE_SHEET)
+
+    return summary
+
+
+def _send_summary(summary):
+    inserted_lines = "".join(f"• {table}: `{count}`\n" for table, count in summary["inserted"].items())
+    if not inserted_lines:
+        inserted_lines = "• None\n"
+    msg = (
+        f"*📚 Backfill completed*\n"
+        f"• Files: `{summary['files']}` (failed: `{summary['failed_files']}`)\n"
+        f"• Trade records: `{summary['parsed_records']}` (unique: `{summary['unique_records']}`)\n\n"
+        f"*🆕 New Records Added:*\n{inserted_lines}"
+    )
+    send_slack_message(msg)
+
+
+def main_backfill(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill Supabase and Google Sheets from many IBKR statements.")
+    parser.add_argument("inputs", nargs="+", help="Statement files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=None, help="Parser process count (default: CPU count)")
+    parser.add_argument("--error-report", help="Write the per-file error report to this JSON file")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and dedup only, do not write to any sink")
+    args = parser.parse_args(argv)
+
+    files = collect_statement_files(args.inputs)
+    if not files:
+        logger.error("No statement files matched the given inputs.")
+        return
+
+    summary = run_backfill(files, workers=args.workers, dry_run=args.dry_run)
+
+    if args.error_report:
+        with open(args.error_report, "w", encoding="utf-8") as f:
+            json.dump(summary["errors"], f, indent=2)
+    for error in summary["errors"]:
+        logger.warning(f"⚠️ Failed: {error['file']}: {error['error']}")
+
+    if SLACK_WEBHOOK_URL and not args.dry_run:
+        _send_summary(summary)
+    logger.info(f"✅ Backfill completed: {summary['files'] - summary['failed_files']}/{summary['files']} file(s) processed")
+
+
+if __name__ == "__main__":
+    main_backfill()
@@ -59,5 +59,6 @@ def build_option_record(
         "side": side,     # buy/sell
         "value": value,
         "full_value": value + fees,
+        "option_strategy": None,  # set by analytics.option_strategy
         "raw_data": raw_data,
     }
@@ -1,48 +1,238 @@
 import os
+import threading
 from os.path import basename
+from contextlib import nullcontext
+from functools import lru_cache
 from dotenv import load_dotenv
 load_dotenv()
 from datetime import datetime
-from utils.logger import logger
+from collections import defaultdict
+from utils.logger import logger, flush_logs
+from utils.dedup import DedupIndex, dedup_records
+from utils.spans import span, start_run, log_run_summary
+from utils.profiling import PROFILE_ENABLED, InvocationProfiler, upload_profile_artifacts, is_profile_object
 from parsers.multi_section_parser import parse_multi_section_csv, validate_required_sections
-from parsers.cash_parser import extract_ending_cash_data, get_csv_file_date
-from parsers.trade_parser import parse_trades_df
-from services.sheets_service import write_to_google_sheets, write_cash_reports
+from parsers.cash_parser import (
+    extract_ending_cash_data, get_csv_file_date, build_cash_records,
+    extract_cash_flows, cash_flows_to_records, CASH_FLOWS_TABLE
+)
+from parsers.trade_parser import detect_trade_type, build_trade_records, build_trade_records_from_rows, upload_trade_records
+from parsers.cash_event_parser import build_cash_event_records, event_type_for_section
+from parsers.section_registry import registered_sections, sections_for
+from parsers.stream_parser import iter_trade_row_batches, collect_section_dataframes, STREAM_BATCH_SIZE
+from services.sheets_service import write_to_google_sheets, write_cash_reports, write_cash_flows, write_cash_events, write_positions, write_realized_pnl, TransactionSheetWriter
+from services.supabase_service import upsert_batch_to_supabase
+from services.parquet_service import export_to_parquet, ParquetTransactionWriter
+from services.sqlite_service import save_to_sqlite
 from services.slack_service import send_slack_message
+from services.idempotency_service import (
+    get_idempotency_store, build_idempotency_keys, find_processed_key,
+    mark_keys_processed, is_idempotency_marker
+)
+from analytics.positions import open_positions_store, load_positions, save_positions, is_positions_object, engine_record
+from analytics.pnl import load_pnl, save_pnl, closes_to_records
+from analytics.applied import AppliedLedger
+from analytics.option_strategy import StrategyClassifier
+from analytics.fx import load_fx_rates, save_fx_rates, update_fx_rates, add_base_values, base_total
+from parsers.fx_parser import extract_fx_rates, extract_base_currency
+from services.checkpoint_service import open_checkpoint, is_checkpoint_object, checkpoint_key_for_event
+from services.spool_service import configure_spool, is_spool_object
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
 CSV_FILE = os.getenv("CSV_FILE")
 BUCKET_NAME = os.getenv("BUCKET_NAME")
+# Bucket for checkpoints, idempotency markers, snapshots, spool and profiles. Keep it separate from the
+# watched bucket: every object written there fires a finalize event and a cold start of its own
+STATE_BUCKET_NAME = os.getenv("STATE_BUCKET_NAME") or BUCKET_NAME
+# Stream Trades rows in STREAM_BATCH_SIZE batches instead of loading whole sections
+STREAMING_MODE = os.getenv("STREAMING_MODE", "").lower() in ("1", "true", "yes")
+# Sheet that mirrors the positions snapshot after every statement (empty: don't write)
+POSITIONS_SHEET = os.getenv("POSITIONS_SHEET", "")
+# Sheet receiving realized P&L per closing trade (empty: don't write)
+PNL_SHEET = os.getenv("PNL_SHEET", "")
+# Serializes read-modify-write of the positions, P&L and FX snapshots when statements run concurrently (service.py)
+SNAPSHOT_LOCK = threading.Lock()
 
-def process_cash_report(ending_cash):
-    csv_date = get_csv_file_date(CSV_FILE)
-    cash_data = []
-    
-    for currency, value in ending_cash.items():
-        if currency == "Base Currency Summary":
-            continue
-            
-        cash_data.append({
-            "date": csv_date,
-            "currency": currency,
-            "value": round(value, 2)
-        })
+def process_cash_report(ending_cash, file_path, checkpoint=None, fx_rates=None):
+    cash_data = build_cash_records(ending_cash, get_csv_file_date(basename(file_path)))
+    add_base_values(cash_data, fx_rates, date_key="date", fields=("value",))
+    write_cash_reports(cash_data, checkpoint=checkpoint)
+    export_to_parquet("cash", cash_data)
+    save_to_sqlite("cash", cash_data)
+
+def update_statement_fx_rates(fx_rates, sections, file_path, store):
+    """Merge the statement's own FX rates (and base currency) into the rate table and persist it."""
+    changed = update_fx_rates(
+        fx_rates, get_csv_file_date(basename(file_path)), extract_fx_rates(sections), extract_base_currency(sections)
+    )
+    if changed:
+        save_fx_rates(fx_rates, store)
+
+def process_cash_flows(sections, file_path, checkpoint=None):
+    flows = extract_cash_flows(sections, get_csv_file_date(basename(file_path)))
+    if flows.empty:
+        return
+    logger.info(f"💸 Cash flows: {len(flows)} line(s) for {flows['currency'].nunique()} currency group(s)")
+    records = cash_flows_to_records(flows)
+    upsert_batch_to_supabase(CASH_FLOWS_TABLE, records, checkpoint=checkpoint, stage=f"cash:{CASH_FLOWS_TABLE}")
+    write_cash_flows(records, checkpoint=checkpoint)
+    export_to_parquet("cash_flows", records)
+
+def process_cash_events(sections, checkpoint=None):
+    records_by_sink = defaultdict(list)
+    for section_key, handler, df in sections_for(sections, "cash_event"):
+        event_type = event_type_for_section(handler.section)
+        records_by_sink[handler.sink].extend(build_cash_event_records(section_key, df, event_type))
+
+    all_events = []
+    for sink, records in records_by_sink.items():
+        records, _ = dedup_records(records)
+        upsert_batch_to_supabase(sink, records, checkpoint=checkpoint, stage=f"events:{sink}")
+        all_events.extend(records)
+    if all_events:
+        write_cash_events(all_events, checkpoint=checkpoint)
+        export_to_parquet("cash_events", all_events)
+    return len(all_events)
+
+def open_positions(bucket=None):
+    """
+    Positions and realized P&L engines loaded from their snapshots, plus the
+    store to save them to (None, None, None when disabled).
+
+    Loaded before anything is written, so an unusable snapshot stops the run
+    early; apply_positions loads them again under the lock to update them.
+    """
+    store = open_positions_store(bucket)
+    if store is None:
+        return None, None, None
+    return load_positions(store), load_pnl(store), store
+
+def apply_positions(store, transactions, checkpoint=None):
+    """
+    Apply a statement's transactions to the positions and P&L snapshots.
+
+    Transactions the AppliedLedger already holds are skipped. Only loading,
+    applying and saving the snapshots and the touched ledger months hold
+    SNAPSHOT_LOCK; the Sheets writes of the result run after it is released.
+    """
+    if store is None:
+        return
+    with SNAPSHOT_LOCK:
+        # Loaded under the lock: a statement processed concurrently may have saved newer snapshots
+        engine, pnl, ledger = load_positions(store), load_pnl(store), AppliedLedger(store)
+        with span("positions.apply", rows=len(transactions)):
+            fresh = ledger.claim(transactions)
+            applied = engine.apply(fresh)
+            closes = pnl.apply(fresh)
+        if applied:
+            save_positions(engine, store)
+            save_pnl(pnl, store)
+            ledger.save()
+        holdings = engine.holdings() if applied and POSITIONS_SHEET else None
+
+    if ledger.skipped:
+        logger.info(f"⏩ Positions: {ledger.skipped} transaction(s) were already applied")
+    if not applied:
+        return
+    logger.info(f"📦 Positions: applied {applied} transaction(s), {len(engine.positions)} open position(s)")
+    if holdings is not None:
+        write_positions(holdings, POSITIONS_SHEET)
+
+    if closes.empty:
+        return
+    totals = closes.groupby("currency")["realized_pnl"].sum()
+    logger.info(f"💵 Realized P&L over {len(closes)} closing trade(s): " + ", ".join(f"{currency} {total:,.2f}" for currency, total in totals.items()))
+    if PNL_SHEET:
+        write_realized_pnl(closes_to_records(closes), PNL_SHEET, checkpoint=checkpoint)
+
+def new_strategy_classifier(positions, store=None):
+    """
+    Option strategy classifier seeded with the shares held before this statement.
+
+    On a resume or re-run the snapshot already holds this statement's stock
+    legs; the applied-ID ledger tells the classifier which ones to take back out.
+    """
+    if positions is None:
+        return StrategyClassifier()
+    return StrategyClassifier(positions.stock_holdings(), in_holdings=AppliedLedger(store).is_applied)
+
+def enrich_trades(strategies, fx_rates, trade_type, transactions):
+    """Add base-currency values and option strategies to freshly built records."""
+    add_base_values(transactions, fx_rates)
+    if trade_type == "stocks":
+        strategies.add_stock_legs(transactions)
+    elif trade_type == "options":
+        strategies.classify(transactions)
+
+def _new_counters():
+    return {
+        "stocks_processed": 0,
+        "stocks_inserted": 0,
+        "options_processed": 0,
+        "options_inserted": 0,
+        "bonds_processed": 0,
+        "bonds_inserted": 0,
+        "duplicates_dropped": 0
+    }
+
+def _send_summary(file_name, counters, ending_cash, run_metrics, fx_rates=None):
+    if not SLACK_WEBHOOK_URL:
+        return
+
+    ending_cash_msg = "*💰 Ending Cash:*\n"
+    if ending_cash:
+        for currency, value in ending_cash.items():
+            ending_cash_msg += f"• {currency}: `{round(value, 2)}`\n"
+        total = base_total(ending_cash, fx_rates, get_csv_file_date(file_name))
+        if total is not None:
+            ending_cash_msg += f"• Total in {fx_rates.base_currency}: `{total}`\n"
+    else:
+        ending_cash_msg += "• No Ending Cash data found\n"
     
-    write_cash_reports(cash_data)
+    msg = (
+        f"*📄 CSV File:* `{file_name}`\n\n"
+        f"*🔍 Records Processed:*\n"
+        f"• Stocks: `{counters['stocks_processed']}`\n"
+        f"• Options: `{counters['options_processed']}`\n"
+        f"• Total: `{counters['stocks_processed'] + counters['options_processed']}`\n"
+        f"• Duplicates dropped: `{counters['duplicates_dropped']}`\n\n"
+        f"*🆕 New Records Added:*\n"
+        f"• Stocks: `{counters['stocks_inserted']}`\n"
+        f"• Options: `{counters['options_inserted']}`\n"
+        f"• Total: `{counters['stocks_inserted'] + counters['options_inserted']}`\n\n"
+        f"{ending_cash_msg}\n"
+        f"{run_metrics.format_for_slack()}\n"
+        f"*🔗 Supabase:* <https://supabase.com/dashboard/project/uxpqahwmqpkgqlpzwmof/editor|View in Supabase>\n"
+        f"*📋 Google Sheet:* <https://docs.google.com/spreadsheets/d/1Ti9vSwPYyOHrNNsENgHva5m8X70fXut9qPJy5WkxWM4/edit?gid=0#gid=0|View in Google Sheet>\n"
+    )
+    send_slack_message(msg)
 
-def process_csv_file(file_path):
-    sections = parse_multi_section_csv(file_path)
+def process_csv_file(file_path, checkpoint=None, bucket=None):
+    run_metrics = start_run()
+    with span("csv.parse", bytes=os.path.getsize(file_path)) as parse_span:
+        sections = parse_multi_section_csv(file_path, registered_sections())
+        parse_span.add(rows=sum(len(df) for df in sections.values()))
     validate_required_sections(sections)
     section_count = len(sections.keys())
     logger.info(f"📊 Found {section_count} parsed sections: {sorted(sections.keys())}")
 
+    positions, _, positions_store = open_positions(bucket)
+    with SNAPSHOT_LOCK:
+        fx_rates = load_fx_rates(positions_store)
+        update_statement_fx_rates(fx_rates, sections, file_path, positions_store)
+
 
     # --- CASH ---
     ending_cash = extract_ending_cash_data(sections)
     logger.info(f"💰 Ending Cash data: {ending_cash}")
 
     if ending_cash:
-        process_cash_report(ending_cash)
+        with span("cash.report", rows=len(ending_cash)):
+            process_cash_report(ending_cash, file_path, checkpoint, fx_rates)
+    with span("cash.flows"):
+        process_cash_flows(sections, file_path, checkpoint)
+    with span("cash.events") as events_span:
+        events_span.add(rows=process_cash_events(sections, checkpoint))
 
 
     # --- TRADES ---
@@ -50,31 +240,26 @@ def process_csv_file(file_path):
     option_transactions = []
     bond_transactions = [] # Initialize list for bond transactions
 
-    counters = {
-        "stocks_processed": 0,
-        "stocks_inserted": 0,
-        "options_processed": 0,
-        "options_inserted": 0,
-        "bonds_processed": 0,
-        "bonds_inserted": 0
-    }
+    counters = _new_counters()
+    dedup_index = DedupIndex()
+    strategies = new_strategy_classifier(positions, positions_store)
+
+    # Stock sections first, so covered calls see the shares bought in this statement
+    trade_sections = [(name, df) for name, df in sections.items() if name.startswith("Trades")]
+    trade_sections.sort(key=lambda section: detect_trade_type(section[0]) != "stocks")
 
-    for section_name, df_sec in sections.items():
-        if not section_name.startswith("Trades"):
-            continue
-
-        trade_type = None
-        if "Stocks" in section_name:
-            trade_type = "stocks"
-        elif "Equity and Index Options" in section_name:
-            trade_type = "options"
-        elif "Treasury Bills" in section_name:
-            trade_type = "bonds"
-        
+    for section_name, df_sec in trade_sections:
+        trade_type = detect_trade_type(section_name)
         if trade_type:
             logger.info(f"--------------------------------------------------")
             logger.info(f"ℹ️  Processing {trade_type} section: {section_name}")
-            transactions = parse_trades_df(df_sec, trade_type=trade_type, counters=counters)
+            with span("trades.build", trade_type=trade_type, rows=len(df_sec)):
+                transactions = build_trade_records(df_sec, trade_type, counters)
+            enrich_trades(strategies, fx_rates, trade_type, transactions)
+            transactions = upload_trade_records(
+                transactions, trade_type, counters,
+                dedup_index=dedup_index, checkpoint=checkpoint, section_name=section_name
+            )
             if trade_type == "stocks":
                 stock_transactions.extend(transactions)
             elif trade_type == "options":
@@ -87,66 +272,209 @@ def process_csv_file(file_path):
     # --- GOOGLE SHEET ---
     all_tx = stock_transactions + option_transactions + bond_transactions
     if all_tx:
-        write_to_google_sheets(all_tx)
+        write_to_google_sheets(all_tx, checkpoint=checkpoint)
+
+    # --- PARQUET ---
+    export_to_parquet("transactions", all_tx)
+    save_to_sqlite("transactions", all_tx)
+
+    # --- POSITIONS ---
+    apply_positions(positions_store, all_tx, checkpoint)
 
     # --- SLACK ---
-    if SLACK_WEBHOOK_URL:
-        ending_cash_msg = "*💰 Ending Cash:*\n"
-        if ending_cash:
-            for currency, value in ending_cash.items():
-                ending_cash_msg += f"• {currency}: `{round(value, 2)}`\n"
-        else:
-            ending_cash_msg += "• No Ending Cash data found\n"
-        
-        msg = (
-            f"*📄 CSV File:* `{basename(file_path)}`\n\n"
-            f"*🔍 Records Processed:*\n"
-            f"• Stocks: `{counters['stocks_processed']}`\n"
-            f"• Options: `{counters['options_processed']}`\n"
-            f"• Total: `{counters['stocks_processed'] + counters['options_processed']}`\n\n"
-            f"*🆕 New Records Added:*\n"
-            f"• Stocks: `{counters['stocks_inserted']}`\n"
-            f"• Options: `{counters['options_inserted']}`\n"
-            f"• Total: `{counters['stocks_inserted'] + counters['options_inserted']}`\n\n"
-            f"{ending_cash_msg}\n"
-            f"*🔗 Supabase:* <https://supabase.com/dashboard/project/uxpqahwmqpkgqlpzwmof/editor|View in Supabase>\n"
-            f"*📋 Google Sheet:* <https://docs.google.com/spreadsheets/d/1Ti9vSwPYyOHrNNsENgHva5m8X70fXut9qPJy5WkxWM4/edit?gid=0#gid=0|View in Google Sheet>\n"
-        )
-        send_slack_message(msg)
+    _send_summary(basename(file_path), counters, ending_cash, run_metrics, fx_rates)
+
+    if checkpoint:
+        checkpoint.clear()
+    log_run_summary(run_metrics, file=basename(file_path))
     logger.info(f"Processed file: {basename(file_path)}")
 
+def process_csv_stream(source, file_name, checkpoint=None, bucket=None):
+    """
+    Streaming variant of process_csv_file for statements too large to load at once.
+
+    Trades rows flow from the file through the record builders into the
+    Supabase and Sheets sinks in batches of STREAM_BATCH_SIZE rows, so peak
+    memory grows only by the few fields per trade the positions engines read.
+    The small non-Trades sections (Cash Report) are collected while streaming
+    and handled afterwards, like the positions and FX snapshots.
+
+    Args:
+        source: Path of the CSV file or an open text file object (e.g. blob.open("r"))
+        file_name: Statement file name, used for the statement date and messages
+        checkpoint: Optional file checkpoint
+        bucket: GCS bucket for the positions snapshot
+    """
+    run_metrics = start_run()
+    counters = _new_counters()
+    dedup_index = DedupIndex()
+    section_offsets = defaultdict(int)
+    other_sections = defaultdict(list)
+    sheet_writer = TransactionSheetWriter(checkpoint=checkpoint)
+    parquet_writer = ParquetTransactionWriter()
+    positions, _, positions_store = open_positions(bucket)
+    # Only the fields the engines read are kept; the snapshots are updated once, after the stream
+    position_records = []
+    strategies = new_strategy_classifier(positions, positions_store)
+    # The rate section follows Trades, so streamed trades convert at the rates known from earlier statements
+    fx_rates = load_fx_rates(positions_store)
+
+    # --- TRADES ---
+    with span("csv.stream", rows=0) as stream_span:
+        for section_name, header, rows in iter_trade_row_batches(source, STREAM_BATCH_SIZE, other_sections, registered_sections()):
+            stream_span.add(rows=len(rows))
+            trade_type = detect_trade_type(section_name)
+            first_batch = section_name not in section_offsets
+            section_offsets.setdefault(section_name, 0)
+            if not trade_type:
+                if first_batch:
+                    logger.warning(f"⚠️  Unrecognized Trades section format: {section_name}. Skipping.")
+                continue
+            if first_batch:
+                logger.info(f"--------------------------------------------------")
+                logger.info(f"ℹ️  Streaming {trade_type} section: {section_name}")
+
+            with span("trades.build", log=False, trade_type=trade_type, rows=len(rows)):
+                transactions = build_trade_records_from_rows(rows, trade_type, counters)
+            enrich_trades(strategies, fx_rates, trade_type, transactions)
+            transactions = upload_trade_records(
+                transactions, trade_type, counters, dedup_index=dedup_index, checkpoint=checkpoint,
+                section_name=section_name, offset=section_offsets[section_name]
+            )
+            section_offsets[section_name] += len(transactions)
+            sheet_writer.write(transactions)
+            parquet_writer.write(transactions)
+            save_to_sqlite("transactions", transactions, log=False)
+            if positions is not None:
+                position_records.extend(engine_record(record) for record in transactions)
+    sheet_writer.close()
+    parquet_writer.close()
+
+    sections = collect_section_dataframes(other_sections)
+    validate_required_sections(list(sections) + list(section_offsets))
+    logger.info(f"📊 Streamed {len(section_offsets)} Trades section(s), parsed {len(sections)} other section(s)")
+
+    # --- POSITIONS ---
+    apply_positions(positions_store, position_records, checkpoint)
+    with SNAPSHOT_LOCK:
+        fx_rates = load_fx_rates(positions_store)
+        update_statement_fx_rates(fx_rates, sections, file_name, positions_store)
+
+    # --- CASH ---
+    ending_cash = extract_ending_cash_data(sections)
+    logger.info(f"💰 Ending Cash data: {ending_cash}")
+    if ending_cash:
+        with span("cash.report", rows=len(ending_cash)):
+            process_cash_report(ending_cash, file_name, checkpoint, fx_rates)
+    with span("cash.flows"):
+        process_cash_flows(sections, file_name, checkpoint)
+    with span("cash.events") as events_span:
+        events_span.add(rows=process_cash_events(sections, checkpoint))
+
+    # --- SLACK ---
+    _send_summary(basename(file_name), counters, ending_cash, run_metrics, fx_rates)
+
+    if checkpoint:
+        checkpoint.clear()
+    log_run_summary(run_metrics, file=basename(file_name))
+    logger.info(f"Processed file: {basename(file_name)}")
+
+def _make_profiler(file_path):
+    """CPU/memory profiler for the invocation when PROFILE is enabled, a no-op otherwise."""
+    if PROFILE_ENABLED:
+        return InvocationProfiler(file_path)
+    return nullcontext()
+
 # Google Cloud Function
 def main_cloud_function(event, context):
+    try:
+        handle_gcs_event(event)
+    finally:
+        # Drain the log queue before the instance is frozen between invocations
+        flush_logs()
+
+@lru_cache(maxsize=1)
+def _get_bucket():
+    """Storage client and bucket handle, created once per instance and reused by warm invocations."""
     from google.cloud import storage
-    
+    return storage.Client().bucket(BUCKET_NAME)
+
+@lru_cache(maxsize=1)
+def _get_state_bucket():
+    """Bucket holding the function's own state (STATE_BUCKET_NAME, the watched bucket if unset)."""
+    if STATE_BUCKET_NAME == BUCKET_NAME:
+        return _get_bucket()
+    from google.cloud import storage
+    return storage.Client().bucket(STATE_BUCKET_NAME)
+
+def handle_gcs_event(event):
+    """Process the statement of one GCS object finalize event (shared by the Cloud Function and service.py)."""
     if not BUCKET_NAME:
         logger.error("BUCKET_NAME environment variable not set")
         return
     
     file_name = event['name']
+    if is_idempotency_marker(file_name) or is_checkpoint_object(file_name) or is_profile_object(file_name) \
+            or is_positions_object(file_name) or is_spool_object(file_name):
+        return
     logger.info(f"Processing file: {file_name}")
     
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(BUCKET_NAME)
+    bucket = _get_bucket()
+    state_bucket = _get_state_bucket()
+    configure_spool(state_bucket)
+
+    # --- IDEMPOTENCY ---
+    idempotency_store = get_idempotency_store(state_bucket)
+    idempotency_keys = []
+    if idempotency_store:
+        idempotency_keys = build_idempotency_keys(event, bucket)
+        processed_key = find_processed_key(idempotency_store, idempotency_keys)
+        if processed_key:
+            logger.info(f"⏩ File {file_name} already processed ({processed_key}). Skipping.")
+            return
+
     blob = bucket.blob(file_name)
     
     temp_file = f"/tmp/{file_name}"
-    blob.download_to_filename(temp_file)
-    
-    try:
-        process_csv_file(temp_file)
-    finally:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+    profiler = _make_profiler(temp_file)
+    if STREAMING_MODE:
+        # /tmp is in-memory on Cloud Functions, so stream the object instead of downloading it
+        try:
+            with profiler, blob.open("r", encoding="utf-8-sig") as source:
+                checkpoint = open_checkpoint(None, state_bucket, file_key=checkpoint_key_for_event(event))
+                process_csv_stream(source, file_name, checkpoint=checkpoint, bucket=state_bucket)
+        finally:
+            if PROFILE_ENABLED:
+                upload_profile_artifacts(state_bucket, profiler.artifacts)
+    else:
+        blob.download_to_filename(temp_file)
+        try:
+            with profiler:
+                process_csv_file(temp_file, checkpoint=open_checkpoint(temp_file, state_bucket), bucket=state_bucket)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            if PROFILE_ENABLED:
+                upload_profile_artifacts(state_bucket, profiler.artifacts)
+
+    if idempotency_store:
+        mark_keys_processed(idempotency_store, idempotency_keys, event)
     
     logger.info("✅ Cloud function execution completed successfully")
 
 # Local
+def process_local_file(file_path):
+    with _make_profiler(file_path):
+        if STREAMING_MODE:
+            process_csv_stream(file_path, basename(file_path), checkpoint=open_checkpoint(file_path))
+        else:
+            process_csv_file(file_path, checkpoint=open_checkpoint(file_path))
+
 def main_local():
     if not CSV_FILE:
         logger.error("No CSV_FILE environment variable specified for local testing.")
         return
-    process_csv_file(CSV_FILE)
+    process_local_file(CSV_FILE)
     logger.info("✅ Local execution completed successfully")
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+import re
+import hashlib
+import pandas as pd
+from utils.logger import logger
+
+
+def build_cash_event_records(section_key, df, event_type):
+    """
+    Build records for dated cash events (Dividends, Withholding Tax, Interest, Fees).
+
+    The sections share the Currency, Date, Description and Amount columns;
+    "Total ..." summary rows and rows without a date are dropped. Conversion is
+    column-wise, the DataFrame is not iterated row by row.
+
+    Args:
+        section_key (str): Parsed section key, for logging
+        df (DataFrame): Section DataFrame
+        event_type (str): Event type stored with each record (e.g. "dividends")
+
+    Returns:
+        list: Dictionaries with transaction_id, event_type, date, currency,
+        description, amount, code and raw_data
+    """
+    if df is None or df.empty:
+        return []
+
+    currency = df["Currency"].astype("string").str.strip()
+    date = df["Date"].astype("string").str.strip()
+    keep = currency.notna() & ~currency.str.startswith("Total", na=False) & date.notna() & (date != "")
+    if not keep.any():
+        return []
+
+    events = pd.DataFrame({
+        "event_type": event_type,
+        "date": date[keep],
+        "currency": currency[keep],
+        "description": df.loc[keep, "Description"].astype("string").str.strip(),
+        "amount": pd.to_numeric(
+            df.loc[keep, "Amount"].astype("string").str.replace(",", "", regex=False), errors="coerce"
+        ),
+        "code": df.loc[keep, "Code"].astype("string").str.strip() if "Code" in df.columns else None,
+    })
+
+    unparsable = events["amount"].isna().sum()
+    if unparsable:
+        logger.warning(f"⚠️ {unparsable} row(s) in {section_key} have no numeric Amount")
+    events = events[events["amount"].notna()]
+
+    # The raw Amount string keeps the ID stable regardless of float formatting
+    raw_amounts = df.loc[events.index, "Amount"].astype(str).str.strip()
+    events.insert(0, "transaction_id", [
+        hashlib.md5(f"{event_type}_{d}_{c}_{desc}_{amount}".encode("utf-8")).hexdigest()
+        for d, c, desc, amount in zip(events["date"], events["currency"], events["description"], raw_amounts)
+    ])
+    raw_rows = df.loc[events.index]
+    events["raw_data"] = raw_rows.astype(object).where(raw_rows.notna(), None).to_dict("records")
+
+    records = events.astype(object).where(events.notna(), None).to_dict("records")
+    logger.info(f"🧾 {section_key}: {len(records)} cash event(s)")
+    return records
+
+
+def event_type_for_section(section):
+    """Section name -> event type ("Withholding Tax" -> "withholding_tax")."""
+    return re.sub(r"[^0-9a-z]+", "_", section.lower()).strip("_")
@@ -1,8 +1,13 @@
+import re
 import csv
+import hashlib
 from collections import defaultdict
 import pandas as pd
 from utils.logger import logger
 
+CASH_FLOWS_TABLE = "cash_flows"
+CASH_FLOW_KEY_COLUMNS = ["date", "currency", "line_item"]
+
 
 def extract_ending_cash_data(sections):
     """
@@ -28,6 +33,65 @@ def extract_ending_cash_data(sections):
     return _build_currency_dict(ending_cash_data)
 
 
+def extract_cash_flows(sections, csv_date):
+    """
+    Extract every Cash Report line (Starting Cash, Commissions, Deposits,
+    Dividends, ..., Ending Cash) per currency into a long-format table.
+
+    All Cash Report sections are combined and converted column-wise, without
+    iterating over rows.
+
+    Args:
+        sections: Dictionary of parsed sections from parse_multi_section_csv
+        csv_date (str): Statement date in YYYY-MM-DD format
+
+    Returns:
+        DataFrame with one row per (currency, line_item): date, currency and
+        line_item as strings, one float column per Cash Report value column
+        (e.g. total, securities, futures, month_to_date, year_to_date; NaN
+        where blank) and a stable transaction_id
+    """
+    frames = [sections[k] for k in _find_cash_report_sections(sections) if sections[k] is not None and len(sections[k].columns) >= 3]
+    if not frames:
+        return pd.DataFrame(columns=["transaction_id"] + CASH_FLOW_KEY_COLUMNS)
+
+    # Positional renaming: 1st column is the line item, 2nd the currency, the rest are values
+    frames = [
+        df.set_axis(["line_item", "currency"] + [_snake_case(c) for c in df.columns[2:]], axis=1)
+        for df in frames
+    ]
+    df = pd.concat(frames, ignore_index=True)
+    df = df.loc[:, [c for c in df.columns if c]]
+
+    flows = pd.DataFrame({
+        "date": csv_date,
+        "currency": df["currency"].astype("string").str.strip(),
+        "line_item": df["line_item"].astype("string").str.strip(),
+    })
+    for column in df.columns.drop(["line_item", "currency"]):
+        flows[column] = pd.to_numeric(
+            df[column].astype("string").str.replace(",", "", regex=False).str.strip(), errors="coerce"
+        ).astype("float64")
+
+    flows = flows.dropna(subset=["currency", "line_item"])
+    flows = flows[(flows["currency"] != "") & (flows["line_item"] != "")]
+    flows.insert(0, "transaction_id", [
+        hashlib.md5(f"{d}_{c}_{l}".encode("utf-8")).hexdigest()
+        for d, c, l in zip(flows["date"], flows["currency"], flows["line_item"])
+    ])
+    # Repeated lines within one statement keep the last value, as in extract_ending_cash_data
+    return flows.drop_duplicates("transaction_id", keep="last").reset_index(drop=True)
+
+
+def cash_flows_to_records(flows):
+    """Convert the cash-flow table to JSON-ready dicts (NaN -> None)."""
+    return flows.astype(object).where(flows.notna(), None).to_dict("records")
+
+
+def _snake_case(column):
+    return re.sub(r"[^0-9a-z]+", "_", str(column or "").strip().lower()).strip("_")
+
+
 def _find_cash_report_sections(sections):
     """Find all sections related to Cash Reports."""
     return [k for k in sections if k.startswith("Cash Report")]
@@ -102,6 +166,31 @@ def _process_cash_row(row):
     
     return None
 
+def build_cash_records(ending_cash, csv_date):
+    """
+    Turn the currency dictionary from extract_ending_cash_data into cash records.
+    
+    Args:
+        ending_cash (dict): Currency -> ending cash value
+        csv_date (str): Statement date in YYYY-MM-DD format
+        
+    Returns:
+        list: List of dictionaries with date, currency and value
+    """
+    cash_data = []
+    
+    for currency, value in ending_cash.items():
+        if currency == "Base Currency Summary":
+            continue
+            
+        cash_data.append({
+            "date": csv_date,
+            "currency": currency,
+            "value": round(value, 2)
+        })
+    
+    return cash_data
+
 def get_csv_file_date(file_name):
     from datetime import datetime
     date_str = file_name.split('_')[-1].split('.')[0]  # Get '20250423'
@@ -0,0 +1,40 @@
+import pandas as pd
+from utils.logger import logger
+from parsers.section_registry import sections_for
+
+
+def extract_fx_rates(sections):
+    """
+    Read the statement's "Base Currency Exchange Rate" section.
+
+    Args:
+        sections: Dictionary of parsed sections from parse_multi_section_csv
+
+    Returns:
+        dict: Currency -> units of base currency per unit of that currency,
+        e.g. {'USD': 3.75, 'EUR': 4.28} for a PLN-based account
+    """
+    rates = {}
+    for section_key, _, df in sections_for(sections, "fx_rate"):
+        currency = df["Currency"].astype("string").str.strip()
+        rate = pd.to_numeric(df["Rate"].astype("string").str.replace(",", "", regex=False), errors="coerce")
+        keep = currency.notna() & (currency != "") & rate.notna() & (rate > 0)
+        rates.update(zip(currency[keep], rate[keep].astype(float)))
+    if rates:
+        logger.info(f"💱 FX rates: {rates}")
+    return rates
+
+
+def extract_base_currency(sections):
+    """
+    Base currency from the "Account Information" section.
+
+    Returns:
+        str: Currency code (e.g. "PLN"), or None when the statement does not list it
+    """
+    for _, _, df in sections_for(sections, "account"):
+        fields = df["Field Name"].astype("string").str.strip()
+        values = df.loc[fields == "Base Currency", "Field Value"].astype("string").str.strip()
+        if not values.empty and values.iloc[0]:
+            return str(values.iloc[0])
+    return None
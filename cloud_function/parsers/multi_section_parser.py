@@ -4,27 +4,30 @@ import pandas as pd
 from utils.logger import logger
 
 
-def parse_multi_section_csv(file_path):
+def parse_multi_section_csv(file_path, only_sections=None):
     """
     Parse a CSV file and extract all sections.
     
     Args:
         file_path (str): Path to the CSV file
+        only_sections (set, optional): Raw section names to keep (e.g. registered_sections());
+            lines of any other section are skipped before CSV parsing. Defaults to all sections.
         
     Returns:
         dict: Dictionary with section names as keys and DataFrames as values
     """
-    sections_temp = _read_csv_to_temp_sections(file_path)
+    sections_temp = _read_csv_to_temp_sections(file_path, only_sections)
     parsed_sections = _process_temp_sections_to_dataframes(sections_temp)
     return parsed_sections
 
 
-def _read_csv_to_temp_sections(file_path):
+def _read_csv_to_temp_sections(file_path, only_sections=None):
     """
     Read the CSV file and organize rows by section in a temporary structure.
     
     Args:
         file_path (str): Path to the CSV file
+        only_sections (set, optional): Raw section names to keep, None keeps all
         
     Returns:
         defaultdict: Dictionary with section names as keys and lists of (row_type, row_data) tuples
@@ -43,6 +46,8 @@ def _read_csv_to_temp_sections(file_path):
                     continue
                     
                 section = parts[0].strip()
+                if only_sections is not None and section not in only_sections:
+                    continue
                 row_type = parts[1].strip()
                 tail = parts[2]
                 
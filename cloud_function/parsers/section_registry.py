@@ -0,0 +1,115 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+
+TRADES_SECTION = "Trades"
+
+
+class SectionHandler:
+    """
+    Declares which IBKR statement section a handler consumes.
+
+    Args:
+        section: Section name as it appears in the first CSV column (e.g. "Dividends")
+        kind: Processing path in main.py: "trades", "cash_report", "cash_event", "fx_rate" or "account"
+        schema: Header columns the handler reads; sections missing any of them are skipped
+        sink: Supabase table the records end up in
+        asset_category: Trades asset category (e.g. "Stocks"), Trades handlers only
+        trade_type: Record builder key in trade_parser ("stocks", "options", "bonds")
+    """
+
+    def __init__(self, section: str, kind: str, schema: Tuple[str, ...], sink: Optional[str] = None,
+                 asset_category: Optional[str] = None, trade_type: Optional[str] = None):
+        self.section = section
+        self.kind = kind
+        self.schema = tuple(schema)
+        self.sink = sink
+        self.asset_category = asset_category
+        self.trade_type = trade_type
+
+    @property
+    def section_key(self) -> str:
+        """Key of the parsed section in parse_multi_section_csv output."""
+        if self.asset_category:
+            return f"{self.section} {self.asset_category}"
+        return self.section
+
+    def matches(self, section_key: str) -> bool:
+        # Repeated blocks of the same section are keyed "<section> 1", "<section> 2", ...
+        return section_key == self.section_key or re.fullmatch(rf"{re.escape(self.section_key)} \d+", section_key) is not None
+
+    def missing_columns(self, columns) -> List[str]:
+        return [column for column in self.schema if column not in columns]
+
+    def __repr__(self) -> str:
+        return f"SectionHandler({self.section_key!r}, kind={self.kind!r}, sink={self.sink!r})"
+
+
+SECTION_HANDLERS: List[SectionHandler] = []
+
+
+def register_section_handler(handler: SectionHandler) -> SectionHandler:
+    """Add a handler; its section is then parsed, every other section is skipped line by line."""
+    SECTION_HANDLERS.append(handler)
+    return handler
+
+
+def registered_sections() -> set:
+    """Raw section names the parsers should build structures for."""
+    return {handler.section for handler in SECTION_HANDLERS}
+
+
+def find_section_handler(section_key: str, kind: Optional[str] = None) -> Optional[SectionHandler]:
+    """
+    Find the handler for a parsed section key.
+
+    Args:
+        section_key: Key from parse_multi_section_csv (e.g. "Trades Stocks", "Dividends")
+        kind: Optionally restrict the lookup to one handler kind
+
+    Returns:
+        SectionHandler or None when the section is not registered
+    """
+    for handler in SECTION_HANDLERS:
+        if (kind is None or handler.kind == kind) and handler.matches(section_key):
+            return handler
+    return None
+
+
+def handlers_of_kind(kind: str) -> List[SectionHandler]:
+    return [handler for handler in SECTION_HANDLERS if handler.kind == kind]
+
+
+def sections_for(sections: Dict, kind: str):
+    """
+    Yield (section_key, handler, df) for parsed sections of one handler kind
+    whose header provides the handler's schema.
+    """
+    for section_key, df in sections.items():
+        handler = find_section_handler(section_key, kind)
+        if handler is None or df is None:
+            continue
+        missing = handler.missing_columns(df.columns)
+        if missing:
+            logger.warning(f"⚠️  Section {section_key} is missing column(s) {missing}. Skipping.")
+            continue
+        yield section_key, handler, df
+
+
+TRADES_SCHEMA = ("Asset Category", "Symbol", "Date/Time", "Quantity", "T. Price")
+CASH_REPORT_SCHEMA = ("Currency Summary", "Currency", "Total")
+CASH_EVENT_SCHEMA = ("Currency", "Date", "Description", "Amount")
+FX_RATE_SCHEMA = ("Currency", "Rate")
+ACCOUNT_SCHEMA = ("Field Name", "Field Value")
+
+register_section_handler(SectionHandler(TRADES_SECTION, "trades", TRADES_SCHEMA, sink="asset_transactions",
+                                        asset_category="Stocks", trade_type="stocks"))
+register_section_handler(SectionHandler(TRADES_SECTION, "trades", TRADES_SCHEMA, sink="option_transactions",
+                                        asset_category="Equity and Index Options", trade_type="options"))
+register_section_handler(SectionHandler(TRADES_SECTION, "trades", TRADES_SCHEMA, sink="asset_transactions",
+                                        asset_category="Treasury Bills", trade_type="bonds"))
+register_section_handler(SectionHandler("Cash Report", "cash_report", CASH_REPORT_SCHEMA, sink="cash_flows"))
+for _section in ("Dividends", "Withholding Tax", "Interest", "Fees"):
+    register_section_handler(SectionHandler(_section, "cash_event", CASH_EVENT_SCHEMA, sink="cash_events"))
+register_section_handler(SectionHandler("Base Currency Exchange Rate", "fx_rate", FX_RATE_SCHEMA))
+register_section_handler(SectionHandler("Account Information", "account", ACCOUNT_SCHEMA))
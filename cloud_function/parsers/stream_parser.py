@@ -0,0 +1,102 @@
+import os
+import csv
+from collections import defaultdict
+from utils.logger import logger
+from parsers.multi_section_parser import _make_subsection_key, _process_temp_sections_to_dataframes
+
+# Maximum number of Trades rows held in memory at once in streaming mode
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+STREAMED_SECTION = "Trades"
+
+
+def iter_trade_row_batches(source, batch_size=STREAM_BATCH_SIZE, other_sections=None, only_sections=None):
+    """
+    Stream Trades rows from a statement in bounded batches.
+
+    Trades rows are never accumulated beyond `batch_size`; rows of every other
+    section are small and are collected into `other_sections` (same layout as
+    the multi-section parser's temporary structure) for the caller to turn
+    into DataFrames with collect_section_dataframes once the stream is done.
+
+    Args:
+        source: Path of the CSV file or an open text file object
+        batch_size: Maximum number of rows per yielded batch
+        other_sections: Optional defaultdict(list) receiving (row_type, row) per non-Trades section
+        only_sections: Raw section names to collect into other_sections, None collects all
+
+    Yields:
+        Tuples of (section_key, header, rows) where section_key matches the
+        keys of parse_multi_section_csv (e.g. "Trades Stocks") and rows are
+        dicts keyed by header, padded/truncated to the header length
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8-sig") as f:
+            yield from iter_trade_row_batches(f, batch_size, other_sections, only_sections)
+        return
+
+    block_counter = 0
+    header = None
+    section_key = None
+    rows = []
+
+    for raw_line in source:
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        parts = line.split(',', 2)
+        if len(parts) < 3:
+            continue
+
+        section = parts[0].strip()
+        if section != STREAMED_SECTION:
+            if other_sections is not None and (only_sections is None or section in only_sections):
+                row = next(csv.reader([parts[2]], quotechar='"', skipinitialspace=True))
+                other_sections[section].append((parts[1].strip(), row))
+            continue
+
+        row_type = parts[1].strip()
+        parsed_row = next(csv.reader([parts[2]], quotechar='"', skipinitialspace=True))
+
+        if row_type == "Header":
+            if rows:
+                yield section_key, header, rows
+                rows = []
+            if section_key is not None:
+                block_counter += 1
+            header = parsed_row
+            section_key = None
+        elif row_type == "Data" and header is not None:
+            if section_key is None:
+                # Asset Category is the 2nd field of the first data row, as in the batch parser
+                asset_type = parsed_row[1].strip() if len(parsed_row) > 1 else None
+                if not asset_type:
+                    logger.warning(f"Could not determine asset type for Trades block {block_counter} due to insufficient columns in first data row.")
+                section_key = _make_subsection_key(STREAMED_SECTION, block_counter, asset_type)
+            rows.append(_row_to_dict(header, parsed_row))
+            if len(rows) >= batch_size:
+                yield section_key, header, rows
+                rows = []
+
+    if rows:
+        yield section_key, header, rows
+
+
+def collect_section_dataframes(other_sections):
+    """
+    Build DataFrames for the non-Trades sections collected while streaming.
+
+    Args:
+        other_sections: Sections collected by iter_trade_row_batches
+
+    Returns:
+        dict: Section names as keys and DataFrames as values (see parse_multi_section_csv)
+    """
+    return _process_temp_sections_to_dataframes(other_sections)
+
+
+def _row_to_dict(header, row):
+    if len(row) < len(header):
+        row = row + [None] * (len(header) - len(row))
+    return dict(zip(header, row))
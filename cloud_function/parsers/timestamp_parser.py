@@ -0,0 +1,99 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from utils.logger import logger
+
+# Timezone IBKR statement timestamps are expressed in (the account's reporting timezone)
+STATEMENT_TIMEZONE = os.getenv("STATEMENT_TIMEZONE", "America/New_York")
+
+# Formats seen in IBKR Activity Statements and Flex queries, after commas are stripped
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y%m%d;%H%M%S",
+    "%Y%m%d %H%M%S",
+    "%Y%m%d",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y",
+)
+
+
+# Detected format per timestamp shape (digits masked, e.g. "9999-99-99 99:99:99")
+_SHAPE_FORMATS = {}
+
+
+def _parse_format(sample: str):
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            pd.to_datetime(sample, format=fmt)
+            return fmt
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def detect_timestamp_format(sample: str):
+    """
+    strptime format of a statement timestamp, or None if it is not recognized.
+
+    Detection is cached by the shape of the string (digits masked), so it
+    runs once per shape rather than once per distinct timestamp. Only
+    recognized formats are cached: a sample that fails (e.g. "13/01/2025")
+    does not rule out its shape for the next one.
+    """
+    shape = re.sub(r"\d", "9", sample)
+    fmt = _SHAPE_FORMATS.get(shape)
+    if fmt is None:
+        fmt = _parse_format(sample)
+        if fmt is not None:
+            _SHAPE_FORMATS[shape] = fmt
+    return fmt
+
+
+def normalize_timestamps(values, timezone: str = STATEMENT_TIMEZONE):
+    """
+    Convert raw statement timestamps to ISO 8601 strings with the UTC offset
+    of `timezone` (e.g. "2025-04-01 09:30:00" -> "2025-04-01T09:30:00-04:00").
+
+    The format is detected from the first non-empty value and the whole
+    column is parsed and localized in one vectorized call. Values that do
+    not match the format are kept as they were.
+
+    Args:
+        values: Raw timestamp strings (commas already stripped)
+        timezone: IANA timezone the statement times are expressed in
+
+    Returns:
+        list: ISO timestamps, in the order of `values`
+    """
+    raw = pd.Series(list(values), dtype="string")
+    sample = next((value for value in raw.dropna() if value.strip()), None)
+    fmt = detect_timestamp_format(sample.strip()) if sample else None
+    if fmt is None:
+        if sample:
+            logger.warning(f"⚠️ Unrecognized timestamp format {sample!r}; keeping raw executed_at values")
+        return raw.fillna("").tolist()
+
+    parsed = pd.to_datetime(raw.str.strip(), format=fmt, errors="coerce")
+    # Times repeated by the DST fall-back are read as standard time
+    localized = parsed.dt.tz_localize(timezone, ambiguous=np.zeros(len(parsed), dtype=bool), nonexistent="shift_forward")
+
+    # strftime is per element; build "<local time><offset>" from datetime64 arrays instead
+    local = localized.dt.tz_localize(None)
+    offset_minutes = (local - localized.dt.tz_convert("UTC").dt.tz_localize(None)).dt.total_seconds() // 60
+    offsets = offset_minutes.map({minutes: _format_offset(minutes) for minutes in offset_minutes.dropna().unique()})
+    stamps = pd.Series(np.datetime_as_string(local.to_numpy(dtype="datetime64[s]"), unit="s"), dtype="string")
+    iso = (stamps + offsets.astype("string")).where(local.notna())
+
+    unparsed = iso.isna() & raw.notna() & (raw.str.strip() != "")
+    if unparsed.any():
+        logger.warning(f"⚠️ {int(unparsed.sum())} timestamp(s) did not match {fmt!r} in {timezone}; kept raw")
+    return iso.where(~unparsed, raw).fillna("").tolist()
+
+
+def _format_offset(minutes: float) -> str:
+    sign = "-" if minutes < 0 else "+"
+    hours, minutes = divmod(abs(int(minutes)), 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
@@ -1,47 +1,148 @@
 import pandas as pd
-from utils.logger import logger
+from utils.logger import logger, LogAggregator
+from utils.spans import span
 from utils.helpers import generate_transaction_id
 from builders.asset_builder import build_asset_record
 from builders.option_builder import build_option_record
 from builders.bond_builder import build_bond_record
-from services.supabase_service import insert_batch_to_supabase
+from services.supabase_service import (
+    insert_batch_to_supabase, prefetch_existing_ids, CHUNK_SIZE, SUPABASE_DEDUP_STRATEGY
+)
+from parsers.section_registry import handlers_of_kind, find_section_handler
+from parsers.timestamp_parser import normalize_timestamps
 
-def parse_trades_df(df: pd.DataFrame, trade_type: str, counters: dict):
-    transactions = []
+TRADE_TYPE_TABLES = {handler.trade_type: handler.sink for handler in handlers_of_kind("trades")}
+
+
+def detect_trade_type(section_name: str):
+    """
+    Map a parsed Trades section key (e.g. "Trades Stocks") to a trade type
+    using the Trades handlers of the section registry.
+
+    Returns:
+        "stocks", "options", "bonds" or None for unsupported sections
+    """
+    handler = find_section_handler(section_name, "trades")
+    return handler.trade_type if handler else None
+
+
+def parse_trades_df(df: pd.DataFrame, trade_type: str, counters: dict, dedup_index=None, checkpoint=None, section_name=None):
+    """Build and upload the records of one Trades section; returns the records that were not duplicates."""
+    if trade_type not in TRADE_TYPE_TABLES:
+        logger.warning(f"Unsupported trade_type: {trade_type}. Skipping.")
+        return [], [] # Return empty lists for stock/option to match original structure if needed
+
+    with span("trades.build", trade_type=trade_type, rows=len(df)):
+        transactions = build_trade_records(df, trade_type, counters)
+
+    return upload_trade_records(transactions, trade_type, counters, dedup_index, checkpoint, section_name)
+
+
+def upload_trade_records(transactions, trade_type: str, counters: dict, dedup_index=None, checkpoint=None,
+                         section_name=None, offset=0):
+    """
+    Drop duplicates and insert trade records into their Supabase table.
+
+    Args:
+        transactions: Records built by build_trade_records(_from_rows)
+        trade_type: "stocks", "options" or "bonds"
+        counters: Counters dict, "<trade_type>_inserted" and "duplicates_dropped" are updated
+        dedup_index: Optional DedupIndex shared across sections
+        checkpoint: Optional file checkpoint
+        section_name: Parsed section key, used for the checkpoint stage name
+        offset: Offset of the first record within the section (streaming batches)
+
+    Returns:
+        List of records left after dedup
+    """
     batch_size = 100  # Process in batches of 100 records
 
-    # Determine target table and record builder based on trade_type
+    # Drop repeats (within and across sections) before any network call
+    if dedup_index is not None:
+        dropped_before = dedup_index.dropped
+        transactions = dedup_index.filter(transactions)
+        dropped = dedup_index.dropped - dropped_before
+        if dropped:
+            counters["duplicates_dropped"] = counters.get("duplicates_dropped", 0) + dropped
+            logger.info(f"♻️  Dropped {dropped} duplicate {trade_type} record(s) before upload")
+
+    target_table = TRADE_TYPE_TABLES[trade_type]
+
+    if transactions:
+        # One paged lookup over the section's executed_at window instead of one per chunk
+        known_ids = prefetch_existing_ids(target_table, transactions)
+        # Checkpoint offsets are chunk starts, so the chunk size of a stage depends on configuration only,
+        # never on whether the range lookup of this attempt worked
+        chunk_size = batch_size if SUPABASE_DEDUP_STRATEGY == "range" else CHUNK_SIZE
+        for i in range(0, len(transactions), batch_size):
+            batch = transactions[i:i + batch_size]
+            tx_ids = [r["transaction_id"] for r in batch]
+            inserted = insert_batch_to_supabase(
+                target_table, batch, tx_ids,
+                checkpoint=checkpoint, stage=f"{section_name or trade_type}:{target_table}", offset=offset + i,
+                chunk_size=chunk_size, known_ids=known_ids
+            )
+            counters[f"{trade_type}_inserted"] += inserted
+
+    return transactions
+
+
+def build_trade_records(df: pd.DataFrame, trade_type: str, counters: dict):
+    """
+    Build transaction records from a Trades section without writing them anywhere.
+
+    Args:
+        df: Trades section DataFrame
+        trade_type: "stocks", "options" or "bonds"
+        counters: Counters dict, "<trade_type>_processed" is incremented per row
+
+    Returns:
+        List of transaction records
+    """
+    logger.info(f"🔎 Processing {len(df)} {trade_type} row(s)...")
+    return build_trade_records_from_rows((row.to_dict() for _, row in df.iterrows()), trade_type, counters)
+
+
+def build_trade_records_from_rows(rows, trade_type: str, counters: dict):
+    """
+    Build transaction records from Trades rows given as dicts keyed by column name.
+
+    Shared by the DataFrame path and the streaming parser, which hands over
+    bounded batches of rows without building a DataFrame.
+
+    Args:
+        rows: Iterable of row dicts (e.g. {"Symbol": "AAPL", "Quantity": "10", ...})
+        trade_type: "stocks", "options" or "bonds"
+        counters: Counters dict, "<trade_type>_processed" is incremented per row
+
+    Returns:
+        List of transaction records
+    """
+    transactions = []
+
+    # Determine record builder based on trade_type
     if trade_type == "options":
         record_builder = build_option_record
-        target_table = "option_transactions"
     elif trade_type == "stocks":
         record_builder = build_asset_record
-        target_table = "asset_transactions"
     elif trade_type == "bonds":
         record_builder = build_bond_record
-        target_table = "asset_transactions"
     else:
         logger.warning(f"Unsupported trade_type: {trade_type}. Skipping.")
-        return [], [] # Return empty lists for stock/option to match original structure if needed
-
-    logger.info(f"🔎 Processing {len(df)} {trade_type} row(s)...")
-    for idx, row in df.iterrows():
+        return transactions
 
+    asset_categories = {handler.trade_type: handler.asset_category for handler in handlers_of_kind("trades")}
+    skipped_categories = LogAggregator(f"⏩ Skipped {{count:,}} row(s) with Asset Category {{key!r}} in {trade_type} section")
+    for row in rows:
         counters[f"{trade_type}_processed"] += 1
                 
-        raw_data = clean_nan(row.to_dict())
+        raw_data = clean_nan(row)
         
-        # Asset category check can be simplified or removed if main.py ensures correct df
-        asset_category_map = {
-            "stocks": "Stocks",
-            "options": "Equity and Index Options",
-            "bonds": "Treasury Bills" # Assuming this is the category name in CSV for bonds
-        }
-        expected_asset_category = asset_category_map.get(trade_type)
+        expected_asset_category = asset_categories.get(trade_type)
         current_asset_category = str(raw_data.get("Asset Category", "")).strip()
 
         if expected_asset_category and current_asset_category != expected_asset_category:
-            logger.info(f"⏩ Skipping row with Asset Category: {current_asset_category} for expected {expected_asset_category}")
+            skipped_categories.add(current_asset_category)
             continue
 
         symbol = str(raw_data.get("Symbol", "")).strip()
@@ -91,17 +192,12 @@ def parse_trades_df(df: pd.DataFrame, trade_type: str, counters: dict):
         rec = record_builder(**record_params)
         transactions.append(rec)
 
-    if transactions:
-        for i in range(0, len(transactions), batch_size):
-            batch = transactions[i:i + batch_size]
-            tx_ids = [r["transaction_id"] for r in batch]
-            inserted = insert_batch_to_supabase(target_table, batch, tx_ids)
-            counters[f"{trade_type}_inserted"] += inserted
-    
-    # To maintain compatibility with how results are expected in main.py (stx, otx)
-    # This part needs careful handling based on how main.py will use the returned values.
-    # For now, let's assume parse_trades_df is called per type, so it returns one list.
-    return transactions # Caller will assign to appropriate list (stocks, options, bonds)
+    skipped_categories.flush()
+
+    # The transaction ID stays on the raw string; only the stored executed_at is normalized
+    for record, executed_at in zip(transactions, normalize_timestamps(r["executed_at"] for r in transactions)):
+        record["executed_at"] = executed_at
+    return transactions
 
 def clean_nan(raw_dict):
     """
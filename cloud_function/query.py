@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import argparse
+from datetime import date
+from dotenv import load_dotenv
+load_dotenv()
+import pandas as pd
+from utils.logger import logger
+from services.sqlite_service import AnalyticsStore, SQLITE_PATH
+
+
+def run_query(store, args):
+    """
+    Run the query selected on the command line.
+
+    Returns:
+        list: Result rows as dicts
+    """
+    if args.command == "ticker":
+        return store.ticker_history(args.ticker.upper(), start=args.start, end=args.end)
+    if args.command == "open-options":
+        expiring_from = None if args.include_expired else date.today().isoformat()
+        return store.open_options(expiring_from=expiring_from, expiring_to=args.until)
+    if args.command == "cash":
+        return store.cash_by_date(currency=args.currency, start=args.start, end=args.end)
+    raise ValueError(f"unknown command {args.command}")
+
+
+def main_query(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local SQLite analytics store.")
+    parser.add_argument("--db", default=SQLITE_PATH, help="Database file (default: SQLITE_PATH)")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ticker = commands.add_parser("ticker", help="Transactions of one ticker (stocks and option underlyings)")
+    ticker.add_argument("ticker")
+    ticker.add_argument("--from", dest="start", help="Earliest execution date (YYYY-MM-DD)")
+    ticker.add_argument("--to", dest="end", help="Latest execution date (YYYY-MM-DD)")
+
+    options = commands.add_parser("open-options", help="Option contracts still held, by expiration")
+    options.add_argument("--until", help="Latest expiration (YYYY-MM-DD)")
+    options.add_argument("--include-expired", action="store_true", help="Also list contracts past expiration")
+
+    cash = commands.add_parser("cash", help="Ending cash by statement date and currency")
+    cash.add_argument("--currency")
+    cash.add_argument("--from", dest="start", help="Earliest statement date (YYYY-MM-DD)")
+    cash.add_argument("--to", dest="end", help="Latest statement date (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    if not args.db or not os.path.exists(args.db):
+        logger.error("No analytics database found; set SQLITE_PATH or pass --db.")
+        return
+
+    store = AnalyticsStore(args.db)
+    query_start = time.perf_counter()
+    rows = run_query(store, args)
+    elapsed_ms = (time.perf_counter() - query_start) * 1000
+    store.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2, default=str))
+    elif rows:
+        print(pd.DataFrame(rows).to_string(index=False))
+    logger.info(f"🔎 {args.command}: {len(rows)} row(s) in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main_query()
@@ -0,0 +1,120 @@
+import os
+import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+load_dotenv()
+from utils.logger import logger
+from services.spool_service import Spool, get_spool, configure_spool, SPOOL_BACKEND, SPOOL_MAX_ATTEMPTS
+from services.supabase_service import replay_chunk_to_supabase, UPSERT_CHUNK_SIZE
+from services.sheets_service import replay_rows_to_sheet
+
+BUCKET_NAME = os.getenv("BUCKET_NAME")
+STATE_BUCKET_NAME = os.getenv("STATE_BUCKET_NAME") or BUCKET_NAME
+# Concurrent Supabase requests while replaying
+REPLAY_WORKERS = int(os.getenv("REPLAY_WORKERS", "4"))
+
+
+def replay_spool(spool: Spool, workers: int = REPLAY_WORKERS, batch_size: int = UPSERT_CHUNK_SIZE,
+                 sink=None, dry_run: bool = False):
+    """
+    Re-send every spooled batch, merged per sink and table.
+
+    Supabase rows are regrouped into batches of `batch_size` and posted
+    concurrently; Sheets rows are appended per worksheet after skipping rows
+    already present. Rows that fail again are spooled as a new entry with the
+    attempt count raised before the original entries are deleted, so a crash
+    mid-replay never loses rows (replaying twice is harmless: both sinks skip
+    rows they already have).
+
+    Args:
+        spool: Spool to drain
+        workers: Concurrent Supabase requests
+        batch_size: Supabase rows per request
+        sink: Only replay "supabase" or "sheets" entries
+        dry_run: Only report what would be replayed
+
+    Returns:
+        dict: Counters (entries, rows, written, failed, skipped)
+    """
+    summary = defaultdict(int)
+    groups = defaultdict(lambda: {"names": [], "rows": [], "attempts": 0, "key_width": 1})
+    for name in spool.entries(sink):
+        try:
+            entry = spool.load(name)
+        except ValueError as e:
+            logger.warning(f"⚠️ [Spool] Skipping {name}: {e}")
+            continue
+        if entry is None:
+            continue
+        if entry["attempts"] >= SPOOL_MAX_ATTEMPTS:
+            summary["skipped"] += 1
+            logger.warning(f"⚠️ [Spool] {name} failed {entry['attempts']} time(s), left for inspection: {entry['error']}")
+            continue
+        group = groups[(entry["sink"], entry["table"])]
+        group["names"].append(name)
+        group["rows"].extend(entry["rows"])
+        group["attempts"] = max(group["attempts"], entry["attempts"])
+        group["key_width"] = entry.get("key_width", 1)
+        summary["entries"] += 1
+        summary["rows"] += len(entry["rows"])
+
+    for (entry_sink, table), group in groups.items():
+        logger.info(f"📬 [Spool] {entry_sink}:{table}: {len(group['rows'])} row(s) from {len(group['names'])} entry(ies)")
+        if dry_run:
+            continue
+        if entry_sink == "supabase":
+            written, failed, error = _replay_supabase(table, group["rows"], workers, batch_size)
+        else:
+            written, failed, error = replay_rows_to_sheet(table, group["rows"], group["key_width"])
+        summary["written"] += written
+        summary["failed"] += len(failed)
+        if failed:
+            logger.error(f"❌ [Spool] {len(failed)} row(s) for {entry_sink}:{table} failed again: {error}")
+            if not spool.append(entry_sink, table, failed, error, attempts=group["attempts"] + 1,
+                                key_width=group["key_width"] if entry_sink == "sheets" else None):
+                continue  # keep the originals rather than lose the rows
+        for name in group["names"]:
+            spool.delete(name)
+    return dict(summary)
+
+
+def _replay_supabase(table, rows, workers, batch_size):
+    chunks = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda chunk: replay_chunk_to_supabase(table, chunk), chunks))
+
+    written, failed, error = 0, [], None
+    for chunk, (inserted, chunk_error) in zip(chunks, results):
+        if inserted is None:
+            failed.extend(chunk)
+            error = chunk_error
+        else:
+            written += inserted
+    return written, failed, error
+
+
+def main_replay(argv=None):
+    parser = argparse.ArgumentParser(description="Replay sink batches spooled after failed writes.")
+    parser.add_argument("--sink", choices=["supabase", "sheets"], help="Only replay one sink")
+    parser.add_argument("--workers", type=int, default=REPLAY_WORKERS, help="Concurrent Supabase requests")
+    parser.add_argument("--batch-size", type=int, default=UPSERT_CHUNK_SIZE, help="Supabase rows per request")
+    parser.add_argument("--dry-run", action="store_true", help="List spooled batches without sending them")
+    args = parser.parse_args(argv)
+
+    if SPOOL_BACKEND == "gcs" and STATE_BUCKET_NAME:
+        from google.cloud import storage
+        configure_spool(storage.Client().bucket(STATE_BUCKET_NAME))
+    spool = get_spool()
+    if spool is None:
+        logger.error("Spool is disabled (SPOOL_BACKEND=none).")
+        return
+
+    summary = replay_spool(spool, workers=args.workers, batch_size=args.batch_size, sink=args.sink, dry_run=args.dry_run)
+    logger.info(f"✅ Replay completed: {summary.get('entries', 0)} entry(ies), {summary.get('rows', 0)} row(s), "
+                f"{summary.get('written', 0)} written, {summary.get('failed', 0)} failed again, "
+                f"{summary.get('skipped', 0)} over the attempt limit")
+
+
+if __name__ == "__main__":
+    main_replay()
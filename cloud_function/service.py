@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import queue
+import base64
+import signal
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from main import BUCKET_NAME, handle_gcs_event, process_local_file
+from utils.logger import logger, flush_logs
+
+# Environment variables
+SERVICE_HOST = os.getenv("SERVICE_HOST", "0.0.0.0")
+SERVICE_PORT = int(os.getenv("PORT", "8080"))
+# Statements processed at once; each holds one parsed statement in memory
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+# Statements waiting for a worker before new events are rejected with 429
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "32"))
+# Without BUCKET_NAME, event names are read as paths under this directory
+SERVICE_INPUT_DIR = os.getenv("SERVICE_INPUT_DIR", "")
+RETRY_AFTER_SECONDS = 30
+
+
+class StatementService:
+    """
+    Bounded pool of workers processing statement events from a queue.
+
+    Clients (GCS bucket, Sheets, Supabase sessions) are created on first use
+    and shared by all workers, so only the first statement pays for imports,
+    OAuth and TLS. A file generation that is already queued or running is
+    not queued again (a re-upload is a new generation and is queued), and a
+    full queue rejects events so the caller backs off and retries instead of
+    piling up memory.
+
+    Args:
+        handler: Callable processing one event dict
+        workers: Worker thread count
+        queue_size: Maximum number of waiting events
+    """
+
+    def __init__(self, handler, workers: int = SERVICE_WORKERS, queue_size: int = SERVICE_QUEUE_SIZE):
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.pending = set()  # files queued or running
+        self.running = set()
+        self.counters = {"accepted": 0, "duplicates": 0, "rejected": 0, "processed": 0, "failed": 0}
+        self.last_error = None
+        self.started = time.monotonic()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"statement-worker-{i}", daemon=True) for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, event) -> str:
+        """
+        Queue an event.
+
+        Returns:
+            "queued", "duplicate" (same file generation already queued or running) or "full"
+        """
+        file_key = _file_key(event)
+        with self.lock:
+            if file_key in self.pending:
+                self.counters["duplicates"] += 1
+                return "duplicate"
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                self.counters["rejected"] += 1
+                return "full"
+            self.pending.add(file_key)
+            self.counters["accepted"] += 1
+        return "queued"
+
+    def _work(self) -> None:
+        while True:
+            event = self.queue.get()
+            if event is None:
+                self.queue.task_done()
+                return
+            file_key = _file_key(event)
+            with self.lock:
+                self.running.add(file_key)
+            outcome = "failed"
+            try:
+                self.handler(event)
+                outcome = "processed"
+            except Exception as e:
+                logger.error(f"❌ [Service] {file_key} failed: {type(e).__name__}: {e}")
+                self.last_error = f"{file_key}: {type(e).__name__}: {e}"
+            finally:
+                with self.lock:
+                    self.running.discard(file_key)
+                    self.pending.discard(file_key)
+                    self.counters[outcome] += 1
+                self.queue.task_done()
+
+    def stop(self) -> None:
+        """Let the queued statements finish, then stop the workers."""
+        self.queue.join()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "workers": len(self.threads),
+                "queued": self.queue.qsize(),
+                "queue_size": self.queue.maxsize,
+                "running": sorted(self.running),
+                "uptime_seconds": round(time.monotonic() - self.started),
+                "last_error": self.last_error,
+                **self.counters,
+            }
+
+
+def _file_key(event) -> str:
+    key = f"{event.get('bucket', '')}/{event['name']}"
+    return f"{key}#{event['generation']}" if event.get("generation") else key
+
+
+def parse_event(body: bytes):
+    """
+    GCS object event from a request body.
+
+    Accepts the object resource itself ({"name": ..., "bucket": ...}), a
+    CloudEvent with it under "data", or a Pub/Sub push envelope carrying it
+    base64-encoded in message.data.
+
+    Returns:
+        dict with at least "name"
+
+    Raises:
+        ValueError: if no object name can be found
+    """
+    payload = json.loads(body or b"{}")
+    if isinstance(payload.get("message"), dict):
+        payload = json.loads(base64.b64decode(payload["message"].get("data", "")) or b"{}")
+    elif "name" not in payload and isinstance(payload.get("data"), dict):
+        payload = payload["data"]
+    if not payload.get("name"):
+        raise ValueError("event has no object name")
+    return payload
+
+
+def handle_event(event) -> None:
+    """Process one statement: the bucket object when BUCKET_NAME is set, a local file otherwise."""
+    if BUCKET_NAME:
+        handle_gcs_event(event)
+    else:
+        process_local_file(os.path.join(SERVICE_INPUT_DIR, event["name"]))
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    service: StatementService = None
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._reply(200, {"status": "ok"})
+        elif self.path == "/status":
+            self._reply(200, self.service.status())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            event = parse_event(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        except (ValueError, TypeError) as e:
+            self._reply(400, {"error": f"invalid event: {e}"})
+            return
+
+        outcome = self.service.submit(event)
+        if outcome == "full":
+            logger.warning(f"⏳ [Service] Queue full, rejecting {event['name']}")
+            self._reply(429, {"status": outcome, "file": event["name"]}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+        logger.info(f"📥 [Service] {event['name']}: {outcome} ({self.service.queue.qsize()} waiting)")
+        self._reply(202, {"status": outcome, "file": event["name"]})
+
+    def _reply(self, code, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"[Service] {self.address_string()} {format % args}")
+
+
+def main_service():
+    service = StatementService(handle_event)
+    service.start()
+    ServiceRequestHandler.service = service
+    server = ThreadingHTTPServer((SERVICE_HOST, SERVICE_PORT), ServiceRequestHandler)
+
+    # Cloud Run sends SIGTERM before stopping the instance; stop accepting and finish what is queued
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    logger.info(f"🚀 Service listening on {SERVICE_HOST}:{SERVICE_PORT} with {SERVICE_WORKERS} worker(s), "
+                f"queue of {SERVICE_QUEUE_SIZE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"🛑 Service stopping, finishing {service.queue.qsize()} queued statement(s)")
+        service.stop()
+        flush_logs()
+
+
+if __name__ == "__main__":
+    main_service()
@@ -0,0 +1,97 @@
+import os
+from typing import List, Optional
+from utils.logger import logger
+
+
+class LocalBlobStore:
+    """Local stand-in for a GCS prefix: one file per blob under a directory."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root_dir, name)
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, name: str, data: bytes) -> None:
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a killed process never leaves a half-written blob
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str = "") -> List[str]:
+        names = []
+        for dir_path, _, file_names in os.walk(self.root_dir):
+            for file_name in file_names:
+                if file_name.endswith(".tmp"):
+                    continue
+                name = os.path.relpath(os.path.join(dir_path, file_name), self.root_dir)
+                if name.startswith(prefix):
+                    names.append(name)
+        return sorted(names)
+
+
+class GcsBlobStore:
+    """Blob store backed by objects under a prefix of a GCS bucket."""
+
+    def __init__(self, bucket, prefix: str):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, name: str) -> Optional[bytes]:
+        blob = self.bucket.blob(f"{self.prefix}{name}")
+        if not blob.exists():
+            return None
+        return blob.download_as_bytes()
+
+    def put(self, name: str, data: bytes) -> None:
+        self.bucket.blob(f"{self.prefix}{name}").upload_from_string(data)
+
+    def delete(self, name: str) -> None:
+        blob = self.bucket.blob(f"{self.prefix}{name}")
+        if blob.exists():
+            blob.delete()
+
+    def list(self, prefix: str = "") -> List[str]:
+        blobs = self.bucket.list_blobs(prefix=f"{self.prefix}{prefix}")
+        return sorted(blob.name[len(self.prefix):] for blob in blobs)
+
+
+def get_blob_store(backend: str, local_dir: str, bucket=None, prefix: str = ""):
+    """
+    Create a blob store for the given backend.
+
+    Args:
+        backend: "local", "gcs" or "none"
+        local_dir: Directory used by the local stand-in
+        bucket: GCS bucket used by the "gcs" backend
+        prefix: Object prefix used by the "gcs" backend
+
+    Returns:
+        Blob store, or None when the backend is disabled
+    """
+    backend = (backend or "local").lower()
+    if backend == "none":
+        return None
+    if backend == "gcs":
+        if bucket is None:
+            logger.warning(f"⚠️ GCS blob store requires a bucket, falling back to {local_dir}.")
+            return LocalBlobStore(local_dir)
+        return GcsBlobStore(bucket, prefix)
+    return LocalBlobStore(local_dir)
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import base64
+import hashlib
+from typing import Optional
+from utils.logger import logger
+from services.blob_store import get_blob_store
+
+# Environment variables
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "local")  # local | gcs | none
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "/tmp/investflow_checkpoints")
+CHECKPOINT_PREFIX = os.getenv("CHECKPOINT_PREFIX", "_checkpoints/")
+CHECKPOINT_FLUSH_SECONDS = float(os.getenv("CHECKPOINT_FLUSH_SECONDS", "5"))
+
+
+class Checkpoint:
+    """
+    Per-file log of committed sink chunks.
+
+    Stages are named "<section>:<table>" for Supabase and "sheets:<sheet>"
+    for Google Sheets. Offsets are record offsets within a stage, which are
+    stable across retries because record building and dedup are deterministic.
+    Commits are flushed at most every CHECKPOINT_FLUSH_SECONDS; anything lost
+    on a hard timeout is simply re-checked remotely on the next attempt.
+    """
+
+    def __init__(self, store, file_key: str):
+        self.store = store
+        self.name = f"{file_key}.json"
+        self.committed = {}
+        self.done = set()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._load()
+
+    def _load(self) -> None:
+        raw = self.store.get(self.name)
+        if not raw:
+            return
+        try:
+            state = json.loads(raw)
+            self.committed = {stage: set(offsets) for stage, offsets in state.get("committed", {}).items()}
+            self.done = set(state.get("done", []))
+            chunk_count = sum(len(offsets) for offsets in self.committed.values())
+            logger.info(f"⏯️  Resuming from checkpoint: {chunk_count} committed chunk(s), {len(self.done)} completed stage(s)")
+        except ValueError as e:
+            logger.warning(f"⚠️ Ignoring unreadable checkpoint {self.name}: {e}")
+
+    def is_committed(self, stage: str, offset: int) -> bool:
+        return offset in self.committed.get(stage, ())
+
+    def commit(self, stage: str, offset: int) -> None:
+        self.committed.setdefault(stage, set()).add(offset)
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= CHECKPOINT_FLUSH_SECONDS:
+            self.flush()
+
+    def is_done(self, stage: str) -> bool:
+        return stage in self.done
+
+    def mark_done(self, stage: str) -> None:
+        self.done.add(stage)
+        self._dirty = True
+        self.flush()
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        state = {
+            "committed": {stage: sorted(offsets) for stage, offsets in self.committed.items()},
+            "done": sorted(self.done),
+        }
+        try:
+            self.store.put(self.name, json.dumps(state, separators=(",", ":")).encode("utf-8"))
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        except Exception as e:
+            logger.error(f"❌ Error saving checkpoint {self.name}: {e}")
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the whole file was processed."""
+        self.committed = {}
+        self.done = set()
+        self._dirty = False
+        try:
+            self.store.delete(self.name)
+        except Exception as e:
+            logger.error(f"❌ Error removing checkpoint {self.name}: {e}")
+
+
+def checkpoint_key_for_file(file_path: str) -> str:
+    """Checkpoints are keyed by file content so a re-uploaded statement resumes too."""
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def checkpoint_key_for_event(event: dict) -> str:
+    """
+    Checkpoint key for a streamed GCS object that is never written to disk.
+
+    The base64 md5Hash of the event gives the same key as checkpoint_key_for_file;
+    composite objects have no md5Hash and fall back to name and generation.
+    """
+    if event.get("md5Hash"):
+        return base64.b64decode(event["md5Hash"]).hex()
+    return hashlib.md5(f"{event['name']}#{event.get('generation')}".encode("utf-8")).hexdigest()
+
+
+def open_checkpoint(file_path: Optional[str], bucket=None, file_key: Optional[str] = None) -> Optional[Checkpoint]:
+    """
+    Open (or start) the checkpoint for a statement file.
+
+    Args:
+        file_path: Local path of the statement
+        bucket: GCS bucket used by the "gcs" backend
+        file_key: Precomputed checkpoint key, used instead of hashing file_path
+
+    Returns:
+        Checkpoint, or None when checkpoints are disabled
+    """
+    store = get_blob_store(CHECKPOINT_BACKEND, CHECKPOINT_DIR, bucket, CHECKPOINT_PREFIX)
+    if store is None:
+        return None
+    return Checkpoint(store, file_key or checkpoint_key_for_file(file_path))
+
+
+def is_checkpoint_object(file_name: str) -> bool:
+    """Checkpoint objects land in the watched bucket when STATE_BUCKET_NAME is unset; ignore their finalize events."""
+    return file_name.startswith(CHECKPOINT_PREFIX)
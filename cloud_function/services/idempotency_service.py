@@ -0,0 +1,145 @@
+import os
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+
+# Environment variables
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "sqlite")  # sqlite | gcs | none
+IDEMPOTENCY_DB_PATH = os.getenv("IDEMPOTENCY_DB_PATH", "/tmp/investflow_idempotency.db")
+IDEMPOTENCY_PREFIX = os.getenv("IDEMPOTENCY_PREFIX", "_processed/")
+
+
+class SqliteIdempotencyStore:
+    """
+    Local stand-in for the idempotency store, backed by a single SQLite table.
+    Only survives within one instance (or one machine when running locally).
+    """
+
+    def __init__(self, db_path: str = IDEMPOTENCY_DB_PATH):
+        self.db_path = db_path
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed_files ("
+                "key TEXT PRIMARY KEY, processed_at TEXT NOT NULL, details TEXT)"
+            )
+
+    def is_processed(self, key: str) -> bool:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT 1 FROM processed_files WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def mark_processed(self, key: str, details: Dict[str, Any]) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed_files (key, processed_at, details) VALUES (?, ?, ?)",
+                (key, _utc_now(), json.dumps(details, default=str)),
+            )
+
+
+class GcsIdempotencyStore:
+    """
+    Idempotency store keeping one empty marker object per key under a prefix
+    of the given bucket. Shared by all function instances.
+    """
+
+    def __init__(self, bucket, prefix: str = IDEMPOTENCY_PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _blob_name(self, key: str) -> str:
+        return f"{self.prefix}{key.replace('/', '_')}"
+
+    def is_processed(self, key: str) -> bool:
+        return self.bucket.blob(self._blob_name(key)).exists()
+
+    def mark_processed(self, key: str, details: Dict[str, Any]) -> None:
+        blob = self.bucket.blob(self._blob_name(key))
+        blob.metadata = {"processed_at": _utc_now(), "source": str(details.get("name", ""))}
+        blob.upload_from_string(b"")
+
+
+def get_idempotency_store(bucket=None):
+    """
+    Create the idempotency store selected by IDEMPOTENCY_BACKEND.
+
+    Args:
+        bucket: GCS bucket used by the "gcs" backend
+
+    Returns:
+        Store object, or None when idempotency checks are disabled
+    """
+    backend = IDEMPOTENCY_BACKEND.lower()
+    if backend == "none":
+        return None
+    if backend == "gcs":
+        if bucket is None:
+            logger.warning("⚠️ GCS idempotency store requires a bucket, falling back to SQLite.")
+            return SqliteIdempotencyStore()
+        return GcsIdempotencyStore(bucket)
+    return SqliteIdempotencyStore()
+
+
+def is_idempotency_marker(file_name: str) -> bool:
+    """Marker objects land in the watched bucket when STATE_BUCKET_NAME is unset; ignore their finalize events."""
+    return file_name.startswith(IDEMPOTENCY_PREFIX)
+
+
+def build_idempotency_keys(event: Dict[str, Any], bucket=None) -> List[str]:
+    """
+    Build idempotency keys for a GCS finalize event.
+
+    The generation key catches duplicate deliveries of the same upload, the
+    content key catches re-uploads of an identical statement. When the event
+    carries no hash, it is read from the blob metadata (no download).
+
+    Args:
+        event: GCS event payload (bucket, name, generation, md5Hash, crc32c)
+        bucket: Bucket used to look up metadata missing from the event
+
+    Returns:
+        List of keys, most specific first
+    """
+    name = event.get("name", "")
+    generation = event.get("generation")
+    md5_hash = event.get("md5Hash")
+    crc32c = event.get("crc32c")
+
+    if not (generation and (md5_hash or crc32c)) and bucket is not None:
+        blob = bucket.get_blob(name)
+        if blob is not None:
+            generation = generation or blob.generation
+            md5_hash = md5_hash or blob.md5_hash
+            crc32c = crc32c or blob.crc32c
+
+    keys = []
+    if generation:
+        keys.append(f"gen:{event.get('bucket', '')}/{name}#{generation}")
+    if md5_hash:
+        keys.append(f"md5:{md5_hash}")
+    elif crc32c:
+        keys.append(f"crc32c:{crc32c}")
+    return keys
+
+
+def find_processed_key(store, keys: List[str]) -> Optional[str]:
+    """Return the first key already recorded in the store, if any."""
+    for key in keys:
+        if store.is_processed(key):
+            return key
+    return None
+
+
+def mark_keys_processed(store, keys: List[str], event: Dict[str, Any]) -> None:
+    """Record every key of a successfully processed event."""
+    details = {k: event.get(k) for k in ("bucket", "name", "generation", "md5Hash", "crc32c", "size")}
+    for key in keys:
+        try:
+            store.mark_processed(key, details)
+        except Exception as e:
+            logger.error(f"❌ Error recording idempotency key {key}: {e}")
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,211 @@
+import os
+import json
+import hashlib
+import time
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from utils.logger import logger
+from utils.spans import record_metric
+
+# Environment variables
+PARQUET_EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR", "")  # empty: export disabled
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+# Rows buffered by the streaming writer per flush, so streamed statements don't leave one small file per batch
+PARQUET_FLUSH_ROWS = int(os.getenv("PARQUET_FLUSH_ROWS", "50000"))
+
+# Column kinds: string, float, timestamp (tz-aware, stored as UTC), date, json (dict stored as a JSON string)
+DATASETS = {
+    "transactions": {
+        "key": "transaction_id",
+        "date": "executed_at",
+        "partition": ("asset_category",),
+        "columns": [
+            ("transaction_id", "string"), ("executed_at", "timestamp"), ("asset_category", "string"),
+            ("ticker", "string"), ("option_type", "string"), ("strike_price", "float"),
+            ("expiration_date", "string"), ("option_strategy", "string"), ("quantity", "float"),
+            ("price", "float"), ("fees", "float"), ("currency", "string"), ("code", "string"),
+            ("type", "string"), ("side", "string"), ("value", "float"), ("full_value", "float"),
+            ("base_value", "float"), ("base_full_value", "float"), ("raw_data", "json"),
+        ],
+    },
+    "cash": {
+        "key": None,  # one row per (date, currency)
+        "date": "date",
+        "partition": (),
+        "columns": [("date", "date"), ("currency", "string"), ("value", "float"), ("base_value", "float")],
+    },
+    "cash_flows": {
+        "key": "transaction_id",
+        "date": "date",
+        "partition": (),
+        "columns": [
+            ("transaction_id", "string"), ("date", "date"), ("currency", "string"), ("line_item", "string"),
+            ("total", "float"), ("securities", "float"), ("futures", "float"),
+            ("month_to_date", "float"), ("year_to_date", "float"),
+        ],
+    },
+    "cash_events": {
+        "key": "transaction_id",
+        "date": "date",
+        "partition": (),
+        "columns": [
+            ("transaction_id", "string"), ("event_type", "string"), ("date", "date"), ("currency", "string"),
+            ("description", "string"), ("amount", "float"), ("code", "string"), ("raw_data", "json"),
+        ],
+    },
+}
+
+
+def export_enabled() -> bool:
+    return bool(PARQUET_EXPORT_DIR)
+
+
+def export_to_parquet(dataset: str, records: List[Dict[str, Any]], root_dir: Optional[str] = None) -> int:
+    """
+    Append records to a Parquet dataset, skipping keys that are already stored.
+
+    The dataset lives under <root_dir>/<dataset>/ in Hive-style partitions
+    (year=YYYY/month=MM[/asset_category=...]), so readers like
+    pd.read_parquet(path) or DuckDB prune by date and asset class. Each
+    append writes one file per touched partition, named after the hash of
+    its keys, so re-exporting the same statement is a no-op.
+
+    Args:
+        dataset: Name in DATASETS ("transactions", "cash", "cash_flows", "cash_events")
+        records: Records as produced for Supabase
+        root_dir: Target directory (default: PARQUET_EXPORT_DIR)
+
+    Returns:
+        Number of rows written
+    """
+    root_dir = root_dir or PARQUET_EXPORT_DIR
+    if not root_dir or not records:
+        return 0
+    try:
+        return _export(dataset, records, root_dir)
+    except ImportError:
+        logger.error("❌ [Parquet] pyarrow is not installed; install it or unset PARQUET_EXPORT_DIR")
+    except Exception as e:
+        logger.error(f"❌ [Parquet] Error exporting {dataset}: {e}")
+    return 0
+
+
+def _export(dataset: str, records: List[Dict[str, Any]], root_dir: str) -> int:
+    # Imported on first use, so runs with the export switched off don't load it
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spec = DATASETS[dataset]
+    frame = _to_frame(records, spec)
+    # Partition on the statement-local date (the first 10 characters of executed_at or the date): converted
+    # to UTC, an evening trade on the last day of a month in New York would land in the next month
+    frame["_local_date"] = pd.to_datetime(
+        pd.Series([str(record.get(spec["date"]) or "")[:10] for record in records], index=frame.index),
+        format="%Y-%m-%d", errors="coerce"
+    )
+    key = spec["key"] or "_key"
+    if spec["key"] is None:
+        frame["_key"] = frame["date"].astype("string") + ":" + frame["currency"].astype("string")
+    frame = frame.drop_duplicates(subset=key, keep="last")
+
+    dates = frame["_local_date"]
+    frame["year"] = dates.dt.year.astype("Int64").astype("string").fillna("unknown")
+    frame["month"] = dates.dt.month.astype("Int64").map(lambda m: f"{m:02d}", na_action="ignore").astype("string").fillna("unknown")
+
+    partition_columns = ["year", "month", *spec["partition"]]
+    schema = _arrow_schema(pa, spec, exclude=spec["partition"])
+    written = 0
+    request_start = time.perf_counter()
+    for values, part in frame.groupby(partition_columns, dropna=False, sort=False):
+        directory = os.path.join(root_dir, dataset, *(f"{column}={value}" for column, value in zip(partition_columns, values)))
+        existing = _existing_keys(pq, directory, key)
+        new_rows = part[~part[key].isin(existing)]
+        if new_rows.empty:
+            continue
+
+        table = pa.Table.from_pandas(new_rows[[name for name in schema.names]], schema=schema, preserve_index=False)
+        digest = hashlib.md5("\n".join(sorted(new_rows[key].astype(str))).encode("utf-8")).hexdigest()[:16]
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{digest}.parquet")
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+        os.replace(tmp_path, path)
+        written += len(new_rows)
+
+    record_metric("parquet.write", (time.perf_counter() - request_start) * 1000, rows=written)
+    logger.info(f"🗄️  [Parquet] {dataset}: {written} new row(s), {len(frame) - written} already exported")
+    return written
+
+
+class ParquetTransactionWriter:
+    """
+    Buffered transactions exporter used in streaming mode.
+
+    Batches are collected until PARQUET_FLUSH_ROWS rows are pending, so a
+    streamed statement produces a few large files per partition instead of
+    one per batch, while memory stays bounded.
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, flush_rows: int = PARQUET_FLUSH_ROWS):
+        self.root_dir = root_dir or PARQUET_EXPORT_DIR
+        self.flush_rows = flush_rows
+        self.pending: List[Dict[str, Any]] = []
+        self.written = 0
+
+    def write(self, data: List[Dict[str, Any]]) -> None:
+        if not self.root_dir or not data:
+            return
+        self.pending.extend(data)
+        if len(self.pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.written += export_to_parquet("transactions", self.pending, self.root_dir)
+            self.pending = []
+
+    def close(self) -> int:
+        self.flush()
+        return self.written
+
+
+def _to_frame(records: List[Dict[str, Any]], spec) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(records)
+    for name, kind in spec["columns"]:
+        column = frame[name] if name in frame.columns else pd.Series([None] * len(frame), index=frame.index, dtype=object)
+        if kind == "float":
+            frame[name] = pd.to_numeric(column, errors="coerce").astype("float64")
+        elif kind == "timestamp":
+            frame[name] = pd.to_datetime(column, utc=True, format="ISO8601", errors="coerce")
+        elif kind == "date":
+            frame[name] = pd.to_datetime(column, errors="coerce").dt.date
+        elif kind == "json":
+            frame[name] = column.map(lambda value: json.dumps(value, default=str) if value is not None else None)
+        else:
+            frame[name] = column.astype("string")
+    return frame
+
+
+def _arrow_schema(pa, spec, exclude=()):
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(),
+        "json": pa.string(),
+    }
+    fields = [pa.field(name, types[kind]) for name, kind in spec["columns"] if name not in exclude]
+    if spec["key"] is None:
+        fields.append(pa.field("_key", pa.string()))
+    return pa.schema(fields)
+
+
+def _existing_keys(pq, directory: str, key: str) -> set:
+    """Keys already stored in a partition; only the key column is read."""
+    if not os.path.isdir(directory):
+        return set()
+    keys = set()
+    for file_name in os.listdir(directory):
+        if file_name.endswith(".parquet"):
+            keys.update(pq.read_table(os.path.join(directory, file_name), columns=[key]).column(key).to_pylist())
+    return keys
@@ -1,27 +1,43 @@
 import os
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
-from utils.logger import logger
+from utils.logger import logger, should_log
+from utils.spans import timed, record_metric
+from utils.helpers import format_option_expiration
+from services.spool_service import spool_failed_batch
 import time
+import threading
 from typing import List, Dict, Set, Any, Optional
-from datetime import datetime
 
 # Environment variables
 GOOGLE_SHEETS_CREDENTIALS_FILE = os.getenv("GOOGLE_SHEETS_CREDENTIALS_FILE")
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 BATCH_SIZE = 100  # Maximum size for batch operations
+CASH_FLOW_COLUMNS = ["Date", "Currency", "Line Item", "Total", "Securities", "Futures", "Month to Date", "Year to Date"]
+CASH_EVENT_COLUMNS = ["Date", "Event Type", "Currency", "Description", "Amount", "Code"]
+POSITION_COLUMNS = ["Ticker", "Contract", "Currency", "Asset Category", "Quantity", "Cost Basis", "Average Cost", "Updated At"]
+OPTION_LIFECYCLE_COLUMNS = ["Underlying", "Option Type", "Strike Price", "Expiration Date", "Currency", "Direction", "Quantity",
+                            "Opened At", "Closed At", "Days Held", "Open Premium", "Close Premium", "Premium Captured",
+                            "Capture Pct", "Outcome", "Open Transaction ID"]
+REALIZED_PNL_COLUMNS = ["Executed At", "Ticker", "Contract", "Currency", "Asset Category", "Quantity", "Proceeds", "Cost Basis", "Realized PnL", "Outcome"]
 
 
-def write_to_google_sheets(data: List[Dict[str, Any]], sheet_name: str = "Transactions") -> None:
+def write_to_google_sheets(data: List[Dict[str, Any]], sheet_name: str = "Transactions", checkpoint=None) -> None:
     """
     Write transaction data to Google Sheets.
     
     Args:
         data: List of transaction dictionaries
         sheet_name: Name of the sheet to write to (default: "Transactions")
+        checkpoint: Optional file checkpoint; a completed sheet stage is skipped on retry
     """
     if not _validate_config():
         return
+
+    stage = f"sheets:{sheet_name}"
+    if checkpoint and checkpoint.is_done(stage):
+        logger.info(f"⏩ [Google Sheet] {sheet_name} already written by a previous attempt. Skipping.")
+        return
         
     # Connect and get worksheet
     worksheet = _get_worksheet(sheet_name)
@@ -35,21 +51,198 @@ def write_to_google_sheets(data: List[Dict[str, Any]], sheet_name: str = "Transa
     # Process and insert new records
     new_records = _prepare_new_transaction_records(data, existing_ids, columns)
     if new_records:
-        _insert_records(worksheet, new_records)
+        inserted = _insert_records(worksheet, new_records)
     else:
+        inserted = 0
         logger.info("🔄 [Google Sheet] No new transactions to insert.")
 
+    # Batch offsets are not stable across retries (rows already written are
+    # filtered out by the ID column), so only whole-stage completion is recorded.
+    if checkpoint and inserted == len(new_records):
+        checkpoint.mark_done(stage)
+
+
+def write_cash_flows(data: List[Dict[str, Any]], sheet_name: str = "Cash Flows", checkpoint=None) -> None:
+    """
+    Write every Cash Report line (long format) to the Cash Flows sheet.
+    
+    Args:
+        data: Cash-flow records from cash_flows_to_records (transaction_id, date, currency, line_item, values)
+        sheet_name: Name of the sheet to write to (default: "Cash Flows")
+        checkpoint: Optional file checkpoint; a completed sheet stage is skipped on retry
+    """
+    _write_keyed_rows(data, sheet_name, CASH_FLOW_COLUMNS, checkpoint, "cash-flow line(s)")
+
+
+def write_cash_events(data: List[Dict[str, Any]], sheet_name: str = "Cash Events", checkpoint=None) -> None:
+    """
+    Write dividends, withholding tax, interest and fees to the Cash Events sheet.
+    
+    Args:
+        data: Records from build_cash_event_records
+        sheet_name: Name of the sheet to write to (default: "Cash Events")
+        checkpoint: Optional file checkpoint; a completed sheet stage is skipped on retry
+    """
+    _write_keyed_rows(data, sheet_name, CASH_EVENT_COLUMNS, checkpoint, "cash event(s)")
+
+
+def write_realized_pnl(data: List[Dict[str, Any]], sheet_name: str = "Realized P&L", checkpoint=None) -> None:
+    """
+    Write one row per closing trade with its realized P&L.
+    
+    Args:
+        data: Rows from closes_to_records (keyed by the closing transaction_id)
+        sheet_name: Name of the sheet to write to (default: "Realized P&L")
+        checkpoint: Optional file checkpoint; a completed sheet stage is skipped on retry
+    """
+    _write_keyed_rows(data, sheet_name, REALIZED_PNL_COLUMNS, checkpoint, "closing trade(s)")
+
+
+def write_positions(data: List[Dict[str, Any]], sheet_name: str = "Positions") -> None:
+    """
+    Replace the Positions sheet with the current holdings.
+    
+    The sheet is a view of the positions snapshot, so it is rewritten in a
+    single update instead of appended to.
+    
+    Args:
+        data: Rows from PositionsEngine.holdings()
+        sheet_name: Name of the sheet to write to (default: "Positions")
+    """
+    _replace_rows(data, sheet_name, POSITION_COLUMNS, "open position(s)")
+
+
+def write_option_lifecycles(data: List[Dict[str, Any]], sheet_name: str = "Option Lifecycles") -> None:
+    """
+    Replace the Option Lifecycles sheet with one row per opening option leg.
+    
+    Args:
+        data: Rows from match_option_lifecycles
+        sheet_name: Name of the sheet to write to (default: "Option Lifecycles")
+    """
+    _replace_rows(data, sheet_name, OPTION_LIFECYCLE_COLUMNS, "option lifecycle(s)")
+
+
+def _replace_rows(data: List[Dict[str, Any]], sheet_name: str, columns: List[str], label: str) -> None:
+    """Rewrite a derived sheet (header + rows) in a single update."""
+    if not _validate_config():
+        return
+
+    worksheet = _get_worksheet(sheet_name)
+    if not worksheet:
+        return
+
+    rows = [columns] + [[_sheet_value(record.get(_column_key(col))) for col in columns] for record in data]
+    try:
+        _resize_if_needed(worksheet, len(rows))
+        request_start = time.perf_counter()
+        worksheet.clear()
+        worksheet.update(values=rows, range_name="A1")
+        record_metric("sheets.update", (time.perf_counter() - request_start) * 1000, rows=len(data), requests=2)
+        logger.info(f"✅ [Google Sheet] Wrote {len(data)} {label} to {sheet_name}")
+    except Exception as e:
+        logger.error(f"❌ Error writing {sheet_name}: {e}")
+
+
+def _write_keyed_rows(data: List[Dict[str, Any]], sheet_name: str, columns: List[str], checkpoint, label: str) -> None:
+    """Append records whose transaction_id (column A) is not in the sheet yet."""
+    if not _validate_config():
+        return
+
+    stage = f"sheets:{sheet_name}"
+    if checkpoint and checkpoint.is_done(stage):
+        logger.info(f"⏩ [Google Sheet] {sheet_name} already written by a previous attempt. Skipping.")
+        return
+
+    worksheet = _get_worksheet(sheet_name)
+    if not worksheet:
+        return
+
+    existing_ids = _get_existing_keyed_ids(worksheet, columns)
+    new_records = [
+        [record["transaction_id"]] + [_sheet_value(record.get(_column_key(col))) for col in columns]
+        for record in data
+        if record["transaction_id"] not in existing_ids
+    ]
+    logger.info(f"ℹ️  [Google Sheet] Found {len(new_records)} new {label} to add")
+    inserted = _insert_records(worksheet, new_records) if new_records else 0
+    if checkpoint and inserted == len(new_records):
+        checkpoint.mark_done(stage)
+
 
-def write_cash_reports(data: List[Dict[str, Any]], sheet_name: str = "Cash") -> None:
+class TransactionSheetWriter:
+    """
+    Incremental writer for the Transactions sheet used in streaming mode.
+
+    Existing transaction IDs are read once when the writer is created; each
+    batch passed to write() is formatted and appended right away, so the
+    full list of sheet rows is never held in memory.
+    """
+
+    def __init__(self, sheet_name: str = "Transactions", checkpoint=None):
+        self.sheet_name = sheet_name
+        self.checkpoint = checkpoint
+        self.stage = f"sheets:{sheet_name}"
+        self.columns = _get_transaction_columns()
+        self.worksheet = None
+        self.existing_ids = set()
+        self.expected = 0
+        self.inserted = 0
+
+        if not _validate_config():
+            return
+        if checkpoint and checkpoint.is_done(self.stage):
+            logger.info(f"⏩ [Google Sheet] {sheet_name} already written by a previous attempt. Skipping.")
+            return
+        self.worksheet = _get_worksheet(sheet_name)
+        if self.worksheet:
+            self.existing_ids = _get_existing_transaction_ids(self.worksheet)
+
+    def write(self, data: List[Dict[str, Any]]) -> int:
+        """
+        Append the records of one batch that are not in the sheet yet.
+
+        Returns:
+            Number of rows appended
+        """
+        if not self.worksheet or not data:
+            return 0
+        new_records = _prepare_new_transaction_records(data, self.existing_ids, self.columns)
+        if not new_records:
+            return 0
+        inserted = _insert_records(self.worksheet, new_records)
+        self.existing_ids.update(row[0] for row in new_records)
+        self.expected += len(new_records)
+        self.inserted += inserted
+        return inserted
+
+    def close(self) -> None:
+        if not self.worksheet:
+            return
+        if self.expected:
+            logger.info(f"✅ [Google Sheet] Streamed {self.inserted}/{self.expected} new row(s) into {self.sheet_name}")
+        else:
+            logger.info("🔄 [Google Sheet] No new transactions to insert.")
+        if self.checkpoint and self.inserted == self.expected:
+            self.checkpoint.mark_done(self.stage)
+
+
+def write_cash_reports(data: List[Dict[str, Any]], sheet_name: str = "Cash", checkpoint=None) -> None:
     """
     Write cash reports to a dedicated Cash sheet.
     
     Args:
         data: List of dictionaries with date, currency, and value keys
         sheet_name: Name of the sheet to write to (default: "Cash")
+        checkpoint: Optional file checkpoint; a completed sheet stage is skipped on retry
     """
     if not _validate_config():
         return
+
+    stage = f"sheets:{sheet_name}"
+    if checkpoint and checkpoint.is_done(stage):
+        logger.info(f"⏩ [Google Sheet] {sheet_name} already written by a previous attempt. Skipping.")
+        return
         
     # Connect and get worksheet
     worksheet = _get_worksheet(sheet_name)
@@ -57,15 +250,16 @@ def write_cash_reports(data: List[Dict[str, Any]], sheet_name: str = "Cash") ->
         return
     
     # Define cash columns
-    cash_columns = ["Date", "Currency", "Value"]
+    cash_columns = ["Date", "Currency", "Value", "Base Value"]
     
     # Get existing entries as composite keys (date+currency)
     existing_entries = _get_existing_cash_entries(worksheet)
     
     # Process and insert new records
     new_records = _prepare_new_cash_records(data, existing_entries, cash_columns)
-    if new_records:
-        _insert_records(worksheet, new_records)
+    inserted = _insert_records(worksheet, new_records, key_width=2) if new_records else 0
+    if checkpoint and inserted == len(new_records):
+        checkpoint.mark_done(stage)
 
 
 def _validate_config() -> bool:
@@ -76,6 +270,23 @@ def _validate_config() -> bool:
     return True
 
 
+_spreadsheet = None
+_spreadsheet_lock = threading.Lock()
+
+
+def _get_spreadsheet() -> gspread.Spreadsheet:
+    """Authorized spreadsheet handle, created once and reused by every writer (and warm invocation)."""
+    global _spreadsheet
+    with _spreadsheet_lock:
+        if _spreadsheet is None:
+            logger.info("🔌 Connecting to Google Sheets...")
+            scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+            credentials = ServiceAccountCredentials.from_json_keyfile_name(GOOGLE_SHEETS_CREDENTIALS_FILE, scope)
+            _spreadsheet = gspread.authorize(credentials).open_by_key(GOOGLE_SHEET_ID)
+        return _spreadsheet
+
+
+@timed("sheets.connect")
 def _get_worksheet(sheet_name: str) -> Optional[gspread.Worksheet]:
     """
     Connect to Google Sheets and get or create worksheet.
@@ -86,12 +297,9 @@ def _get_worksheet(sheet_name: str) -> Optional[gspread.Worksheet]:
     Returns:
         Worksheet object or None if connection failed
     """
+    global _spreadsheet
     try:
-        logger.info("🔌 Connecting to Google Sheets...")
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        credentials = ServiceAccountCredentials.from_json_keyfile_name(GOOGLE_SHEETS_CREDENTIALS_FILE, scope)
-        gc = gspread.authorize(credentials)
-        sh = gc.open_by_key(GOOGLE_SHEET_ID)
+        sh = _get_spreadsheet()
         
         try:
             worksheet = sh.worksheet(sheet_name)
@@ -103,6 +311,7 @@ def _get_worksheet(sheet_name: str) -> Optional[gspread.Worksheet]:
         return worksheet
     except Exception as e:
         logger.error(f"❌ Error connecting to Google Sheets: {e}")
+        _spreadsheet = None  # reconnect on the next call
         return None
 
 
@@ -112,10 +321,11 @@ def _get_transaction_columns() -> List[str]:
         "Date", "Category", "Side", "Ticker", "Name", "Quantity", 
         "Price", "Fees", "Currency", "Value", "Full Value", "Type",
         "Option Type", "Option Strategy", "Option Expiration Date", "Option Strike Price", 
-        "Option Premium", "Option Full Name"
+        "Option Premium", "Option Full Name", "Base Value", "Base Full Value"
     ]
 
 
+@timed("sheets.read_ids", requests=1)
 def _get_existing_transaction_ids(worksheet: gspread.Worksheet) -> Set[str]:
     """
     Get existing transaction IDs from the worksheet.
@@ -159,48 +369,6 @@ def _add_header_row(worksheet: gspread.Worksheet, headers: List[str]) -> None:
         logger.error(f"❌ Error adding header row: {e}")
 
 
-def _format_option_expiration(expiration_date: str) -> str:
-    """
-    Format option expiration date from various formats to YYYY-MM-DD.
-    
-    Args:
-        expiration_date: The input expiration date string
-        
-    Returns:
-        Formatted date in YYYY-MM-DD format, or original string if parsing fails
-    """
-    if not expiration_date:
-        return ""
-    
-    try:
-        # Handle special format like "04APR25"
-        if len(expiration_date) >= 7 and expiration_date[2:5].isalpha():
-            # Parse components
-            day = expiration_date[:2]
-            month_str = expiration_date[2:5].upper()
-            year_str = expiration_date[5:7]
-            
-            # Convert month name to number
-            month_map = {
-                "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
-                "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12
-            }
-            
-            # Only proceed if month is valid
-            if month_str in month_map:
-                month = month_map[month_str]
-                # Determine century (20xx or 19xx)
-                year = 2000 + int(year_str) if int(year_str) < 50 else 1900 + int(year_str)
-                
-                # Create datetime and format
-                return datetime(year, month, int(day)).strftime("%Y-%m-%d")
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to parse date '{expiration_date}': {str(e)}")
-    
-    # Return original if parsing fails
-    return expiration_date
-
-
 def _format_option_full_name(record: Dict[str, Any]) -> str:
     """
     Create a standardized option name from record details.
@@ -235,6 +403,7 @@ def _format_option_full_name(record: Dict[str, Any]) -> str:
         return ""
 
 
+@timed("sheets.format_rows")
 def _prepare_new_transaction_records(
     data: List[Dict[str, Any]], 
     existing_ids: Set[str],
@@ -289,7 +458,7 @@ def _format_transaction_row(
     
     for col in columns:
         if col == "Date":
-            row.append(record.get("executed_at", "").split()[0])
+            row.append((record.get("executed_at") or "")[:10])
         elif col == "Category":
             row.append(record.get("asset_category", ""))
         elif col == "Name":
@@ -298,13 +467,15 @@ def _format_transaction_row(
             row.append(record.get("currency", "USD"))
         elif col == "Full Value":
             row.append(record.get("full_value", ""))
+        elif col in ("Base Value", "Base Full Value"):
+            row.append(_sheet_value(record.get(_column_key(col))))
         # Option-specific columns
         elif col == "Option Type" and is_option:
             row.append(record.get("option_type", "").upper())  # PUT/CALL
         elif col == "Option Strategy":
-            row.append("")  # Empty for now as requested
+            row.append(record.get("option_strategy") or "")
         elif col == "Option Expiration Date" and is_option:
-            row.append(_format_option_expiration(record.get("expiration_date", "")))
+            row.append(format_option_expiration(record.get("expiration_date", "")))
         elif col == "Option Strike Price" and is_option:
             row.append(record.get("strike_price", ""))
         elif col == "Option Premium" and is_option:
@@ -335,16 +506,21 @@ def _resize_if_needed(worksheet: gspread.Worksheet, needed_rows: int) -> None:
             logger.error(f"❌ Error resizing worksheet: {e}")
 
 
-def _insert_records(worksheet: gspread.Worksheet, records: List[List[Any]]) -> None:
+@timed("sheets.insert")
+def _insert_records(worksheet: gspread.Worksheet, records: List[List[Any]], key_width: int = 1) -> int:
     """
-    Insert records into worksheet in batches.
+    Insert records into worksheet in batches. Failed batches are spooled for replay.
     
     Args:
         worksheet: Target worksheet
         records: Records to insert
+        key_width: Number of leading columns identifying a row (ID, or Date + Currency for Cash)
+        
+    Returns:
+        Number of successfully inserted records
     """
     if not records:
-        return
+        return 0
         
     # Check if sheet needs resizing
     _resize_if_needed(worksheet, len(records))
@@ -358,24 +534,93 @@ def _insert_records(worksheet: gspread.Worksheet, records: List[List[Any]]) -> N
         chunk = records[i:i+BATCH_SIZE]
         
         try:
-            logger.info(f"📥 Inserting batch {batch_num}/{total_batches} ({len(chunk)} records)")
+            logger.debug(f"📥 Inserting batch {batch_num}/{total_batches} ({len(chunk)} records)")
+            request_start = time.perf_counter()
             worksheet.append_rows(chunk)
+            record_metric("sheets.append_rows", (time.perf_counter() - request_start) * 1000,
+                          rows=len(chunk), requests=1)
             successful_inserts += len(chunk)
             
-            # Progress indicator
-            progress = min(100, int(batch_num * 100 / total_batches))
-            logger.info(f"⏳ Progress: {progress}% ({successful_inserts}/{len(records)} records)")
+            # Progress indicator, rate-limited so long uploads don't log every batch
+            if batch_num == total_batches or should_log(f"sheets.progress.{worksheet.title}"):
+                progress = min(100, int(batch_num * 100 / total_batches))
+                logger.info(f"⏳ Progress: {progress}% ({successful_inserts}/{len(records)} records)")
             
             time.sleep(1)  # Avoid rate limiting
         except Exception as e:
             logger.error(f"❌ Error inserting batch {batch_num}: {e}")
+            spool_failed_batch("sheets", worksheet.title, chunk, str(e), key_width=key_width)
     
     if successful_inserts == len(records):
         logger.info(f"✅ Successfully inserted all {successful_inserts} records")
     else:
         logger.info(f"⚠️ Inserted {successful_inserts} out of {len(records)} records")
+    return successful_inserts
+
+
+def replay_rows_to_sheet(sheet_name: str, rows: List[List[Any]], key_width: int = 1):
+    """
+    Append spooled rows whose key is not in the sheet yet.
+
+    A batch may have reached the sheet before its request failed, so the key
+    columns are read once and rows already present are skipped.
+
+    Returns:
+        tuple: (appended row count, rows that failed again, last error or None)
+    """
+    if not _validate_config():
+        return 0, rows, "missing Google Sheets configuration"
+    worksheet = _get_worksheet(sheet_name)
+    if not worksheet:
+        return 0, rows, f"worksheet {sheet_name} unavailable"
+
+    try:
+        key_columns = [worksheet.col_values(column) for column in range(1, key_width + 1)]
+    except Exception as e:
+        return 0, rows, str(e)
+    existing_keys = set(zip(*key_columns))
+    new_rows = [row for row in rows if tuple(str(value) for value in row[:key_width]) not in existing_keys]
+
+    _resize_if_needed(worksheet, len(new_rows))
+    appended, failed, error = 0, [], None
+    for i in range(0, len(new_rows), BATCH_SIZE):
+        chunk = new_rows[i:i + BATCH_SIZE]
+        try:
+            request_start = time.perf_counter()
+            worksheet.append_rows(chunk)
+            record_metric("sheets.append_rows", (time.perf_counter() - request_start) * 1000,
+                          rows=len(chunk), requests=1)
+            appended += len(chunk)
+            time.sleep(1)  # Avoid rate limiting
+        except Exception as e:
+            failed.extend(chunk)
+            error = str(e)
+    return appended, failed, error
+
+
+@timed("sheets.read_ids", requests=1)
+def _get_existing_keyed_ids(worksheet: gspread.Worksheet, columns: List[str]) -> Set[str]:
+    """Read record IDs from column A, adding the header row to an empty sheet."""
+    try:
+        id_column = worksheet.col_values(1)
+    except Exception as e:
+        logger.error(f"❌ Error reading IDs from {worksheet.title}: {e}")
+        return set()
+    if not id_column:
+        _add_header_row(worksheet, ["_transaction_id"] + columns)
+    return set(id for id in id_column[1:] if id)
+
+
+def _column_key(column: str) -> str:
+    """Sheet column name -> record key ("Month to Date" -> "month_to_date")."""
+    return column.lower().replace(" ", "_")
+
+
+def _sheet_value(value: Any) -> Any:
+    return "" if value is None else value
 
 
+@timed("sheets.read_cash", requests=1)
 def _get_existing_cash_entries(worksheet: gspread.Worksheet) -> Set[str]:
     """
     Get existing cash entries as composite keys (date+currency).
@@ -391,7 +636,7 @@ def _get_existing_cash_entries(worksheet: gspread.Worksheet) -> Set[str]:
     try:
         # Ensure worksheet has headers if it's empty
         if worksheet.row_count < 1:
-            _add_header_row(worksheet, ["Date", "Currency", "Value"])
+            _add_header_row(worksheet, ["Date", "Currency", "Value", "Base Value"])
             return existing_entries
         
         # Get all data
@@ -476,6 +721,8 @@ def _format_cash_row(record: Dict[str, Any], columns: List[str]) -> List[Any]:
             row.append(record.get("currency", "USD"))
         elif col == "Value":
             row.append(record.get("value", 0))
+        elif col == "Base Value":
+            row.append(_sheet_value(record.get("base_value")))
         else:
             row.append("")  # Empty for any unexpected columns
     
@@ -1,9 +1,11 @@
 import os
 import requests
 from utils.logger import logger
+from utils.spans import timed
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
 
+@timed("slack.send", requests=1)
 def send_slack_message(message):
     """
     Send a message to Slack using a webhook.
@@ -0,0 +1,126 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+from services.blob_store import get_blob_store
+
+# Environment variables
+SPOOL_BACKEND = os.getenv("SPOOL_BACKEND", "local")  # local | gcs | none
+SPOOL_DIR = os.getenv("SPOOL_DIR", "/tmp/investflow_spool")
+SPOOL_PREFIX = os.getenv("SPOOL_PREFIX", "_spool/")
+# Entries that failed this many times are left in the spool for inspection instead of replayed
+SPOOL_MAX_ATTEMPTS = int(os.getenv("SPOOL_MAX_ATTEMPTS", "5"))
+
+ENTRY_VERSION = 1
+
+
+class Spool:
+    """
+    Write-ahead spool of sink batches that could not be written.
+
+    Each failed batch becomes one gzipped JSON entry named
+    "<sink>/<table>/<timestamp>-<digest>.json.gz" holding the sink, table,
+    rows, attempt count and last error. Replaying reads only these entries,
+    so recovery costs O(failed rows) instead of reprocessing statements.
+
+    Args:
+        store: Blob store (local directory or GCS prefix)
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def append(self, sink: str, table: str, rows: List[Any], error: str, attempts: int = 1,
+               key_width: Optional[int] = None) -> Optional[str]:
+        """
+        Persist a failed batch.
+
+        Args:
+            sink: "supabase" or "sheets"
+            table: Supabase table or worksheet title
+            rows: Records (Supabase) or formatted rows (Sheets)
+            error: Last error message
+            attempts: Number of failed writes of these rows so far
+            key_width: Sheets only, number of leading columns that identify a row
+
+        Returns:
+            Entry name, or None if the rows could not be spooled either
+        """
+        if not rows:
+            return None
+        entry = {
+            "version": ENTRY_VERSION,
+            "sink": sink,
+            "table": table,
+            "attempts": attempts,
+            "error": str(error)[:500],
+            "spooled_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "rows": rows,
+        }
+        if key_width:
+            entry["key_width"] = key_width
+        payload = json.dumps(entry, separators=(",", ":"), default=str).encode("utf-8")
+        digest = hashlib.md5(payload).hexdigest()[:12]
+        name = f"{sink}/{table}/{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{digest}.json.gz"
+        try:
+            self.store.put(name, gzip.compress(payload))
+        except Exception as e:
+            logger.error(f"❌ [Spool] Could not spool {len(rows)} row(s) for {sink}:{table}: {e}")
+            return None
+        return name
+
+    def entries(self, sink: Optional[str] = None) -> List[str]:
+        """Entry names in spool order (oldest first within a table)."""
+        return [name for name in self.store.list(f"{sink}/" if sink else "") if name.endswith(".json.gz")]
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        raw = self.store.get(name)
+        if not raw:
+            return None
+        entry = json.loads(gzip.decompress(raw))
+        if entry.get("version") != ENTRY_VERSION:
+            raise ValueError(f"unsupported spool entry version {entry.get('version')}")
+        return entry
+
+    def delete(self, name: str) -> None:
+        self.store.delete(name)
+
+
+_bucket = None
+_spools: Dict[int, Optional[Spool]] = {}
+_spools_lock = threading.Lock()
+
+
+def configure_spool(bucket) -> None:
+    """Use `bucket` for the "gcs" backend from now on (called once per invocation)."""
+    global _bucket
+    _bucket = bucket
+
+
+def get_spool() -> Optional[Spool]:
+    """Spool of the configured backend, or None when SPOOL_BACKEND=none."""
+    with _spools_lock:
+        key = id(_bucket)
+        if key not in _spools:
+            store = get_blob_store(SPOOL_BACKEND, SPOOL_DIR, _bucket, SPOOL_PREFIX)
+            _spools[key] = Spool(store) if store is not None else None
+        return _spools[key]
+
+
+def spool_failed_batch(sink: str, table: str, rows: List[Any], error: str, key_width: Optional[int] = None) -> None:
+    """Spool rows a sink failed to write so `replay.py` can re-send them. Never raises."""
+    spool = get_spool()
+    if spool is None or not rows:
+        return
+    name = spool.append(sink, table, rows, error, key_width=key_width)
+    if name:
+        logger.warning(f"📮 [Spool] Saved {len(rows)} failed row(s) for {sink}:{table} as {name}")
+
+
+def is_spool_object(file_name: str) -> bool:
+    """Spool entries land in the watched bucket when STATE_BUCKET_NAME is unset; ignore their finalize events."""
+    return file_name.startswith(SPOOL_PREFIX)
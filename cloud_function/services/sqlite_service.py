@@ -0,0 +1,247 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+from utils.helpers import format_option_expiration
+from utils.spans import record_metric
+
+# Environment variables
+SQLITE_PATH = os.getenv("SQLITE_PATH", "")  # empty: local analytics store disabled
+
+TRANSACTION_COLUMNS = (
+    "transaction_id", "executed_at", "asset_category", "ticker", "option_type", "strike_price",
+    "expiration_date", "option_strategy", "quantity", "price", "fees", "currency", "code", "type",
+    "side", "value", "full_value", "base_value", "base_full_value", "raw_data",
+)
+CASH_COLUMNS = ("date", "currency", "value", "base_value")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id TEXT PRIMARY KEY,
+    executed_at TEXT,
+    asset_category TEXT,
+    ticker TEXT,
+    option_type TEXT,
+    strike_price REAL,
+    expiration_date TEXT,
+    option_strategy TEXT,
+    quantity REAL,
+    price REAL,
+    fees REAL,
+    currency TEXT,
+    code TEXT,
+    type TEXT,
+    side TEXT,
+    value REAL,
+    full_value REAL,
+    base_value REAL,
+    base_full_value REAL,
+    raw_data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_ticker ON transactions (ticker, executed_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_executed_at ON transactions (executed_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_expiration ON transactions (asset_category, expiration_date);
+CREATE TABLE IF NOT EXISTS cash (
+    date TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    value REAL,
+    base_value REAL,
+    PRIMARY KEY (date, currency)
+);
+CREATE INDEX IF NOT EXISTS idx_cash_currency ON cash (currency, date);
+"""
+
+
+class AnalyticsStore:
+    """
+    Embedded SQLite copy of the transactions and ending cash, for local ad-hoc queries.
+
+    Transactions are keyed by transaction_id (re-inserting a statement is a
+    no-op) and indexed by ticker, executed_at and (asset_category,
+    expiration_date); option expirations are stored as YYYY-MM-DD so they
+    sort and compare as dates. The connection is shared between threads and
+    serialized by a lock.
+
+    Args:
+        path: Database file (":memory:" for a throwaway store)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- writes ---
+
+    def insert_transactions(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Insert trade records, ignoring transaction IDs that are already stored.
+
+        Returns:
+            Number of new rows
+        """
+        rows = [_transaction_row(record) for record in records]
+        placeholders = ", ".join("?" for _ in TRANSACTION_COLUMNS)
+        sql = f"INSERT OR IGNORE INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) VALUES ({placeholders})"
+        return self._write(sql, rows)
+
+    def upsert_cash(self, records: List[Dict[str, Any]]) -> int:
+        """Insert or replace ending cash per (date, currency)."""
+        rows = [tuple(record.get(column) for column in CASH_COLUMNS) for record in records]
+        sql = f"INSERT OR REPLACE INTO cash ({', '.join(CASH_COLUMNS)}) VALUES (?, ?, ?, ?)"
+        return self._write(sql, rows)
+
+    def _write(self, sql: str, rows: List[tuple]) -> int:
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(sql, rows)
+            return self._conn.total_changes - before
+
+    # --- queries ---
+
+    def ticker_history(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        All transactions of a ticker (stock or option underlying) in execution order.
+
+        Args:
+            ticker: Ticker symbol
+            start: Earliest executed_at, inclusive (YYYY-MM-DD or a full timestamp)
+            end: Latest execution date, inclusive (YYYY-MM-DD)
+        """
+        sql = "SELECT * FROM transactions WHERE ticker = ?"
+        params: List[Any] = [ticker]
+        sql, params = _date_range(sql, params, "executed_at", start, end)
+        return self._query(f"{sql} ORDER BY executed_at", params, exclude=("raw_data",))
+
+    def open_options(self, expiring_from: Optional[str] = None, expiring_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Option contracts with a non-zero net quantity, ordered by expiration.
+
+        Args:
+            expiring_from: Earliest expiration (YYYY-MM-DD), e.g. today to hide expired contracts
+            expiring_to: Latest expiration (YYYY-MM-DD)
+        """
+        sql = (
+            "SELECT ticker, option_type, strike_price, expiration_date, currency, "
+            "ROUND(SUM(quantity), 9) AS quantity, ROUND(SUM(value), 2) AS net_premium, "
+            "MIN(executed_at) AS first_executed_at, MAX(executed_at) AS last_executed_at "
+            "FROM transactions WHERE asset_category = 'Options'"
+        )
+        params: List[Any] = []
+        if expiring_from:
+            sql += " AND expiration_date >= ?"
+            params.append(expiring_from)
+        if expiring_to:
+            sql += " AND expiration_date <= ?"
+            params.append(expiring_to)
+        sql += (
+            " GROUP BY ticker, option_type, strike_price, expiration_date, currency"
+            " HAVING ROUND(SUM(quantity), 9) != 0"
+            " ORDER BY expiration_date, ticker, strike_price, option_type"
+        )
+        return self._query(sql, params)
+
+    def cash_by_date(self, currency: Optional[str] = None, start: Optional[str] = None,
+                     end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Ending cash per statement date and currency."""
+        sql = "SELECT date, currency, value, base_value FROM cash WHERE 1 = 1"
+        params: List[Any] = []
+        if currency:
+            sql += " AND currency = ?"
+            params.append(currency)
+        sql, params = _date_range(sql, params, "date", start, end)
+        return self._query(f"{sql} ORDER BY date, currency", params)
+
+    def _query(self, sql: str, params: List[Any], exclude=()) -> List[Dict[str, Any]]:
+        request_start = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        record_metric("sqlite.query", (time.perf_counter() - request_start) * 1000, rows=len(rows))
+        return [{key: row[key] for key in row.keys() if key not in exclude} for row in rows]
+
+
+def _transaction_row(record: Dict[str, Any]) -> tuple:
+    row = []
+    for column in TRANSACTION_COLUMNS:
+        value = record.get(column)
+        if column == "expiration_date" and value:
+            value = format_option_expiration(value)
+        elif column == "raw_data" and value is not None:
+            value = json.dumps(value, default=str)
+        row.append(value)
+    return tuple(row)
+
+
+def _date_range(sql: str, params: List[Any], column: str, start: Optional[str], end: Optional[str]):
+    if start:
+        sql += f" AND {column} >= ?"
+        params.append(start)
+    if end:
+        # ISO timestamps sort as strings; bounding by the next day keeps the whole end day and the index
+        sql += f" AND {column} < ?"
+        params.append((date.fromisoformat(end[:10]) + timedelta(days=1)).isoformat())
+    return sql, params
+
+
+_stores: Dict[str, AnalyticsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_analytics_store(path: Optional[str] = None) -> Optional[AnalyticsStore]:
+    """Shared store for `path` (default: SQLITE_PATH), or None when the store is disabled."""
+    path = path or SQLITE_PATH
+    if not path:
+        return None
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = AnalyticsStore(path)
+        return _stores[path]
+
+
+def save_to_sqlite(kind: str, records: List[Dict[str, Any]], path: Optional[str] = None, log: bool = True) -> int:
+    """
+    Write pipeline records to the local analytics store (no-op when it is disabled).
+
+    Args:
+        kind: "transactions" or "cash"
+        records: Records as produced for Supabase
+        path: Database file (default: SQLITE_PATH)
+        log: Log the outcome; streaming batches leave it to the run summary
+
+    Returns:
+        Number of new or replaced rows
+    """
+    if not records:
+        return 0
+    try:
+        store = get_analytics_store(path)
+        if store is None:
+            return 0
+        request_start = time.perf_counter()
+        if kind == "transactions":
+            written = store.insert_transactions(records)
+        else:
+            written = store.upsert_cash(records)
+        record_metric("sqlite.write", (time.perf_counter() - request_start) * 1000, rows=written)
+    except sqlite3.Error as e:
+        logger.error(f"❌ [SQLite] Error writing {kind}: {e}")
+        return 0
+    if log:
+        logger.info(f"🗃️  [SQLite] {kind}: {written} of {len(records)} row(s) written")
+    return written
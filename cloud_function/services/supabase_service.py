@@ -1,7 +1,12 @@
 import os
 import json
+import time
+import logging
+import threading
 import requests
-from utils.logger import logger
+from utils.logger import logger, LogAggregator
+from utils.spans import span, record_metric
+from services.spool_service import spool_failed_batch
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_API_KEY = os.getenv("SUPABASE_API_KEY")
@@ -12,67 +17,289 @@ HEADERS_SUPABASE = {
     "Content-Type": "application/json"
 }
 
+# Process in smaller chunks to avoid URL length issues on the in.(...) lookup
+CHUNK_SIZE = 20
+# IDs per in.(...) lookup GET when a chunk is larger than CHUNK_SIZE
+LOOKUP_SIZE = CHUNK_SIZE
+# Upserts send no ID list in the URL, so they can use much larger chunks
+UPSERT_CHUNK_SIZE = 500
+# How trade uploads find existing rows: "chunk" (one in.(...) lookup per chunk) or
+# "range" (page through the IDs in the section's executed_at window once, then filter locally)
+SUPABASE_DEDUP_STRATEGY = os.getenv("SUPABASE_DEDUP_STRATEGY", "chunk").lower()
+# Rows per page of the range lookup (PostgREST caps responses at its max-rows setting, 1000 by default)
+SUPABASE_PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+
+_local = threading.local()
+
+
+def _session():
+    """Per-thread HTTP session, so connections (and TLS handshakes) are reused across chunks and files."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
 def insert_to_supabase(table, data, transaction_id):
     return insert_batch_to_supabase(table, [data], [transaction_id])
 
-def insert_batch_to_supabase(table, data_list, transaction_ids):
+
+def _spool_chunk(table, chunk_data, error):
+    # Without a URL nothing was ever going to be written (local run), so there is nothing to replay
+    if SUPABASE_URL:
+        spool_failed_batch("supabase", table, chunk_data, error)
+
+def insert_batch_to_supabase(table, data_list, transaction_ids, checkpoint=None, stage=None, offset=0,
+                             chunk_size=CHUNK_SIZE, known_ids=None):
+    """
+    Insert records into a Supabase table, skipping transaction IDs that already exist.
+
+    When a checkpoint is given, chunks committed by a previous (timed out)
+    attempt are skipped without a remote lookup, and each chunk is committed
+    under `stage` at `offset + <chunk offset>` once it is stored.
+
+    With `known_ids` (see prefetch_existing_ids) chunks are filtered against
+    that set instead of looked up, and posted with ignore-duplicates in case
+    the set missed a row. Otherwise each chunk is looked up in GETs of
+    LOOKUP_SIZE IDs. Either way a chunk is `chunk_size` records, so offsets
+    committed by an earlier attempt always mean the same rows.
+    """
     if not data_list:
         return 0
 
-    # Process in smaller chunks to avoid URL length issues
-    chunk_size = 20
     total_inserted = 0
-    
-    for i in range(0, len(data_list), chunk_size):
-        chunk_data = data_list[i:i + chunk_size]
-        chunk_ids = transaction_ids[i:i + chunk_size]
-        
-        # Check existing records using POST with a filter
-        check_url = f"{SUPABASE_URL}/rest/v1/{table}"
-        check_payload = {
-            "select": "transaction_id",
-            "transaction_id": f"in.({','.join(chunk_ids)})"
-        }
-        
-        try:
-            response = requests.get(
-                check_url,
-                headers=HEADERS_SUPABASE,
-                params=check_payload
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"🚨 Error checking transactions in Supabase: {response.text}")
+    stage = stage or table
+    # Called per batch in streaming mode, so per-call lines are debug only; the run summary carries the totals
+    chunk_outcomes = LogAggregator(f"ℹ️  [Supabase] {{key}}: {{count}} chunk(s) of {chunk_size} in {table}", level=logging.DEBUG)
+
+    with span("supabase.insert", log=False, table=table, rows=len(data_list), requests=0, bytes=0) as insert_span:
+        for i in range(0, len(data_list), chunk_size):
+            if checkpoint and checkpoint.is_committed(stage, offset + i):
                 continue
 
-            existing_ids = {item['transaction_id'] for item in response.json()}
+            chunk_data = data_list[i:i + chunk_size]
+            chunk_ids = transaction_ids[i:i + chunk_size]
+        
+            try:
+                if known_ids is not None:
+                    existing_ids = known_ids
+                else:
+                    existing_ids, error = _lookup_existing_ids(table, chunk_ids, insert_span)
+                    if existing_ids is None:
+                        logger.error(f"🚨 Error checking transactions in Supabase: {error}")
+                        _spool_chunk(table, chunk_data, error)
+                        continue
             
-            # Filter out existing records
-            new_data = []
-            for data, tx_id in zip(chunk_data, chunk_ids):
-                if tx_id not in existing_ids:
-                    new_data.append(data)
+                # Filter out existing records
+                new_data = []
+                for data, tx_id in zip(chunk_data, chunk_ids):
+                    if tx_id not in existing_ids:
+                        new_data.append(data)
             
-            if not new_data:
-                logger.info(f"ℹ️  [Supabase] Chunk {i//chunk_size + 1} already exists in {table}. Skipping.")
-                continue
+                if not new_data:
+                    chunk_outcomes.add("already present")
+                    if checkpoint:
+                        checkpoint.commit(stage, offset + i)
+                    continue
 
-            # Insert new records in batch
-            post_url = f"{SUPABASE_URL}/rest/v1/{table}"
-            response = requests.post(post_url, headers=HEADERS_SUPABASE, data=json.dumps(new_data))
+                # Insert new records in batch
+                if known_ids is None:
+                    post_url = f"{SUPABASE_URL}/rest/v1/{table}"
+                    body = json.dumps(new_data)
+                    request_start = time.perf_counter()
+                    response = _session().post(post_url, headers=HEADERS_SUPABASE, data=body)
+                    record_metric("supabase.post", (time.perf_counter() - request_start) * 1000,
+                                  rows=len(new_data), requests=1, bytes=len(body))
+                    body_size = len(body)
+                else:
+                    # The window lookup misses rows stored with a different executed_at; the unique constraint drops them
+                    response, body_size = _post_upsert(table, new_data)
+                insert_span.add(requests=1, bytes=body_size)
             
-            if response.status_code not in [200, 201]:
-                logger.error(f"🚨 Error inserting batch into {table}: {response.text}")
-                continue
+                if response.status_code not in [200, 201]:
+                    logger.error(f"🚨 Error inserting batch into {table}: {response.text}")
+                    _spool_chunk(table, new_data, response.text)
+                    continue
             
-            inserted_count = len(new_data)
-            total_inserted += inserted_count
-            logger.info(f"✅ [Supabase] Inserted {inserted_count} records in chunk {i//chunk_size + 1} into {table}.")
+                inserted_count = len(new_data) if known_ids is None else len(response.json())
+                total_inserted += inserted_count
+                if checkpoint:
+                    checkpoint.commit(stage, offset + i)
+                chunk_outcomes.add("inserted")
+                logger.debug(f"✅ [Supabase] Inserted {inserted_count} records in chunk {i//chunk_size + 1} into {table}.")
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"🚨 Network error while processing chunk {i//chunk_size + 1}: {str(e)}")
-            continue
+            except requests.exceptions.RequestException as e:
+                logger.error(f"🚨 Network error while processing chunk {i//chunk_size + 1}: {str(e)}")
+                _spool_chunk(table, chunk_data, str(e))
+                continue
+
+    chunk_outcomes.flush()
+    if total_inserted > 0:
+        logger.debug(f"✅ [Supabase] Total inserted records: {total_inserted}")
+    return total_inserted
+
+
+def _lookup_existing_ids(table, chunk_ids, insert_span):
+    """Stored IDs among `chunk_ids`, in GETs of LOOKUP_SIZE IDs; returns (set or None, error text)."""
+    existing_ids = set()
+    check_url = f"{SUPABASE_URL}/rest/v1/{table}"
+    for i in range(0, len(chunk_ids), LOOKUP_SIZE):
+        # Check existing records using GET with a filter
+        check_payload = {
+            "select": "transaction_id",
+            "transaction_id": f"in.({','.join(chunk_ids[i:i + LOOKUP_SIZE])})"
+        }
+        request_start = time.perf_counter()
+        response = _session().get(check_url, headers=HEADERS_SUPABASE, params=check_payload)
+        record_metric("supabase.get", (time.perf_counter() - request_start) * 1000,
+                      requests=1, bytes=len(response.content))
+        insert_span.add(requests=1, bytes=len(response.content))
+        if response.status_code != 200:
+            return None, response.text
+        existing_ids.update(item['transaction_id'] for item in response.json())
+    return existing_ids, None
+
+
+def upsert_batch_to_supabase(table, data_list, checkpoint=None, stage=None, offset=0,
+                             chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    Insert records with a single POST per chunk, letting the unique
+    transaction_id constraint drop existing rows (ON CONFLICT DO NOTHING).
+
+    Unlike insert_batch_to_supabase there is no lookup GET per chunk; the
+    number of inserted rows is taken from the returned representation.
+    """
+    if not data_list:
+        return 0
+
+    total_inserted = 0
+    stage = stage or table
+
+    with span("supabase.upsert", table=table, rows=len(data_list), requests=0, bytes=0) as upsert_span:
+        for i in range(0, len(data_list), chunk_size):
+            if checkpoint and checkpoint.is_committed(stage, offset + i):
+                continue
+
+            chunk_data = data_list[i:i + chunk_size]
+            try:
+                response, body_size = _post_upsert(table, chunk_data)
+                upsert_span.add(requests=1, bytes=body_size)
+
+                if response.status_code not in [200, 201]:
+                    logger.error(f"🚨 Error upserting batch into {table}: {response.text}")
+                    _spool_chunk(table, chunk_data, response.text)
+                    continue
+
+                inserted_count = len(response.json())
+                total_inserted += inserted_count
+                if checkpoint:
+                    checkpoint.commit(stage, offset + i)
+                logger.debug(f"✅ [Supabase] Upserted chunk {i//chunk_size + 1} into {table}: {inserted_count} new of {len(chunk_data)}.")
+
+            except requests.exceptions.RequestException as e:
+                logger.error(f"🚨 Network error while processing chunk {i//chunk_size + 1}: {str(e)}")
+                _spool_chunk(table, chunk_data, str(e))
+                continue
 
     if total_inserted > 0:
         logger.info(f"✅ [Supabase] Total inserted records: {total_inserted}")
     return total_inserted
+
+
+def _post_upsert(table, chunk_data):
+    """POST one chunk with ON CONFLICT (transaction_id) DO NOTHING; returns the response and body size."""
+    post_url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict=transaction_id"
+    headers = {**HEADERS_SUPABASE, "Prefer": "resolution=ignore-duplicates,return=representation"}
+    body = json.dumps(chunk_data)
+    request_start = time.perf_counter()
+    response = _session().post(post_url, headers=headers, data=body)
+    record_metric("supabase.post", (time.perf_counter() - request_start) * 1000,
+                  rows=len(chunk_data), requests=1, bytes=len(body))
+    return response, len(body)
+
+
+def replay_chunk_to_supabase(table, chunk_data):
+    """
+    Re-send one chunk of spooled records.
+
+    Spooled rows may have been partly written before the failure, so they are
+    upserted with ignore-duplicates instead of looked up first.
+
+    Returns:
+        tuple: (inserted row count or None on failure, error message or None)
+    """
+    try:
+        response, _ = _post_upsert(table, chunk_data)
+    except requests.exceptions.RequestException as e:
+        return None, str(e)
+    if response.status_code not in [200, 201]:
+        return None, response.text
+    return len(response.json()), None
+
+
+def prefetch_existing_ids(table, data_list):
+    """
+    Existing IDs to pass as `known_ids` when SUPABASE_DEDUP_STRATEGY=range.
+
+    Returns None (per-chunk lookups) with the chunk strategy or when the
+    range lookup failed; callers fetch once and reuse the result for every
+    insert_batch_to_supabase call of the same records.
+    """
+    if SUPABASE_DEDUP_STRATEGY != "range":
+        return None
+    return fetch_existing_transaction_ids(table, data_list)
+
+
+def fetch_existing_transaction_ids(table, data_list, page_size=SUPABASE_PAGE_SIZE):
+    """
+    Transaction IDs already stored for the executed_at window (and currencies) of `data_list`.
+
+    One paged range query replaces a lookup per chunk: a statement's trades
+    span a known window, so a 10k-trade statement needs a handful of pages
+    instead of 500 in.(...) lookups.
+
+    Returns:
+        set of IDs, or None when the records have no executed_at or the lookup
+        failed (callers then fall back to per-chunk lookups)
+    """
+    moments = [record.get("executed_at") for record in data_list if record.get("executed_at")]
+    if not moments or not SUPABASE_URL:
+        return None
+    params = [
+        ("select", "transaction_id"),
+        ("executed_at", f"gte.{min(moments)}"),
+        ("executed_at", f"lte.{max(moments)}"),
+        ("order", "transaction_id"),
+    ]
+    currencies = sorted({record.get("currency") for record in data_list})
+    if all(currencies):
+        params.append(("currency", f"in.({','.join(currencies)})"))
+
+    existing_ids = set()
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    with span("supabase.range_lookup", log=False, table=table, rows=len(data_list), requests=0, bytes=0) as lookup_span:
+        page_offset = 0
+        while True:
+            try:
+                request_start = time.perf_counter()
+                response = _session().get(
+                    url, headers=HEADERS_SUPABASE,
+                    params=params + [("limit", page_size), ("offset", page_offset)]
+                )
+                record_metric("supabase.get", (time.perf_counter() - request_start) * 1000,
+                              requests=1, bytes=len(response.content))
+                lookup_span.add(requests=1, bytes=len(response.content))
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"⚠️ [Supabase] Range lookup on {table} failed, falling back to per-chunk lookups: {e}")
+                return None
+            if response.status_code != 200:
+                logger.warning(f"⚠️ [Supabase] Range lookup on {table} failed, falling back to per-chunk lookups: {response.text}")
+                return None
+
+            page = response.json()
+            existing_ids.update(item["transaction_id"] for item in page)
+            if len(page) < page_size:
+                break
+            page_offset += page_size
+    logger.debug(f"🔎 [Supabase] {len(existing_ids)} existing ID(s) in {table} between {min(moments)} and {max(moments)}")
+    return existing_ids
@@ -0,0 +1,50 @@
+from typing import Any, Dict, Iterable, List
+
+
+class DedupIndex:
+    """
+    In-memory hash-set index of record keys seen during a run.
+
+    Shared across sections (and statements, for backfills) so repeated
+    transactions are dropped before they reach any sink.
+    """
+
+    def __init__(self, key: str = "transaction_id"):
+        self.key = key
+        self.seen = set()
+        self.dropped = 0
+
+    def filter(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keep the first occurrence of every key, dropping repeats.
+
+        Args:
+            records: Records to filter
+
+        Returns:
+            List of records whose key was not seen before
+        """
+        unique = []
+        for record in records:
+            record_key = record[self.key]
+            if record_key in self.seen:
+                self.dropped += 1
+                continue
+            self.seen.add(record_key)
+            unique.append(record)
+        return unique
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+
+def dedup_records(records: Iterable[Dict[str, Any]], key: str = "transaction_id"):
+    """
+    Drop repeated records from a single batch.
+
+    Returns:
+        Tuple of (unique records, number of dropped records)
+    """
+    index = DedupIndex(key)
+    unique = index.filter(records)
+    return unique, index.dropped
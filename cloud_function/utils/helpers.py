@@ -1,4 +1,7 @@
 import hashlib
+from datetime import datetime
+from functools import lru_cache
+from utils.logger import logger
 
 def generate_transaction_id(date_time_str, symbol, quantity, trade_price, code):
     """
@@ -6,3 +9,46 @@ def generate_transaction_id(date_time_str, symbol, quantity, trade_price, code):
     """
     base_str = f"{date_time_str}_{symbol}_{quantity}_{trade_price}_{code}"
     return hashlib.md5(base_str.encode('utf-8')).hexdigest()
+
+@lru_cache(maxsize=4096)
+def format_option_expiration(expiration_date: str) -> str:
+    """
+    Format option expiration date from various formats to YYYY-MM-DD.
+    Cached: a history has few distinct expirations but many option rows.
+    
+    Args:
+        expiration_date: The input expiration date string
+        
+    Returns:
+        Formatted date in YYYY-MM-DD format, or original string if parsing fails
+    """
+    if not expiration_date:
+        return ""
+    
+    try:
+        # Handle special format like "04APR25"
+        if len(expiration_date) >= 7 and expiration_date[2:5].isalpha():
+            # Parse components
+            day = expiration_date[:2]
+            month_str = expiration_date[2:5].upper()
+            year_str = expiration_date[5:7]
+            
+            # Convert month name to number
+            month_map = {
+                "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+                "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12
+            }
+            
+            # Only proceed if month is valid
+            if month_str in month_map:
+                month = month_map[month_str]
+                # Determine century (20xx or 19xx)
+                year = 2000 + int(year_str) if int(year_str) < 50 else 1900 + int(year_str)
+                
+                # Create datetime and format
+                return datetime(year, month, int(day)).strftime("%Y-%m-%d")
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to parse date '{expiration_date}': {str(e)}")
+    
+    # Return original if parsing fails
+    return expiration_date
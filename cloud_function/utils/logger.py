@@ -1,6 +1,18 @@
-import logging
-import json
+import os
 import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+# Format and write log records on a background thread (set LOG_ASYNC=0 to log inline)
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1").lower() not in ("0", "false", "no")
+# Minimum seconds between two emissions of a throttled message
+LOG_THROTTLE_SECONDS = float(os.getenv("LOG_THROTTLE_SECONDS", "10"))
 
 class CloudRunFormatter(logging.Formatter):
     def format(self, record):
@@ -13,9 +25,14 @@ class CloudRunFormatter(logging.Formatter):
             'timestamp': self.formatTime(record, self.datefmt),
             'logger': record.name,
         }
+
+        # Structured fields passed as logger.info(..., extra={"json_fields": {...}})
+        json_fields = getattr(record, 'json_fields', None)
+        if json_fields:
+            log_dict.update(json_fields)
         
         # Use ensure_ascii=False to preserve UTF-8 characters like emojis
-        return json.dumps(log_dict, ensure_ascii=False)
+        return json.dumps(log_dict, ensure_ascii=False, default=str)
 
 # Configure root logger
 root_logger = logging.getLogger()
@@ -27,9 +44,85 @@ formatter = CloudRunFormatter('%(message)s')  # Simple format focusing on the me
 handler.setFormatter(formatter)
 
 # Remove existing handlers if any
-for h in root_logger.handlers:
+for h in list(root_logger.handlers):
     root_logger.removeHandler(h)
-root_logger.addHandler(handler)
+
+# The hot path only enqueues the record; JSON encoding and stdout writes
+# happen on the listener thread
+log_queue = None
+listener = None
+if LOG_ASYNC:
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    root_logger.addHandler(QueueHandler(log_queue))
+else:
+    root_logger.addHandler(handler)
 
 # Create a logger with name
 logger = logging.getLogger('investflow')
+
+
+def flush_logs():
+    """
+    Block until every queued log record has been written to stdout.
+
+    Call before returning from a Cloud Function invocation: the instance can
+    be throttled right after, which would leave queued records unwritten.
+    """
+    # Records queued after the atexit stop would never be drained
+    if log_queue is not None and listener._thread is not None:
+        log_queue.join()
+    handler.flush()
+
+
+class LogAggregator:
+    """
+    Counts repetitive messages and logs one summary line per key.
+
+    Usage:
+        skipped = LogAggregator("⏩ Skipped {count:,} row(s) with Asset Category {key}")
+        for row in rows:
+            skipped.add(category)
+        skipped.flush()
+    """
+
+    def __init__(self, template, level=logging.INFO, log=None):
+        self.template = template
+        self.level = level
+        self.log = log or logger
+        self.counts = Counter()
+
+    def add(self, key, count=1):
+        self.counts[key] += count
+
+    def flush(self):
+        for key, count in self.counts.items():
+            self.log.log(self.level, self.template.format(key=key, count=count))
+        self.counts.clear()
+
+
+_throttle_lock = threading.Lock()
+_throttle_last = {}
+
+
+def should_log(key, interval=None):
+    """
+    Rate-limit a hot-loop message: True at most once per `interval` seconds per key.
+
+    Args:
+        key: Identifies the message (e.g. "sheets.progress")
+        interval: Seconds between emissions, defaults to LOG_THROTTLE_SECONDS
+
+    Returns:
+        Whether the caller should log now
+    """
+    interval = LOG_THROTTLE_SECONDS if interval is None else interval
+    now = time.monotonic()
+    with _throttle_lock:
+        last = _throttle_last.get(key)
+        if last is not None and now - last < interval:
+            return False
+        _throttle_last[key] = now
+        return True
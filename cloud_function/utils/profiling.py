@@ -0,0 +1,100 @@
+import io
+import os
+import pstats
+import cProfile
+import resource
+import tracemalloc
+from os.path import basename
+from typing import List, Optional
+from utils.logger import logger
+
+# Environment variables
+PROFILE_ENABLED = os.getenv("PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR")  # Default: next to the input file
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "20"))
+PROFILE_PREFIX = os.getenv("PROFILE_PREFIX", "_profiles/")
+TRACEMALLOC_FRAMES = 10
+
+
+class InvocationProfiler:
+    """
+    Wraps one invocation in cProfile and tracemalloc.
+
+    On exit it writes `<input>.pstats` (load with pstats/snakeviz) and
+    `<input>.alloc.txt` (top allocation sites), then logs the top-N hot
+    functions and the peak traced memory. Written paths are kept in
+    `artifacts` so the caller can ship them elsewhere.
+    """
+
+    def __init__(self, file_path: str, output_dir: Optional[str] = None, top_n: int = PROFILE_TOP_N):
+        self.file_path = file_path
+        self.output_dir = output_dir or PROFILE_DIR or os.path.dirname(os.path.abspath(file_path))
+        self.top_n = top_n
+        self.artifacts: List[str] = []
+        self._profiler = cProfile.Profile()
+
+    def __enter__(self):
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        try:
+            self._write_reports(snapshot, peak_bytes)
+        except Exception as e:
+            logger.error(f"❌ Error writing profile for {basename(self.file_path)}: {e}")
+        return False
+
+    def _write_reports(self, snapshot, peak_bytes: int) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(self.output_dir, basename(self.file_path))
+
+        pstats_path = f"{stem}.pstats"
+        self._profiler.dump_stats(pstats_path)
+        self.artifacts.append(pstats_path)
+
+        top_stats = snapshot.statistics("lineno")
+        alloc_path = f"{stem}.alloc.txt"
+        with open(alloc_path, "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {peak_bytes / 1024 / 1024:.1f} MiB\n\n")
+            for stat in top_stats[:self.top_n * 5]:
+                f.write(f"{stat}\n")
+        self.artifacts.append(alloc_path)
+
+        hot_functions = io.StringIO()
+        pstats.Stats(self._profiler, stream=hot_functions).sort_stats("cumulative").print_stats(self.top_n)
+        # ru_maxrss is reported in KiB on Linux
+        max_rss_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        logger.info(
+            f"🧪 Profile for {basename(self.file_path)}: peak traced memory {peak_bytes / 1024 / 1024:.1f} MiB, "
+            f"max RSS {max_rss_mib:.1f} MiB",
+            extra={"json_fields": {
+                "peak_traced_bytes": peak_bytes,
+                "max_rss_mib": round(max_rss_mib, 1),
+                "top_allocations": [str(stat) for stat in top_stats[:self.top_n]],
+                "profile_artifacts": self.artifacts,
+            }},
+        )
+        logger.info(f"🔥 Top {self.top_n} functions by cumulative time:\n{hot_functions.getvalue()}")
+
+
+def upload_profile_artifacts(bucket, artifacts: List[str], prefix: str = PROFILE_PREFIX) -> None:
+    """Copy profile artifacts to the bucket (local /tmp does not outlive the invocation)."""
+    for path in artifacts:
+        try:
+            bucket.blob(f"{prefix}{basename(path)}").upload_from_filename(path)
+            os.remove(path)
+            logger.info(f"📤 Uploaded profile artifact {prefix}{basename(path)}")
+        except Exception as e:
+            logger.error(f"❌ Error uploading profile artifact {path}: {e}")
+
+
+def is_profile_object(file_name: str) -> bool:
+    """Profile artifacts land in the watched bucket when STATE_BUCKET_NAME is unset; ignore their finalize events."""
+    return file_name.startswith(PROFILE_PREFIX)
@@ -0,0 +1,130 @@
+import time
+import functools
+import contextvars
+from typing import Any, Dict, Optional
+from utils.logger import logger
+
+# Numeric span fields that are summed into the per-run summary
+METRIC_FIELDS = ("rows", "bytes", "requests")
+
+_current_run = contextvars.ContextVar("investflow_run_metrics", default=None)
+
+
+class RunMetrics:
+    """Per-run aggregate of span durations and counters, keyed by stage name."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, duration_ms: float, fields: Dict[str, Any]) -> None:
+        stage = self.stages.setdefault(name, {"count": 0, "duration_ms": 0.0})
+        stage["count"] += 1
+        stage["duration_ms"] += duration_ms
+        for key in METRIC_FIELDS:
+            if isinstance(fields.get(key), (int, float)):
+                stage[key] = stage.get(key, 0) + fields[key]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages": {
+                name: {key: round(value, 1) if key == "duration_ms" else value for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def format_for_slack(self) -> str:
+        """Render the summary as a Slack message block."""
+        summary = self.summary()
+        msg = f"*⏱️ Timings:* `{_format_ms(summary['total_ms'])}` total\n"
+        for name, stage in sorted(summary["stages"].items(), key=lambda item: -item[1]["duration_ms"]):
+            details = [f"{stage[key]} {key}" for key in METRIC_FIELDS if stage.get(key)]
+            suffix = f" ({', '.join(details)})" if details else ""
+            msg += f"• {name}: `{_format_ms(stage['duration_ms'])}`{suffix}\n"
+        return msg
+
+
+def start_run() -> RunMetrics:
+    """Start collecting metrics for the current run (per thread / context)."""
+    run = RunMetrics()
+    _current_run.set(run)
+    return run
+
+
+def get_run() -> Optional[RunMetrics]:
+    return _current_run.get()
+
+
+def record_metric(name: str, duration_ms: float, **fields) -> None:
+    """Add a measurement to the run summary without emitting a log line."""
+    run = _current_run.get()
+    if run is not None:
+        run.add(name, duration_ms, fields)
+
+
+class Span:
+    """
+    Timer for one pipeline stage, usable as a context manager.
+
+    On exit it logs a structured line with duration_ms and any fields
+    (rows, bytes, requests, ...) and adds them to the run summary.
+    """
+
+    def __init__(self, name: str, log: bool = True, **fields):
+        self.name = name
+        self.log = log
+        self.fields = fields
+        self.duration_ms = 0.0
+        self._start = None
+
+    def add(self, **fields) -> None:
+        """Increment numeric fields, set the others."""
+        for key, value in fields.items():
+            if key in METRIC_FIELDS and isinstance(self.fields.get(key), (int, float)):
+                self.fields[key] += value
+            else:
+                self.fields[key] = value
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        record_metric(self.name, self.duration_ms, **self.fields)
+        if self.log:
+            json_fields = {"span": self.name, "duration_ms": round(self.duration_ms, 1), **self.fields}
+            if exc_type is not None:
+                json_fields["error"] = exc_type.__name__
+            logger.info(f"⏱️  {self.name} took {_format_ms(self.duration_ms)}", extra={"json_fields": json_fields})
+        return False
+
+
+def span(name: str, **fields) -> Span:
+    return Span(name, **fields)
+
+
+def timed(name: Optional[str] = None, log: bool = True, **fields):
+    """Decorator wrapping every call of the function in a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(span_name, log=log, **fields):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def log_run_summary(run: RunMetrics, **fields) -> None:
+    summary = run.summary()
+    logger.info(
+        f"📈 Run summary: {_format_ms(summary['total_ms'])} across {len(summary['stages'])} stage(s)",
+        extra={"json_fields": {"run_summary": summary, **fields}},
+    )
+
+
+def _format_ms(duration_ms: float) -> str:
+    return f"{duration_ms / 1000:.2f} s" if duration_ms >= 1000 else f"{duration_ms:.0f} ms"
@@ -10,6 +10,14 @@ resource "google_storage_bucket" "csv_reports_bucket" {
   force_destroy = true
 }
 
+# Checkpoints, idempotency markers, snapshots, spool and profiles. Kept out of the
+# trigger bucket so the function's own writes don't fire finalize events.
+resource "google_storage_bucket" "state_bucket" {
+  name          = "${var.bucket_name}-state"
+  location      = var.region
+  force_destroy = true
+}
+
 resource "google_storage_bucket_object" "function_source" {
   name   = "function-source.zip"
   bucket = google_storage_bucket.csv_reports_bucket.name
@@ -41,9 +49,14 @@ resource "google_cloudfunctions2_function" "csv_reports_processor" {
     service_account_email = "investflow-function@${var.project_id}.iam.gserviceaccount.com"
     environment_variables = {
       BUCKET_NAME = google_storage_bucket.csv_reports_bucket.name
+      STATE_BUCKET_NAME = google_storage_bucket.state_bucket.name
       SLACK_WEBHOOK_URL = var.slack_webhook_url
       SUPABASE_URL = var.supabase_url
       SUPABASE_API_KEY = var.supabase_api_key
+      IDEMPOTENCY_BACKEND = "gcs"
+      CHECKPOINT_BACKEND = "gcs"
+      POSITIONS_BACKEND = "gcs"
+      SPOOL_BACKEND = "gcs"
     }
     max_instance_count = 3
     ingress_settings = "ALLOW_ALL"
@@ -3,6 +3,11 @@ output "bucket_name" {
   value       = google_storage_bucket.csv_reports_bucket.name
 }
 
+output "state_bucket_name" {
+  description = "Name of the bucket holding the function's checkpoints, markers, snapshots and spool"
+  value       = google_storage_bucket.state_bucket.name
+}
+
 output "function_name" {
   description = "Name of the deployed cloud function"
   value       = google_cloudfunctions2_function.csv_reports_processor.name